@@ -0,0 +1,19 @@
+""" Benchmark for the Monte Carlo simulation of drilling deviations
+Run from the repository root: python -m benchmarks.bench_deviation_monte_carlo
+"""
+import time
+from src.deviation_monte_carlo import simulate_shaft_secant_piles_deviation
+
+
+def main(n_realizations=100000, n_pieces=1000):
+    start = time.perf_counter()
+    p_window, d_eff_min = simulate_shaft_secant_piles_deviation(150.0, n_pieces, 1.2, 15.0, 0.0, 0.75, n_realizations, seed=0)
+    elapsed = time.perf_counter() - start
+
+    print('Realizations: {0}, number of piles: {1}'.format(n_realizations, n_pieces))
+    print('simulate_shaft_secant_piles_deviation: {:.3f} s'.format(elapsed))
+    print('Probability of window = {0:.4f}, minimum d_eff = {1:.2f} cm'.format(p_window, d_eff_min.min()*100))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+""" Benchmark for the vectorized geometry functions
+Run from the repository root: python -m benchmarks.bench_geometry_batch
+"""
+import time
+import numpy as np
+from src.shaft_secant_piles import get_parameters_shaft_secant_piles_batch
+from src.wall_secant_piles import get_parameters_wall_secant_piles_batch
+from src.shaft_diaphragm_panels import get_parameters_shaft_diaphragm_panels_batch
+
+
+def get_random_parameter_sets(n_sets, seed=0):
+    """ Gets random but realistic parameter sets for benchmarking
+    n_sets: number of parameter sets
+    """
+    rng = np.random.default_rng(seed)
+    parameters = {'ri': rng.uniform(2.0, 20.0, n_sets),
+                  'n_pieces': rng.integers(20, 200, n_sets),
+                  'D': rng.uniform(0.6, 1.5, n_sets),
+                  'a': rng.uniform(0.4, 1.2, n_sets),
+                  'L': rng.uniform(5.0, 60.0, n_sets),
+                  'H_drilling_platform': rng.uniform(0.0, 5.0, n_sets),
+                  'v': rng.uniform(0.25, 1.0, n_sets)}
+    return parameters
+
+
+def time_function(func, *args, repeat=5):
+    """ Gets best wall time of func(*args) out of repeat runs [s]"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(n_sets=1000000):
+    p = get_random_parameter_sets(n_sets)
+    t_sps = time_function(get_parameters_shaft_secant_piles_batch, p['ri'], p['n_pieces'], p['D'], p['L'], p['H_drilling_platform'], p['v'])
+    t_spw = time_function(get_parameters_wall_secant_piles_batch, p['D'], p['a'], p['L'], p['H_drilling_platform'], p['v'])
+    t_dws = time_function(get_parameters_shaft_diaphragm_panels_batch, p['D'], p['L'], p['H_drilling_platform'], p['v'])
+
+    print('Parameter sets: {}'.format(n_sets))
+    print('get_parameters_shaft_secant_piles_batch: {:.3f} s'.format(t_sps))
+    print('get_parameters_wall_secant_piles_batch: {:.3f} s'.format(t_spw))
+    print('get_parameters_shaft_diaphragm_panels_batch: {:.3f} s'.format(t_dws))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+""" Benchmark for the 2D plots of shafts and walls against number of piles
+Run from the repository root: python -m benchmarks.bench_plotting_2d
+"""
+import time
+from io import BytesIO
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from src.shaft_secant_piles import plot_shaft
+from src.wall_secant_piles import plot_wall_secant_piles
+from src.shaft_diaphragm_panels import plot_shaft_diaphragm_panels
+
+
+def time_rendering(plot_function, *args, repeat=3):
+    """ Gets best wall time for creating the figure and rendering it to PNG [s]"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fig = plot_function(*args)
+        fig.savefig(BytesIO(), format='png')
+        times.append(time.perf_counter() - start)
+        plt.close(fig)
+    return min(times)
+
+
+def main(n_pieces_list=(10, 100, 1000)):
+    print('{0:>8} {1:>12} {2:>12} {3:>12}'.format('n_pieces', 'shaft [s]', 'wall [s]', 'panels [s]'))
+    for n_pieces in n_pieces_list:
+        t_shaft = time_rendering(plot_shaft, 0.15*n_pieces, n_pieces, 1.2, 0.02, 0.1)
+        t_wall = time_rendering(plot_wall_secant_piles, n_pieces, 0.9, 1.2, 0.02, 0.1)
+        t_panels = time_rendering(plot_shaft_diaphragm_panels, 0.8*n_pieces, 1.0, 2.8, 0.02, 0.1)   # about n_pieces panels
+        print('{0:>8} {1:>12.3f} {2:>12.3f} {3:>12.3f}'.format(n_pieces, t_shaft, t_wall, t_panels))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,20 @@
+""" Benchmark for the 3D plots of shafts and walls against number of piles
+Run from the repository root: python -m benchmarks.bench_plotting_3d
+"""
+import matplotlib
+matplotlib.use('Agg')
+from src.shaft_secant_piles import plot_shaft_3d
+from src.wall_secant_piles import plot_wall_secant_piles_3d
+from benchmarks.bench_plotting_2d import time_rendering
+
+
+def main(n_pieces_list=(10, 50, 200, 1000)):
+    print('{0:>8} {1:>12} {2:>12}'.format('n_pieces', 'shaft [s]', 'wall [s]'))
+    for n_pieces in n_pieces_list:
+        t_shaft = time_rendering(plot_shaft_3d, 0.15*n_pieces, n_pieces, 1.2, 15.0, 0.02, 0.1)
+        t_wall = time_rendering(plot_wall_secant_piles_3d, n_pieces, 0.9, 1.2, 15.0, 0.02, 0.1)
+        print('{0:>8} {1:>12.3f} {2:>12.3f}'.format(n_pieces, t_shaft, t_wall))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,25 @@
+""" Benchmark for the FORM reliability of a portfolio of secant piled shafts
+Run from the repository root: python -m benchmarks.bench_reliability
+"""
+import time
+import numpy as np
+from src.reliability import get_reliability_shaft_secant_piles
+
+
+def main(n_structures=100000):
+    rng = np.random.default_rng(0)
+    L = rng.uniform(5.0, 30.0, n_structures)
+    F_hoop = rng.uniform(200.0, 1500.0, n_structures)
+    start = time.perf_counter()
+    interlock, hoop = get_reliability_shaft_secant_piles(5.0, 40, 1.2, L, 1.0, 0.5, F_hoop, 18.0)
+    elapsed = time.perf_counter() - start
+
+    print('Structures: {}'.format(n_structures))
+    print('get_reliability_shaft_secant_piles: {:.3f} s'.format(elapsed))
+    print('Iterations: interlock {0}, hoop {1}, not converged: {2}'.format(interlock['n_iterations'], hoop['n_iterations'],
+                                                                         np.count_nonzero(~interlock['converged'] | ~hoop['converged'])))
+    print('Median reliability index: interlock {0:.2f}, hoop {1:.2f}'.format(np.median(interlock['beta']), np.median(hoop['beta'])))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,29 @@
+""" Benchmark for secant piled walls along curved alignments
+Run from the repository root: python -m benchmarks.bench_wall_alignment
+"""
+import time
+import numpy as np
+from src.wall_alignment import place_piles_along_alignment, get_joint_parameters
+
+
+def get_oval_alignment(n_vertices, a, b):
+    """ Gets vertices of an oval alignment with half axes a and b [m]"""
+    angles = np.linspace(0.0, 2*np.pi, n_vertices, endpoint=False)
+    return np.column_stack((a*np.cos(angles), b*np.sin(angles)))
+
+
+def main(half_axes_list=((120.0, 50.0), (1200.0, 500.0), (6000.0, 2500.0))):
+    print('{0:>8} {1:>8} {2:>12} {3:>12}'.format('piles', 'joints', 'placing [s]', 'joints [s]'))
+    for a, b in half_axes_list:
+        vertices = get_oval_alignment(400, a, b)
+        start = time.perf_counter()
+        x, y = place_piles_along_alignment(vertices, 0.8, closed=True, spline=True)
+        t_placing = time.perf_counter() - start
+        start = time.perf_counter()
+        pairs = get_joint_parameters(x, y, 1.2, 20.0, 0.0, 0.5)[0]
+        t_joints = time.perf_counter() - start
+        print('{0:>8} {1:>8} {2:>12.4f} {3:>12.4f}'.format(x.size, len(pairs), t_placing, t_joints))
+
+
+if __name__ == '__main__':
+    main()
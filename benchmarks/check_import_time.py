@@ -0,0 +1,66 @@
+""" Import-time budget for the library modules
+Run from the repository root: python -m benchmarks.check_import_time
+
+Each module is imported in a fresh interpreter with -X importtime. The check fails (exit code 1) if a module loads
+matplotlib, scipy or streamlit at import time, or if its import takes longer than the budget on top of numpy.
+"""
+import re
+import sys
+import argparse
+import subprocess
+
+# Modules which must be importable without plotting and GUI packages
+MODULES = ['src.shaft_secant_piles', 'src.wall_secant_piles', 'src.shaft_diaphragm_panels', 'src.shaft_secant_piles_design',
+           'src.hoop_profile', 'src.deviation_monte_carlo', 'src.session_format', 'src.figure_cache', 'src.timing', 'src.batch', 'src.report', 'src.stiffness_export',
+           'src.results', 'src.reliability', 'src.mesh_export', 'src.sensitivities', 'src.design_limits', 'src.wall_alignment', 'src.inclinometer',
+           'src.compute_graph', 'src.service']
+FORBIDDEN = ['matplotlib', 'mpl_toolkits', 'scipy', 'streamlit']
+# Budgets of modules which need slow standard library packages at import time [s], e.g. asyncio for the service
+MODULE_BUDGETS = {'src.service': 0.2}
+
+
+def get_import_time(module):
+    """ Imports module in a fresh interpreter
+    Returns cumulative import time of module and of numpy [s], and loaded top level packages
+    """
+    code = 'import sys, {0}; print(" ".join(sorted(set(name.split(".")[0] for name in sys.modules))))'.format(module)
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], capture_output=True, text=True, check=True)
+    times = {}
+    for line in process.stderr.splitlines():
+        match = re.match(r'import time:\s+\d+\s+\|\s+(\d+)\s+\|\s*(\S+)', line)
+        if match:
+            times[match.group(2)] = int(match.group(1))*1e-6
+    return times.get(module, 0.0), times.get('numpy', 0.0), process.stdout.split()
+
+
+def check_import_time(modules=MODULES, budget=0.1, repeat=3, module_budgets=MODULE_BUDGETS):
+    """ Checks import time and loaded packages of modules
+    budget: maximum import time of a module on top of numpy [s]
+    module_budgets: budgets of single modules instead of budget, dict {module: budget [s]}
+    Returns list of (module, import time on top of numpy, forbidden packages loaded, passed)
+    """
+    rows = []
+    for module in modules:
+        best = None
+        for _ in range(repeat):
+            t_module, t_numpy, packages = get_import_time(module)
+            t = t_module - t_numpy
+            best = t if best is None else min(best, t)
+        loaded = [package for package in FORBIDDEN if package in packages]
+        rows.append((module, best, loaded, best <= module_budgets.get(module, budget) and not loaded))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Import-time budget for the library modules')
+    parser.add_argument('--budget-ms', type=float, default=100.0, help='maximum import time on top of numpy [ms] (default: 100)')
+    args = parser.parse_args(argv)
+    rows = check_import_time(budget=args.budget_ms/1000)
+    print('{0:<32} {1:>10}  {2}'.format('module', 'time [ms]', 'forbidden packages'))
+    for module, t, loaded, passed in rows:
+        print('{0:<32} {1:>10.1f}  {2}{3}'.format(module, t*1000, ', '.join(loaded) or '-', '' if passed else '  FAILED'))
+    return 0 if all(row[3] for row in rows) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,182 @@
+""" Benchmark suite for geometry kernels, plotting and full form reruns
+Run from the repository root:
+
+    python -m benchmarks.run_benchmarks --output results.json
+    python -m benchmarks.run_benchmarks --baseline baseline.json --threshold 1.25
+
+Results are saved as JSON with the best wall time of each benchmark [s]. With --baseline, the results are compared
+against a stored run and the exit code is 1 if any benchmark is slower than threshold times its baseline.
+"""
+import io
+import sys
+import json
+import time
+import argparse
+import platform
+import contextlib
+from datetime import datetime
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from src.shaft_secant_piles import (get_parameters_shaft_secant_piles, check_for_hoop_force, data_for_cylinder_2_points,
+                                    plot_shaft, plot_shaft_3d)
+from src.wall_secant_piles import get_parameters_wall_secant_piles, plot_wall_secant_piles_3d
+from src.shaft_diaphragm_panels import get_parameters_shaft_diaphragm_panels, plot_shaft_diaphragm_panels
+from src.main_secant_piled_shaft import main_secant_piled_shaft
+from src.main_secant_piled_wall import main_secant_piled_wall
+from src.main_diaphragm_panel_shaft import main_diaphragm_panel_shaft
+from src.main_diaphragm_panel_wall import main_diaphragm_panel_wall
+from src.figure_cache import figure_cache
+
+
+class HeadlessStreamlit:
+    """ Stand-in for the streamlit module to run the forms without a server
+    Input widgets return their default values, output elements do nothing
+    """
+
+    def __init__(self):
+        self.session_state = {}
+
+    def _widget(self, label, value=None, key=None, **kwargs):
+        return value
+
+    text_input = number_input = checkbox = text_area = _widget
+
+    def selectbox(self, label, options, index=0, key=None, **kwargs):
+        return options[index]
+
+    def columns(self, spec):
+        return [self]*(spec if isinstance(spec, int) else len(spec))
+
+    def expander(self, *args, **kwargs):
+        return contextlib.nullcontext()
+
+    def pyplot(self, fig=None, **kwargs):
+        plt.close(fig)
+
+    def __getattr__(self, name):
+        # title, header, write, image, success, error, ...
+        return lambda *args, **kwargs: None
+
+
+def time_function(function, *args, repeat=5, number=1, **kwargs):
+    """ Gets best wall time of calling function(*args, **kwargs) over repeat runs of number calls [s per call]"""
+    times = []
+    with contextlib.redirect_stdout(io.StringIO()):     # some kernels print their results
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                function(*args, **kwargs)
+            times.append((time.perf_counter() - start)/number)
+    return min(times)
+
+
+def render(plot_function, *args, **kwargs):
+    """ Creates figure and renders it to PNG, as the forms do"""
+    fig = plot_function(*args, **kwargs)
+    fig.savefig(io.BytesIO(), format='png')
+    plt.close(fig)
+
+
+def run_form(main_function):
+    """ Runs a form headless with an empty figure cache"""
+    figure_cache.clear()
+    main_function(HeadlessStreamlit())
+
+
+def run_kernels(quick=False):
+    """ Microbenchmarks of the geometry kernels"""
+    number = 100 if quick else 1000
+    results = {}
+    results['get_parameters_shaft_secant_piles'] = time_function(get_parameters_shaft_secant_piles, 6.0, 44, 1.2, 15.0, 0.0, 0.75,
+                                                                 print_results=False, number=number)
+    results['get_parameters_wall_secant_piles'] = time_function(get_parameters_wall_secant_piles, 1.2, 0.75, 25.0, 0.0, 0.75, number=number)
+    results['get_parameters_shaft_diaphragm_panels'] = time_function(get_parameters_shaft_diaphragm_panels, 0.8, 51.3, 0.0, 0.4, number=number)
+    results['check_for_hoop_force'] = time_function(check_for_hoop_force, 700.0, 0.5, 1.35, 10.0, 0.7, 1.5, number=number)
+    results['data_for_cylinder_2_points'] = time_function(data_for_cylinder_2_points, np.array([0.0, 0.0, 0.0]), np.array([0.1, 0.1, -15.0]),
+                                                          0.6, number=number)
+    return results
+
+
+def run_plots(n_pieces_list=(10, 100, 1000), quick=False):
+    """ Wall times of the plot functions against number of piles, including rendering to PNG"""
+    repeat = 1 if quick else 3
+    results = {}
+    for n_pieces in n_pieces_list:
+        ri = 0.15*n_pieces
+        results['plot_shaft[{}]'.format(n_pieces)] = time_function(render, plot_shaft, ri, n_pieces, 1.2, 0.02, 0.1, seed=0, repeat=repeat)
+        results['plot_shaft_3d[{}]'.format(n_pieces)] = time_function(render, plot_shaft_3d, ri, n_pieces, 1.2, 15.0, 0.02, 0.1, seed=0, repeat=repeat)
+        results['plot_wall_secant_piles_3d[{}]'.format(n_pieces)] = time_function(render, plot_wall_secant_piles_3d, n_pieces, 0.9, 1.2, 15.0, 0.02, 0.1,
+                                                                                  seed=0, repeat=repeat)
+        results['plot_shaft_diaphragm_panels[{}]'.format(n_pieces)] = time_function(render, plot_shaft_diaphragm_panels, 0.8*n_pieces, 1.0, 2.8, 0.02, 0.1,
+                                                                                    seed=0, repeat=repeat)   # about n_pieces panels
+    return results
+
+
+def run_forms(quick=False):
+    """ Wall times of full headless reruns of the forms with default parameters"""
+    repeat = 1 if quick else 3
+    results = {}
+    for main_function in [main_secant_piled_shaft, main_secant_piled_wall, main_diaphragm_panel_shaft, main_diaphragm_panel_wall]:
+        results[main_function.__name__] = time_function(run_form, main_function, repeat=repeat)
+        st = HeadlessStreamlit()    # rerun of the same session without changes, all results memoized by the compute graph
+        main_function(st)
+        results[main_function.__name__ + '[rerun]'] = time_function(main_function, st, repeat=repeat)
+    return results
+
+
+def run_benchmarks(quick=False):
+    """ Runs all benchmarks
+    quick: fewer repetitions and smaller plots for a smoke run
+    Returns dict with environment and results
+    """
+    results = {}
+    results.update(run_kernels(quick))
+    results.update(run_plots((10, 100) if quick else (10, 100, 1000), quick))
+    results.update(run_forms(quick))
+    return {'timestamp': datetime.now().isoformat(timespec='seconds'), 'python': platform.python_version(), 'platform': platform.platform(),
+            'numpy': np.__version__, 'matplotlib': matplotlib.__version__, 'results': results}
+
+
+def compare_results(results, baseline, threshold=1.25):
+    """ Compares results against baseline results
+    Returns list of (name, time, baseline time, ratio, slower) for benchmarks in both runs
+    """
+    rows = []
+    for name, t in results['results'].items():
+        if name in baseline['results']:
+            ratio = t/baseline['results'][name]
+            rows.append((name, t, baseline['results'][name], ratio, ratio > threshold))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks for geometry kernels, plotting and forms')
+    parser.add_argument('--output', default=None, help='JSON file for results')
+    parser.add_argument('--baseline', default=None, help='JSON file of a stored run to compare against')
+    parser.add_argument('--threshold', type=float, default=1.25, help='ratio to baseline above which a benchmark is reported as slower (default: 1.25)')
+    parser.add_argument('--quick', action='store_true', help='fewer repetitions and smaller plots')
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.quick)
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline is None:
+        for name, t in results['results'].items():
+            print('{0:<45} {1:>12.3e} s'.format(name, t))
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    rows = compare_results(results, baseline, args.threshold)
+    print('{0:<45} {1:>12} {2:>12} {3:>8}'.format('benchmark', 'time [s]', 'baseline [s]', 'ratio'))
+    for name, t, t_baseline, ratio, slower in rows:
+        print('{0:<45} {1:>12.3e} {2:>12.3e} {3:>8.2f}{4}'.format(name, t, t_baseline, ratio, '  SLOWER' if slower else ''))
+    return 1 if any(row[4] for row in rows) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
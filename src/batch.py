@@ -0,0 +1,236 @@
+""" Headless batch checks for whole project portfolios
+
+Reads a CSV or JSONL table of structures or a project file of the app, runs the geometry and hoop checks in a process pool and streams the results
+row by row to a CSV or JSONL file. Usage from the repository root:
+
+    python -m src.batch structures.csv results.csv --workers 4 --chunk-size 500 --figures figures/
+
+Each row has a 'structure_type' ('Secant piled shaft', 'Secant piled wall', 'Diaphragm panel shaft' or
+'Diaphragm panel wall'), an optional 'name' and the parameters of the corresponding form without key suffixes
+(di, D, n_pieces, L, v, H_drilling_platform, a, B, F_hoop_at_base, gamma_G, f_ck, alpha_cc, gamma_c, seed).
+Missing parameters take the default values of the forms.
+"""
+import os
+import re
+import csv
+import json
+import argparse
+from itertools import islice
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from src.shaft_secant_piles import get_parameters_shaft_secant_piles_batch, check_for_hoop_force
+from src.wall_secant_piles import get_parameters_wall_secant_piles_batch
+from src.shaft_diaphragm_panels import get_parameters_shaft_diaphragm_panels_batch, get_parameters_shaft_diaphragm_panels_ring_batch
+from src.session_format import iter_project, get_structure_from_parameters
+
+STRUCTURE_TYPES = ['Secant piled shaft', 'Secant piled wall', 'Diaphragm panel shaft', 'Diaphragm panel wall']
+
+# Default parameters, taken from the forms
+DEFAULTS = {'Secant piled shaft': {'di': 12.0, 'D': 1.2, 'n_pieces': 44, 'L': 15.0, 'v': 0.75, 'H_drilling_platform': 0.0,
+                                   'F_hoop_at_base': 700.0, 'gamma_G': 1.35, 'f_ck': 10.0, 'alpha_cc': 0.7, 'gamma_c': 1.5, 'seed': 0},
+            'Secant piled wall': {'D': 1.2, 'a': 0.75, 'L': 25.0, 'v': 0.75, 'H_drilling_platform': 0.0, 'n_pieces': 10, 'seed': 0},
+            'Diaphragm panel shaft': {'di': 12.0, 'D': 0.8, 'B': 2.8, 'L': 51.3, 'v': 0.4, 'H_drilling_platform': 0.0,
+                                      'F_hoop_at_base': 1200.0, 'gamma_G': 1.35, 'f_ck': 10.0, 'alpha_cc': 0.7, 'gamma_c': 1.5, 'seed': 0},
+            'Diaphragm panel wall': {'D': 1.2, 'B': 2.8, 'L': 35.0, 'v': 0.5, 'H_drilling_platform': 0.0}}
+
+OUTPUT_COLUMNS = ['name', 'structure_type', 'n_pieces', 'a', 't_top', 'd_top', 'x0', 'x', 't_eff', 'd_eff', 'touching', 'sigma_cd', 'f_cd', 'hoop_passed', 'error']
+
+
+def read_structures(file_name):
+    """ Reads structures one by one from a CSV, JSONL or project (.json, see src.session_format) file"""
+    with open(file_name, newline='') as f:
+        yield from parse_structures(f, file_name)
+
+
+def parse_structures(f, file_name):
+    """ Parses structures one by one from an open text file, the format is given by the extension of file_name"""
+    if file_name.lower().endswith('.json'):
+        for form, parameters in iter_project(f):
+            yield get_structure_from_parameters(form, parameters)
+    elif file_name.lower().endswith('.csv'):
+        for row in csv.DictReader(f):
+            yield {key: value for key, value in row.items() if value not in (None, '')}
+    else:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def get_parameters(structure):
+    """ Gets parameters of a structure completed with default values"""
+    structure_type = structure.get('structure_type')
+    if structure_type not in DEFAULTS:
+        raise ValueError('Unknown structure_type {}'.format(structure_type))
+    parameters = dict(DEFAULTS[structure_type])
+    for key in parameters:
+        if key in structure:
+            parameters[key] = float(structure[key])
+    return parameters
+
+
+def evaluate_structures(structures):
+    """ Runs the geometry and hoop checks for a list of structures, vectorized for each structure type
+    Returns a list of result dicts in the same order as structures
+    """
+    results = [{'name': structure.get('name', ''), 'structure_type': structure.get('structure_type', '')} for structure in structures]
+    groups = {structure_type: [] for structure_type in STRUCTURE_TYPES}
+    parameters = []
+    for i, structure in enumerate(structures):
+        try:
+            parameters.append(get_parameters(structure))
+            groups[structure['structure_type']].append(i)
+        except (ValueError, TypeError) as e:
+            parameters.append(None)
+            results[i]['error'] = str(e)
+
+    for structure_type, indices in groups.items():
+        if not indices:
+            continue
+        p = {key: np.array([parameters[i][key] for i in indices]) for key in DEFAULTS[structure_type]}
+        if structure_type == 'Secant piled shaft':
+            outputs = get_parameters_shaft_secant_piles_batch(p['di']/2, p['n_pieces'], p['D'], p['L'], p['H_drilling_platform'], p['v']).as_dict()
+            outputs['n_pieces'] = p['n_pieces'].astype(int)
+            outputs['touching'] = outputs['t_eff'] > 0
+        elif structure_type == 'Secant piled wall':
+            outputs = get_parameters_wall_secant_piles_batch(p['D'], p['a'], p['L'], p['H_drilling_platform'], p['v']).as_dict()
+            outputs['touching'] = outputs['t_eff'] > 0
+        elif structure_type == 'Diaphragm panel shaft':
+            outputs = get_parameters_shaft_diaphragm_panels_ring_batch(p['di']/2, p['D'], p['B'], p['L'], p['H_drilling_platform'], p['v']).as_dict()
+            outputs['touching'] = outputs['d_eff'] > 0
+        else:
+            outputs = get_parameters_shaft_diaphragm_panels_batch(p['D'], p['L'], p['H_drilling_platform'], p['v']).as_dict()
+            outputs['touching'] = outputs['d_eff'] > 0
+
+        if 'F_hoop_at_base' in p:
+            d_eff = np.where(outputs['touching'], outputs['d_eff'], np.nan)
+            outputs['sigma_cd'], outputs['f_cd'] = check_for_hoop_force(p['F_hoop_at_base'], d_eff, p['gamma_G'], p['f_ck'], p['alpha_cc'], p['gamma_c'])
+            outputs['hoop_passed'] = outputs['sigma_cd'] < outputs['f_cd']
+
+        for j, i in enumerate(indices):
+            for name, value in outputs.items():
+                value = np.broadcast_to(value, (len(indices),))[j].item()
+                results[i][name] = None if isinstance(value, float) and np.isnan(value) else value
+
+    return results
+
+
+def plot_structure(structure, parameters):
+    """ Plots the figures of a structure
+    parameters: parameters of the structure completed with default values, see get_parameters
+    Returns list of figures
+    """
+    from src.shaft_secant_piles import plot_shaft, plot_shaft_3d
+    from src.wall_secant_piles import plot_wall_secant_piles_2items
+    from src.shaft_diaphragm_panels import get_parameters_shaft_diaphragm_panels, plot_shaft_diaphragm_panels, plot_wall_diaphragm_panels
+
+    p = parameters
+    name = structure.get('name', '')
+    structure_type = structure['structure_type']
+    if structure_type == 'Secant piled shaft':
+        x0, x = get_parameters_shaft_secant_piles_batch(p['di']/2, p['n_pieces'], p['D'], p['L'], p['H_drilling_platform'], p['v'])[3:5]
+        figs = [plot_shaft(p['di']/2, int(p['n_pieces']), p['D'], x0, x, name, seed=int(p['seed'])),
+                plot_shaft_3d(p['di']/2, int(p['n_pieces']), p['D'], p['L'], x0, x, name, seed=int(p['seed']))]
+    elif structure_type == 'Secant piled wall':
+        x0, x = get_parameters_wall_secant_piles_batch(p['D'], p['a'], p['L'], p['H_drilling_platform'], p['v'])[2:4]
+        figs = [plot_wall_secant_piles_2items(p['a'], p['D'], x0, x, name)]
+    elif structure_type == 'Diaphragm panel shaft':
+        x0, x, _ = get_parameters_shaft_diaphragm_panels(p['D'], p['L'], p['H_drilling_platform'], p['v'])
+        figs = [plot_shaft_diaphragm_panels(p['di'], p['D'], p['B'], x0, x, name, seed=int(p['seed']))]
+    else:
+        x0, x, _ = get_parameters_shaft_diaphragm_panels(p['D'], p['L'], p['H_drilling_platform'], p['v'])
+        figs = [plot_wall_diaphragm_panels(2, p['D'], p['B'], x0, x, name)]
+    return figs
+
+
+def render_figures(structure, parameters, figures_dir, index):
+    """ Renders the figures of a structure to PNG files in figures_dir"""
+    import matplotlib.pyplot as plt
+
+    file_stem = '{0:06d}_{1}'.format(index, re.sub(r'[^\w\-]+', '_', structure.get('name', '')))
+    for i, fig in enumerate(plot_structure(structure, parameters)):
+        fig.savefig(os.path.join(figures_dir, '{0}_{1}.png'.format(file_stem, i + 1)))
+        plt.close(fig)
+
+
+def evaluate_chunk(start_index, structures, figures_dir=None):
+    """ Evaluates a chunk of structures in a worker process, optionally rendering their figures"""
+    results = evaluate_structures(structures)
+    if figures_dir is not None:
+        for i, (structure, result) in enumerate(zip(structures, results)):
+            if 'error' not in result:
+                render_figures(structure, get_parameters(structure), figures_dir, start_index + i)
+    return results
+
+
+def init_worker():
+    """ Initializes worker process for rendering without display"""
+    import matplotlib
+    matplotlib.use('Agg')
+
+
+class ResultWriter:
+    """ Writes results row by row to a CSV or JSONL file"""
+
+    def __init__(self, file_name):
+        self.file = open(file_name, 'w', newline='')
+        self.csv_writer = None
+        if file_name.lower().endswith('.csv'):
+            self.csv_writer = csv.DictWriter(self.file, fieldnames=OUTPUT_COLUMNS, extrasaction='ignore')
+            self.csv_writer.writeheader()
+
+    def write(self, result):
+        if self.csv_writer is not None:
+            self.csv_writer.writerow(result)
+        else:
+            self.file.write(json.dumps(result) + '\n')
+
+    def close(self):
+        self.file.close()
+
+
+def run_batch(input_file, output_file, workers=None, chunk_size=500, figures_dir=None):
+    """ Runs checks for all structures of input_file and streams results to output_file
+    At most 2 chunks per worker are in flight, so memory does not grow with the size of the input
+    workers: number of worker processes, None for number of CPUs
+    figures_dir: directory for figures rendered in the worker processes, None for no figures
+    Returns number of structures
+    """
+    if figures_dir is not None:
+        os.makedirs(figures_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    structures = read_structures(input_file)
+    writer = ResultWriter(output_file)
+    n_structures = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as executor:
+            pending = deque()
+            while True:
+                chunk = list(islice(structures, chunk_size))
+                if chunk:
+                    pending.append(executor.submit(evaluate_chunk, n_structures, chunk, figures_dir))
+                    n_structures += len(chunk)
+                if pending and (not chunk or len(pending) >= 2*workers):
+                    for result in pending.popleft().result():
+                        writer.write(result)
+                elif not chunk:
+                    break
+    finally:
+        writer.close()
+    return n_structures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Geometry and hoop checks for secant piled and diaphragm panel shafts and walls')
+    parser.add_argument('input_file', help='CSV or JSONL table of structures, or JSON project file')
+    parser.add_argument('output_file', help='CSV or JSONL file for results')
+    parser.add_argument('--workers', type=int, default=None, help='number of worker processes (default: number of CPUs)')
+    parser.add_argument('--chunk-size', type=int, default=500, help='number of structures per task (default: 500)')
+    parser.add_argument('--figures', default=None, metavar='DIR', help='render figures to PNG files in DIR')
+    args = parser.parse_args(argv)
+    n_structures = run_batch(args.input_file, args.output_file, args.workers, args.chunk_size, args.figures)
+    print('{0} structures checked, results written to {1}'.format(n_structures, args.output_file))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+import numpy as np
+from src.timing import stage
+
+# Incremental recomputation of the forms
+# Streamlit reruns a form from the top whenever any widget changes. The computations of a form are therefore declared as
+# nodes of a small dependency graph: each node is a function of named inputs, which are either widget values set with
+# set_inputs or results of other nodes. A node is evaluated only if the values of its inputs changed since its last
+# evaluation, so that e.g. a new hoop force only reruns the hoop check. The graph of each form lives in the session state,
+# which memoizes the results per session, and records the nodes run in the current rerun.
+
+
+def is_equal(a, b):
+    """ Checks whether two input values are equal, for numbers, strings, tuples and numpy arrays (NaN equals NaN)"""
+    if isinstance(a, np.ndarray) or isinstance(b, np.ndarray):
+        return (isinstance(a, np.ndarray) and isinstance(b, np.ndarray) and a.shape == b.shape and a.dtype == b.dtype
+                and np.array_equal(a, b, equal_nan=a.dtype.kind in 'fc'))
+    if isinstance(a, (tuple, list)) and isinstance(b, (tuple, list)):
+        return type(a) is type(b) and len(a) == len(b) and all(is_equal(ai, bi) for ai, bi in zip(a, b))
+    if type(a) is not type(b) and not (isinstance(a, (int, float, np.number)) and isinstance(b, (int, float, np.number))):
+        return False
+    try:
+        return bool(a == b) or (a != a and b != b)
+    except (TypeError, ValueError):
+        return a is b
+
+
+class ComputeGraph:
+    """ Dependency graph of memoized computations of a form"""
+
+    def __init__(self):
+        self.nodes = {}         # node name -> (function, input names)
+        self.providers = {}     # result name -> (node name, index into tuple result or None)
+        self.inputs = {}
+        self.results = {}       # node name -> (input values, result) of last evaluation
+        self.ran = []
+        self.hits = 0
+
+    def add_node(self, name, function, inputs, outputs=None):
+        """ Adds node
+        name: node name, also the name of its result
+        function: function called with the values of inputs as positional arguments
+        inputs: names of widget inputs or of results of other nodes
+        outputs: names of the items of a tuple result, so that other nodes can read them separately
+        """
+        self.nodes[name] = (function, tuple(inputs))
+        self.providers[name] = (name, None)
+        for i, output in enumerate(outputs or ()):
+            self.providers[output] = (name, i)
+
+    def start_rerun(self, **inputs):
+        """ Starts rerun of the form: clears the nodes run and sets widget inputs"""
+        self.ran = []
+        self.hits = 0
+        self.set_inputs(**inputs)
+
+    def set_inputs(self, **inputs):
+        """ Sets widget inputs, can be called as the widgets of a form are read"""
+        for name in inputs:
+            if name in self.providers:
+                raise ValueError('Input {} is a result of a node'.format(name))
+        self.inputs.update(inputs)
+
+    def get_value(self, name):
+        """ Gets value of a widget input or of a node result"""
+        if name in self.providers:
+            node, index = self.providers[name]
+            result = self.get(node)
+            return result if index is None else result[index]
+        if name in self.inputs:
+            return self.inputs[name]
+        raise KeyError('Unknown input {}'.format(name))
+
+    def get(self, name):
+        """ Gets result of node, evaluating it (and the nodes it reads) only where input values changed"""
+        function, inputs = self.nodes[name]
+        values = tuple(self.get_value(input_name) for input_name in inputs)
+        if name in self.results and is_equal(self.results[name][0], values):
+            self.hits += 1
+            return self.results[name][1]
+        with stage(name):
+            result = function(*values)
+        self.results[name] = (values, result)
+        self.ran.append(name)
+        return result
+
+    def get_dependencies(self, name):
+        """ Gets names of the widget inputs which node reads directly or through other nodes"""
+        dependencies = set()
+        for input_name in self.nodes[name][1]:
+            if input_name in self.providers:
+                dependencies |= self.get_dependencies(self.providers[input_name][0])
+            else:
+                dependencies.add(input_name)
+        return dependencies
+
+    def clear(self):
+        """ Clears memoized results"""
+        self.results = {}
+
+
+def get_graph(session_state, form, build_graph):
+    """ Gets compute graph of a form from the session state, built with build_graph(graph) on first use
+    form: form name, e.g. 'Secant piled shaft'
+    """
+    key = '_compute_graph_' + form
+    if key not in session_state:
+        graph = ComputeGraph()
+        build_graph(graph)
+        session_state[key] = graph
+    return session_state[key]
+
+
+def display_graph_panel(st, graph):
+    """ Displays nodes run and memoized in the current rerun in the sidebar, for debugging"""
+    st.sidebar.write('Nodes run: ' + (', '.join(graph.ran) if graph.ran else 'none'))
+    st.sidebar.write('Memoized results reused: {}'.format(graph.hits))
@@ -0,0 +1,158 @@
+import numpy as np
+from src.shaft_secant_piles import get_design_hoop_stress_for_plain_concrete
+from src.shaft_diaphragm_panels import get_number_of_panels
+
+# Critical depths and verticality limits for all structure types, in closed form
+# Depths z are measured from top of piles/ panels, deviations grow linearly from the drilling platform: x(z) = (H_drilling_platform + z)*v/100
+# Secant piles:  t_eff(z) = D - a - (4*H_drilling_platform + 2*z)*v/100, a = pi*(2*ri + D)/n_pieces for shafts
+#                t_eff(z) = t_req  ->  z = 100*(D - a - t_req)/(2*v) - 2*H_drilling_platform
+# Panels:        d_eff(z) = D - 2*(H_drilling_platform + z)*v/100
+#                d_eff(z) = d_req  ->  z = 100*(D - d_req)/(2*v) - H_drilling_platform
+# Panel shafts:  d_eff(z) = min((ri + D - x)/c, B/(2*s)) - (ri + x)/c, c = cos(pi/n_pieces), s = sin(pi/n_pieces) for the polygonal ring
+#                d_eff(z) = d_req  ->  x = min((D - c*d_req)/2, c*(B/(2*s) - d_req) - ri), z = 100*x/v - H_drilling_platform
+# t_req (d_req) is 0 for the depth at which interlock (contact) is lost, or the thickness needed for a hoop force F_hoop
+# assumed constant over depth. Critical depths and verticality limits are NaN where the requirement is not met even at top
+# (for vertical piles/ panels), as the design solvers of src.shaft_secant_piles_design which are built on these functions.
+# All inputs are scalars or numpy arrays which broadcast against each other.
+
+
+def get_required_overcut(D, t_min=0.0, F_hoop=None, gamma_G=1.35, f_ck=10.0, alpha_cc=0.7, gamma_c=1.5):
+    """ Gets the overcut t_eff required at a joint of secant piles
+    D: pile diameter [m]
+    t_min: minimum overcut for interlock [m]
+    F_hoop: hoop force [kN/m], None for checking interlock only
+    gamma_G, f_ck, alpha_cc, gamma_c: see check_for_hoop_force
+    """
+    D = np.asarray(D, dtype=float)
+    t_req = np.maximum(np.asarray(t_min, dtype=float), 0.0) + np.zeros_like(D)
+    if F_hoop is not None:
+        f_cd = get_design_hoop_stress_for_plain_concrete(f_ck, alpha_cc, gamma_c)
+        d_req = gamma_G*np.asarray(F_hoop, dtype=float)/1000/f_cd   # effective thickness required for hoop stress, m
+        with np.errstate(invalid='ignore'):
+            t_hoop = D - np.sqrt(D**2 - d_req**2)                   # smaller root of d_req**2 = t*(2*D - t)
+        t_req = np.where(d_req < D, np.maximum(t_req, t_hoop), np.nan)
+    return t_req
+
+
+def get_required_thickness_diaphragm_panels(d_min=0.0, F_hoop=None, gamma_G=1.35, f_ck=10.0, alpha_cc=0.7, gamma_c=1.5):
+    """ Gets the effective panel thickness d_eff required at a joint
+    d_min: minimum contact thickness [m]
+    F_hoop: hoop force [kN/m], None for checking contact only
+    gamma_G, f_ck, alpha_cc, gamma_c: see check_for_hoop_force
+    """
+    d_req = np.maximum(np.asarray(d_min, dtype=float), 0.0)
+    if F_hoop is not None:
+        f_cd = get_design_hoop_stress_for_plain_concrete(f_ck, alpha_cc, gamma_c)
+        d_req = np.maximum(d_req, gamma_G*np.asarray(F_hoop, dtype=float)/1000/f_cd)
+    return d_req
+
+
+def get_critical_depth_secant_piles(D, a, H_drilling_platform, v=0.75, t_min=0.0, F_hoop=None, gamma_G=1.35, f_ck=10.0, alpha_cc=0.7, gamma_c=1.5):
+    """ Gets the depth below top of piles at which interlock is lost (or d_eff drops below the thickness needed for F_hoop)
+    D: pile diameter [m]
+    a: C/C pile spacing at top [m]
+    H_drilling_platform: height of drilling platform above top of piles [m]
+    v: percentage of verticality [%]
+    t_min: minimum overcut for interlock [m]
+    F_hoop: hoop force [kN/m], None for interlock only
+    Returns critical depth [m], NaN where the requirement is not met even at top of piles
+    """
+    t_req = get_required_overcut(D, t_min, F_hoop, gamma_G, f_ck, alpha_cc, gamma_c)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = 100*(np.asarray(D) - np.asarray(a) - t_req)/(2*np.asarray(v)) - 2*np.asarray(H_drilling_platform)
+    return np.where(z >= 0, z, np.nan)
+
+
+def get_max_verticality_secant_piles(D, a, L, H_drilling_platform, t_min=0.0, F_hoop=None, gamma_G=1.35, f_ck=10.0, alpha_cc=0.7, gamma_c=1.5):
+    """ Gets the largest percentage of verticality v [%] for which piles interlock down to depth L (and d_eff suffices for F_hoop)
+    L: required depth, e.g. pile length [m]
+    See get_critical_depth_secant_piles for the other parameters
+    Returns v [%], NaN where the requirement is not met even for vertical piles
+    """
+    t_req = get_required_overcut(D, t_min, F_hoop, gamma_G, f_ck, alpha_cc, gamma_c)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        v = 100*(np.asarray(D) - np.asarray(a) - t_req)/(4*np.asarray(H_drilling_platform) + 2*np.asarray(L))
+    return np.where(v >= 0, v, np.nan)
+
+
+def get_critical_depth_shaft_secant_piles(ri, n_pieces, D, H_drilling_platform, v=0.75, **kwargs):
+    """ Gets critical depth for secant piled shaft, see get_critical_depth_secant_piles
+    ri: inner shaft radius [m]
+    n_pieces: number of piles
+    """
+    a = np.pi*(2*np.asarray(ri) + np.asarray(D))/np.asarray(n_pieces)
+    return get_critical_depth_secant_piles(D, a, H_drilling_platform, v, **kwargs)
+
+
+def get_max_verticality_shaft_secant_piles(ri, n_pieces, D, L, H_drilling_platform, **kwargs):
+    """ Gets maximum verticality for secant piled shaft, see get_max_verticality_secant_piles"""
+    a = np.pi*(2*np.asarray(ri) + np.asarray(D))/np.asarray(n_pieces)
+    return get_max_verticality_secant_piles(D, a, L, H_drilling_platform, **kwargs)
+
+
+def get_critical_depth_diaphragm_panels(D, H_drilling_platform, v=0.5, d_min=0.0, F_hoop=None, gamma_G=1.35, f_ck=10.0, alpha_cc=0.7, gamma_c=1.5):
+    """ Gets the depth below top of panels at which neighboring panels lose contact (or d_eff drops below the thickness needed for F_hoop)
+    D: panel thickness [m]
+    H_drilling_platform: height of drilling platform above top of panels [m]
+    v: percentage of verticality [%]
+    d_min: minimum contact thickness [m]
+    F_hoop: hoop force [kN/m], None for contact only
+    Returns critical depth [m], NaN where the requirement is not met even at top of panels
+    """
+    d_req = get_required_thickness_diaphragm_panels(d_min, F_hoop, gamma_G, f_ck, alpha_cc, gamma_c)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = 100*(np.asarray(D) - d_req)/(2*np.asarray(v)) - np.asarray(H_drilling_platform)
+    return np.where(z >= 0, z, np.nan)
+
+
+def get_max_verticality_diaphragm_panels(D, L, H_drilling_platform, d_min=0.0, F_hoop=None, gamma_G=1.35, f_ck=10.0, alpha_cc=0.7, gamma_c=1.5):
+    """ Gets the largest percentage of verticality v [%] for which panels keep contact down to depth L (and d_eff suffices for F_hoop)
+    L: required depth, e.g. panel length [m]
+    See get_critical_depth_diaphragm_panels for the other parameters
+    Returns v [%], NaN where the requirement is not met even for vertical panels
+    """
+    d_req = get_required_thickness_diaphragm_panels(d_min, F_hoop, gamma_G, f_ck, alpha_cc, gamma_c)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        v = 100*(np.asarray(D) - d_req)/(2*(np.asarray(H_drilling_platform) + np.asarray(L)))
+    return np.where(v >= 0, v, np.nan)
+
+
+
+def get_max_deviation_shaft_diaphragm_panels(ri, D, B, d_req):
+    """ Gets the largest deviation x of the panels of a polygonal ring for which d_eff >= d_req
+    ri: shaft inner radius [m]
+    D: panel thickness [m]
+    B: panel length [m]
+    d_req: required effective ring thickness, see get_required_thickness_diaphragm_panels [m]
+    """
+    ri, D, B = np.broadcast_arrays(*[np.asarray(p, dtype=float) for p in (ri, D, B)])
+    n_pieces = get_number_of_panels(ri, D, B)
+    c, s = np.cos(np.pi/n_pieces), np.sin(np.pi/n_pieces)
+    return np.minimum((D - c*d_req)/2, c*(B/(2*s) - d_req) - ri)
+
+
+def get_critical_depth_shaft_diaphragm_panels(ri, D, B, H_drilling_platform, v=0.5, d_min=0.0, F_hoop=None, gamma_G=1.35, f_ck=10.0, alpha_cc=0.7, gamma_c=1.5):
+    """ Gets the depth below top of panels at which the effective ring thickness of a diaphragm panel shaft drops below d_min
+    (or below the thickness needed for F_hoop), see get_parameters_shaft_diaphragm_panels_ring
+    ri: shaft inner radius [m]
+    B: panel length [m]
+    See get_critical_depth_diaphragm_panels for the other parameters
+    Returns critical depth [m], NaN where the requirement is not met even at top of panels
+    """
+    d_req = get_required_thickness_diaphragm_panels(d_min, F_hoop, gamma_G, f_ck, alpha_cc, gamma_c)
+    x_max = get_max_deviation_shaft_diaphragm_panels(ri, D, B, d_req)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = 100*x_max/np.asarray(v) - np.asarray(H_drilling_platform)
+    return np.where(z >= 0, z, np.nan)
+
+
+def get_max_verticality_shaft_diaphragm_panels(ri, D, B, L, H_drilling_platform, d_min=0.0, F_hoop=None, gamma_G=1.35, f_ck=10.0, alpha_cc=0.7, gamma_c=1.5):
+    """ Gets the largest percentage of verticality v [%] for which the effective ring thickness of a diaphragm panel shaft
+    suffices down to depth L, see get_critical_depth_shaft_diaphragm_panels for the parameters
+    Returns v [%], NaN where the requirement is not met even for vertical panels
+    """
+    d_req = get_required_thickness_diaphragm_panels(d_min, F_hoop, gamma_G, f_ck, alpha_cc, gamma_c)
+    x_max = get_max_deviation_shaft_diaphragm_panels(ri, D, B, d_req)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        v = 100*x_max/(np.asarray(H_drilling_platform) + np.asarray(L))
+    return np.where(v >= 0, v, np.nan)
@@ -0,0 +1,119 @@
+import numpy as np
+
+# Monte Carlo simulation of drilling deviations for secant piles
+# Each pile deviates linearly with depth in a random direction: the deviation of pile i at depth z below top of piles is
+#   e_i(z) = (H_drilling_platform + z)*v_i/100*(cos(phi_i), sin(phi_i))
+# with phi_i uniform in [0, 2*pi) and v_i = v (fixed magnitude) or uniform in [0, v] (random magnitude).
+# Two neighboring piles with c/c distance s at depth z overlap by the thickness d_eff = sqrt(D**2 - s**2),
+# a window opens where s >= D. As s(z) is convex in z, d_eff between two depths is bounded by its values at these depths.
+
+
+def draw_deviation_rates(rng, n_realizations, n_pieces, v, random_magnitude=True, dtype=np.float32):
+    """ Draws deviation rates (deviation per meter of drilling depth) for all piles of all realizations as one array
+    rng: numpy random Generator
+    n_realizations: number of realizations
+    n_pieces: number of piles
+    v: maximum percentage of verticality [%]
+    random_magnitude: draw deviation magnitude uniformly in [0, v], otherwise always v
+    dtype: float32 (default) is accurate to well below a millimeter and much faster than float64
+    Returns ux, uy of shape (n_realizations, n_pieces) [m/m]
+    """
+    angles_deviation = rng.random((n_realizations, n_pieces), dtype=dtype)
+    angles_deviation *= 2*np.pi
+    if random_magnitude:
+        magnitude = rng.random((n_realizations, n_pieces), dtype=dtype)
+        magnitude *= v/100
+    else:
+        magnitude = dtype(v/100)
+    ux = np.cos(angles_deviation)
+    ux *= magnitude
+    uy = np.sin(angles_deviation, out=angles_deviation)
+    uy *= magnitude
+    return ux, uy
+
+
+def simulate_secant_piles_deviation(xc, yc, D, z, H_drilling_platform, v, n_realizations=10000, closed=True, random_magnitude=True,
+                                    seed=None, max_chunk_size=2**22):
+    """ Simulates the overlap between neighboring secant piles with random drilling deviations
+    xc, yc: design coordinates of pile centers at top of piles, neighboring piles are consecutive [m]
+    D: pile diameter [m]
+    z: depth or array of depths below top of piles at which the overlaps are evaluated [m]
+    H_drilling_platform: height of drilling platform above top of piles [m]
+    v: maximum percentage of verticality [%]
+    n_realizations: number of realizations
+    closed: last pile is neighbor of first pile (shaft)
+    random_magnitude: see draw_deviation_rates
+    seed: seed or numpy random Generator
+    max_chunk_size: maximum number of piles x realizations simulated at once, bounds the memory use
+    Returns probability of at least one window over all joints and depths, and minimum d_eff for each realization (0.0 for a window) [m]
+    """
+    rng = np.random.default_rng(seed)
+    xc = np.asarray(xc, dtype=float)
+    yc = np.asarray(yc, dtype=float)
+    h = H_drilling_platform + np.atleast_1d(np.asarray(z, dtype=float)) # drilling depths
+    n_pieces = xc.size
+
+    # design c/c vectors between neighboring piles
+    if closed:
+        dcx = np.roll(xc, -1) - xc
+        dcy = np.roll(yc, -1) - yc
+    else:
+        dcx = np.diff(xc)
+        dcy = np.diff(yc)
+
+    s2_max = np.empty(n_realizations)   # maximum squared c/c distance over joints and depths in each realization
+    chunk_size = max(1, max_chunk_size//n_pieces)
+    for start in range(0, n_realizations, chunk_size):
+        stop = min(start + chunk_size, n_realizations)
+        ux, uy = draw_deviation_rates(rng, stop - start, n_pieces, v, random_magnitude)
+        if closed:
+            dux = np.roll(ux, -1, axis=1) - ux
+            duy = np.roll(uy, -1, axis=1) - uy
+        else:
+            dux = np.diff(ux, axis=1)
+            duy = np.diff(uy, axis=1)
+        del ux, uy
+        # s**2 = |dc|**2 + 2*h*(dc.du) + h**2*|du|**2 at drilling depth h
+        dc_du = dux*dcx.astype(dux.dtype)
+        dc_du += duy*dcy.astype(duy.dtype)
+        du_du = dux*dux
+        du_du += duy*duy
+        dc_dc = (dcx*dcx + dcy*dcy).astype(dux.dtype)
+        s2_max[start:stop] = 0.0
+        for hk in h:
+            s2 = du_du*dux.dtype.type(hk**2)
+            s2 += dc_du*dux.dtype.type(2*hk)
+            s2 += dc_dc
+            np.maximum(s2_max[start:stop], s2.max(axis=1), out=s2_max[start:stop])
+
+    d_eff_min = np.sqrt(np.maximum(D**2 - s2_max, 0.0))
+    p_window = np.mean(s2_max >= D**2)
+
+    return p_window, d_eff_min
+
+
+def simulate_shaft_secant_piles_deviation(ri, n_pieces, D, L, H_drilling_platform, v, n_realizations=10000, z=None, **kwargs):
+    """ Simulates random drilling deviations for secant piled shaft
+    ri: inner shaft radius [m]
+    n_pieces: number of piles
+    z: depth or array of depths below top of piles, defaults to top and toe of piles [m]
+    See simulate_secant_piles_deviation for the other parameters and returns
+    """
+    angles = np.linspace(0, 2*np.pi-2*np.pi/n_pieces, n_pieces)
+    r = ri + D/2
+    if z is None:
+        z = [0.0, L]
+    return simulate_secant_piles_deviation(r*np.cos(angles), r*np.sin(angles), D, z, H_drilling_platform, v, n_realizations, closed=True, **kwargs)
+
+
+def simulate_wall_secant_piles_deviation(n_pieces, a, D, L, H_drilling_platform, v, n_realizations=10000, z=None, **kwargs):
+    """ Simulates random drilling deviations for straight secant piled wall
+    n_pieces: number of piles
+    a: C/C pile spacing b/w two neighboring piles [m]
+    z: depth or array of depths below top of piles, defaults to top and toe of piles [m]
+    See simulate_secant_piles_deviation for the other parameters and returns
+    """
+    x = np.linspace(0.0, (n_pieces-1)*a, n_pieces)
+    if z is None:
+        z = [0.0, L]
+    return simulate_secant_piles_deviation(x, np.zeros_like(x), D, z, H_drilling_platform, v, n_realizations, closed=False, **kwargs)
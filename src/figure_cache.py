@@ -0,0 +1,99 @@
+import hashlib
+import threading
+from io import BytesIO
+from collections import OrderedDict
+import numpy as np
+from src.timing import stage
+
+
+class FigureCache:
+    """ Bounded LRU cache of rendered figures
+
+    Figures are stored as PNG or SVG bytes, not as live matplotlib Figure objects. The key is a hash of the plot function,
+    its geometry arguments and the seed for random drilling deviations, so changing material or load parameters never
+    triggers a re-render. Lookup, insertion and eviction hold a lock, so that the cache is shared by the script threads of
+    all sessions, rendering happens outside of it.
+    """
+
+    def __init__(self, max_size=64, max_bytes=64*1024**2):
+        """ Initializes cache
+        max_size: maximum number of figures
+        max_bytes: maximum total size of stored figures [bytes], None for no limit
+        """
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+        self._n_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def get_key(plot_function, args, kwargs, fmt):
+        """ Gets hash of plot function, arguments and figure format"""
+        def normalize(value):
+            if isinstance(value, np.generic):
+                return value.item()
+            if isinstance(value, np.ndarray):
+                return value.tolist()
+            return value
+        key = (plot_function.__module__, plot_function.__name__, fmt, tuple(normalize(arg) for arg in args),
+               tuple(sorted((name, normalize(value)) for name, value in kwargs.items())))
+        return hashlib.sha1(repr(key).encode()).hexdigest()
+
+    def get_or_render(self, plot_function, *args, fmt='png', dpi=100, **kwargs):
+        """ Gets rendered figure bytes from cache, or calls plot_function(*args, **kwargs) and renders its figure on a miss
+        Pass seed=... in kwargs for plots with random drilling deviations, otherwise the cached figure is reused for any seed
+        fmt: 'png' or 'svg'
+        """
+        import matplotlib.pyplot as plt
+
+        key = self.get_key(plot_function, args, kwargs, (fmt, dpi))
+        with self._lock:
+            if key in self._figures:
+                self._figures.move_to_end(key)
+                self.hits += 1
+                return self._figures[key]
+            self.misses += 1
+
+        with stage(plot_function.__name__):
+            fig = plot_function(*args, **kwargs)
+        with stage('savefig'):
+            buffer = BytesIO()
+            fig.savefig(buffer, format=fmt, dpi=dpi)
+            plt.close(fig)
+        figure_bytes = buffer.getvalue()
+
+        with self._lock:
+            if key not in self._figures:    # else rendered meanwhile by another thread
+                self._figures[key] = figure_bytes
+                self._n_bytes += len(figure_bytes)
+            self._evict()
+        return figure_bytes
+
+    def _evict(self):
+        """ Removes least recently used figures until the size limits are met, call with the lock held"""
+        while len(self._figures) > self.max_size or (self.max_bytes is not None and self._n_bytes > self.max_bytes and len(self._figures) > 1):
+            _, figure_bytes = self._figures.popitem(last=False)
+            self._n_bytes -= len(figure_bytes)
+            self.evictions += 1
+
+    def cache_info(self):
+        """ Gets hit/miss statistics"""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'size': len(self._figures),
+                    'max_size': self.max_size, 'n_bytes': self._n_bytes, 'max_bytes': self.max_bytes}
+
+    def clear(self):
+        """ Removes all figures and resets statistics"""
+        with self._lock:
+            self._figures.clear()
+            self._n_bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+
+# Cache shared by all forms and sessions of the app
+figure_cache = FigureCache()
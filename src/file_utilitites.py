@@ -1,10 +1,9 @@
-import json
 import base64
-from io import StringIO, BytesIO
+from io import BytesIO
 import streamlit as st
 #import fpdf as FPDF
-from matplotlib.backends.backend_pdf import PdfPages
 from tempfile import NamedTemporaryFile
+from src.session_format import assign_parameters, dumps_project, load_project, get_structure_from_parameters
 #from src.report import Report
 
 
@@ -15,80 +14,72 @@ def st_csv_download_button(df, download_filename):
     st.markdown(href, unsafe_allow_html=True)  
 
 def st_json_download_button(json_object, download_filename):
-    json_object_to_download = json.dumps(str(json_object))
+    """ Gets download link for project file with the structure of the selected form in session state"""
+    form = json_object['selected_form']
+    return get_project_download_link([(form, json_object)], download_filename)
+
+
+def get_project_download_link(structures, download_filename, text='Download session state JSON file'):
+    """ Gets download link for project file with structures as (form, parameters) pairs"""
+    json_object_to_download = dumps_project(structures)
     b64 = base64.b64encode(json_object_to_download.encode()).decode()
-    href = f'<a download="{download_filename}" href="data:file/csv;base64,{b64}">Download session state JSON file</a>'
+    href = f'<a download="{download_filename}" href="data:application/json;base64,{b64}">{text}</a>'
     return href
     #st.markdown(href, unsafe_allow_html=True)  
 
 
-def load_parameters_from_json_file(uploaded_file):
-    """ Unpacks json data file """
-    data_dict = eval(StringIO(uploaded_file.getvalue().decode("utf-8")).read())     # data_dict is str representation of dict
-    parameters = eval(data_dict)                                                    # eval str to get dict
+def load_structures_from_json_file(uploaded_file):
+    """ Unpacks project file, returns list of (form, parameters) pairs"""
+    uploaded_file.seek(0)
+    return load_project(uploaded_file)
+
+def load_parameters_from_json_file(uploaded_file, index=0):
+    """ Unpacks project file, returns parameters of the structure at index with its form as 'selected_form' """
+    form, parameters = load_structures_from_json_file(uploaded_file)[index]
+    parameters['selected_form'] = form
     return parameters
 
 def load_parameters_from_json_file_sps(uploaded_file):
     """ Unpacks json data file for secant piled shaft"""
-    data_dict = eval(StringIO(uploaded_file.getvalue().decode("utf-8")).read()) # data_dict is str representation of dict
-    parameters = assign_session_state_parameters_shaft_secant_piles(**eval(data_dict))             # eval str to get dict, then unpack
+    parameters = assign_session_state_parameters_shaft_secant_piles(**load_parameters_from_json_file(uploaded_file))
     return parameters
 
 
 def load_parameters_from_json_file_sdw(uploaded_file):
     """ Unpacks json data file for diaphragm panels shaft"""
-    data_dict = eval(StringIO(uploaded_file.getvalue().decode("utf-8")).read()) # data_dict is str representation of dict
-    parameters = assign_session_state_parameters_shaft_diaphragm_panels(**eval(data_dict))             # eval str to get dict, then unpack
+    parameters = assign_session_state_parameters_shaft_diaphragm_panels(**load_parameters_from_json_file(uploaded_file))
     return parameters
 
 
 def load_parameters_from_json_file_dw(uploaded_file):
     """ Unpacks json data file for diaphragm panels wall"""
-    data_dict = eval(StringIO(uploaded_file.getvalue().decode("utf-8")).read()) # data_dict is str representation of dict
-    parameters = assign_session_state_parameters_wall_diaphragm_panels(**eval(data_dict))             # eval str to get dict, then unpack
+    parameters = assign_session_state_parameters_wall_diaphragm_panels(**load_parameters_from_json_file(uploaded_file))
     return parameters
 
 
 def load_parameters_from_json_file_spw(uploaded_file):
     """ Unpacks json data file for secant pile wall"""
-    data_dict = eval(StringIO(uploaded_file.getvalue().decode("utf-8")).read()) # data_dict is str representation of dict
-    parameters = assign_session_state_parameters_wall_secant_piles(**eval(data_dict))             # eval str to get dict, then unpack
+    parameters = assign_session_state_parameters_wall_secant_piles(**load_parameters_from_json_file(uploaded_file))
     return parameters
 
 
-def assign_session_state_parameters_shaft_secant_piles(project_name="Sample project", project_revision="First issue, rev0", shaft_name="Shaft 1", di=10.0, D=1.2,
-            n_pieces=40, L=30.5, v=0.5, H_drilling_platform=0.0, E=3.0e6, F_hoop_at_base=700.0, gamma_G=1.35, f_ck=10.0, alpha_cc=0.7, gamma_c=1.5, 
-            check_more=False, F_hoop=500.0, L_hoop=10.0, **kwargs):
-    """ Assigns parameters for session state for secant piled shaft"""
-    parameters_updated = {"project_name": project_name, "project_revision": project_revision, "shaft_name": shaft_name, "di": di, "D": D,
-            "n_pieces": n_pieces, "L": L, "v": v, "H_drilling_platform": H_drilling_platform, "E": E, "F_hoop_at_base": F_hoop_at_base, "gamma_G": gamma_G, "f_ck": f_ck, "alpha_cc": alpha_cc, "gamma_c": gamma_c, 
-            "check_more": check_more, "F_hoop": F_hoop, "L_hoop": L_hoop}
-    return parameters_updated
+def assign_session_state_parameters_shaft_secant_piles(**kwargs):
+    """ Assigns parameters for session state for secant piled shaft, see SCHEMA in src.session_format for defaults"""
+    return assign_parameters('Secant piled shaft', **kwargs)
 
-def assign_session_state_parameters_shaft_diaphragm_panels(project_name_dws="Sample project", project_revision_dws="First issue, rev0", shaft_name_dws="Shaft 1", di_dws=10.0, D_dws=1.2,
-            B_dws=2.8, L_dws=30.5, v_dws=0.5, H_drilling_platform_dws=0.0, F_hoop_at_base_dws=700.0, gamma_G_dws=1.35, f_ck_dws=10.0, alpha_cc_dws=0.7, gamma_c_dws=1.5, 
-            check_more_dws=False, F_hoop_dws=500.0, L_hoop_dws=10.0, **kwargs):
-    """ Assigns parameters for session state for secant piled shaft"""
-    parameters_updated = {"project_name_dws": project_name_dws, "project_revision_dws": project_revision_dws, "shaft_name_dws": shaft_name_dws, "di_dws": di_dws, "D_dws": D_dws,
-            "B_dws": B_dws, "L_dws": L_dws, "v_dws": v_dws, "H_drilling_platform_dws": H_drilling_platform_dws, "F_hoop_at_base_dws": F_hoop_at_base_dws, "gamma_G_dws": gamma_G_dws, "f_ck_dws": f_ck_dws, "alpha_cc_dws": alpha_cc_dws, "gamma_c_dws": gamma_c_dws, 
-            "check_more_dws": check_more_dws, "F_hoop_dws": F_hoop_dws, "L_hoop_dws": L_hoop_dws}
-    return parameters_updated
+def assign_session_state_parameters_shaft_diaphragm_panels(**kwargs):
+    """ Assigns parameters for session state for diaphragm panel shaft, see SCHEMA in src.session_format for defaults"""
+    return assign_parameters('Diaphragm panel shaft', **kwargs)
 
 
-def assign_session_state_parameters_wall_diaphragm_panels(project_name_dw="Sample project", project_revision_dw="First issue, rev0", wall_name_dw="Wall 1", D_dw=1.2,
-            B_dw=2.8, L_dw=35.0, v_dw=0.5, H_drilling_platform_dw=0.0, **kwargs):
-    """ Assigns parameters for session state for secant piled shaft"""
-    parameters_updated = {"project_name_dw": project_name_dw, "project_revision_dw": project_revision_dw, "wall_name_dw": wall_name_dw, "D_dw": D_dw,
-            "B_dw": B_dw, "L_dw": L_dw, "v_dw": v_dw, "H_drilling_platform_dw": H_drilling_platform_dw}
-    return parameters_updated
+def assign_session_state_parameters_wall_diaphragm_panels(**kwargs):
+    """ Assigns parameters for session state for diaphragm panel wall, see SCHEMA in src.session_format for defaults"""
+    return assign_parameters('Diaphragm panel wall', **kwargs)
 
 
-def assign_session_state_parameters_wall_secant_piles(project_name_spw="Sample project", project_revision_spw="First issue, rev0", wall_name_spw="Wall 1", a_spw=0.75, D_spw=1.2,
-            n_pieces_spw=10, L_spw=25.0, v_spw=0.75, H_drilling_platform_spw=0.0, plotting_option_spw='Two piles apart', **kwargs):
-    """ Assigns parameters for session state for secant piled wall"""
-    parameters_updated = {"project_name_spw": project_name_spw, "project_revision_spw": project_revision_spw, "wall_name_spw": wall_name_spw, "a_spw": a_spw, "D_spw": D_spw,
-            "n_pieces_spw": n_pieces_spw, "L_spw": L_spw, "v_spw": v_spw, "H_drilling_platform_spw": H_drilling_platform_spw, "plotting_option_spw": plotting_option_spw}
-    return parameters_updated
+def assign_session_state_parameters_wall_secant_piles(**kwargs):
+    """ Assigns parameters for session state for secant piled wall, see SCHEMA in src.session_format for defaults"""
+    return assign_parameters('Secant piled wall', **kwargs)
 
 
 
@@ -108,16 +99,21 @@ def create_download_link(val, filename):
 #    html = create_download_link(pdf.output(dest="S").encode("latin-1"), "Resultatfil")
 #    st.markdown(html, unsafe_allow_html=True)
 
-def export_as_pdf(fig, output_file_name):
-    #tfile = NamedTemporaryFile(delete=False)
-    #pp = PdfPages(tfile)
+def export_as_pdf(figs, output_file_name):
+    """ Exports one figure or a list of figures as pages of a PDF file download link"""
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    if not isinstance(figs, (list, tuple)):
+        figs = [figs]
     tfile = BytesIO()
-    #for fig in figs:
-    #    fig.savefig(buffered,format='PDF')#)
-    fig.savefig(tfile, format='pdf')#)
-    #fig.show()
+    with PdfPages(tfile) as pdf:
+        for fig in figs:
+            pdf.savefig(fig)
 
-    #pp_str = base64.b64encode(tfile).decode()
     pp_str = tfile.getvalue()
     create_download_link(pp_str, output_file_name)
-    #st.write('Up here!!!')
\ No newline at end of file
+
+
+def get_structure_from_session_state(session_state):
+    """ Gets structure dict of the selected form, with parameter names without key suffixes (see src.batch)"""
+    return get_structure_from_parameters(session_state['selected_form'], session_state)
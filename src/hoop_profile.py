@@ -0,0 +1,118 @@
+import numpy as np
+from io import StringIO
+from src.shaft_secant_piles import get_parameters_shaft_secant_piles_batch, check_for_hoop_force
+from src.shaft_diaphragm_panels import get_parameters_shaft_diaphragm_panels_batch, get_joint_parameters_shaft_diaphragm_panels
+
+# Hoop check along the full shaft depth instead of at single depths
+
+
+def get_depth_profile_shaft_secant_piles(ri, n_pieces, D, L, H_drilling_platform, v=0.75, n_points=2000):
+    """ Gets effective thickness d_eff(z) along secant piled shaft in one vectorized pass
+    n_points: number of depths from top (z = 0) to base (z = L) of shaft
+    See get_parameters_shaft_secant_piles for the other parameters
+    Returns depths z [m] and d_eff(z) [m], d_eff is NaN where piles do not touch
+    """
+    z = np.linspace(0.0, L, n_points)
+    d_eff = get_parameters_shaft_secant_piles_batch(ri, n_pieces, D, z, H_drilling_platform, v)[6]
+    return z, d_eff
+
+
+def get_depth_profile_shaft_diaphragm_panels(D, L, H_drilling_platform, v=0.5, n_points=2000):
+    """ Gets effective thickness d_eff(z) along diaphragm panel shaft in one vectorized pass
+    n_points: number of depths from top (z = 0) to base (z = L) of shaft
+    See get_parameters_shaft_diaphragm_panels for the other parameters
+    Returns depths z [m] and d_eff(z) [m], panels do not touch where d_eff <= 0
+    """
+    z = np.linspace(0.0, L, n_points)
+    d_eff = get_parameters_shaft_diaphragm_panels_batch(D, z, H_drilling_platform, v)[2]
+    return z, d_eff
+
+
+def get_depth_profile_shaft_diaphragm_panels_ring(ri, D, B, L, H_drilling_platform, v=0.5, n_points=2000, directions=None):
+    """ Gets effective ring thickness d_eff(z) along diaphragm panel shaft as polygonal ring, the weakest joint at each depth
+    n_points: number of depths from top (z = 0) to base (z = L) of shaft
+    See get_joint_parameters_shaft_diaphragm_panels for the other parameters
+    Returns depths z [m] and d_eff(z) [m], panels do not touch where d_eff <= 0
+    """
+    z = np.linspace(0.0, L, n_points)
+    d_eff = get_joint_parameters_shaft_diaphragm_panels(ri, D, B, z, H_drilling_platform, v, directions)[2]
+    return z, d_eff.min(axis=0)
+
+
+def get_hoop_force_from_table(z, z_table, F_hoop_table):
+    """ Gets hoop force F_hoop(z) by linear interpolation in a table
+    z: depths [m]
+    z_table: depths of table rows in increasing order [m]
+    F_hoop_table: hoop forces of table rows [kN/m]
+    """
+    return np.interp(z, z_table, F_hoop_table)
+
+
+def get_hoop_force_from_earth_pressure(z, r, z_bottom, gamma, K, z_water=None, gamma_w=10.0, q=0.0):
+    """ Gets hoop force F_hoop(z) = r*p(z) in a ring loaded by layered earth pressure p(z) = K*sigma_v' + u
+    z: depths below top of shaft [m]
+    r: radius of shaft at which the earth pressure acts [m]
+    z_bottom: depths of layer bottoms in increasing order, the last layer extends downwards [m]
+    gamma: unit weights of layers [kN/m^3]
+    K: earth pressure coefficients of layers [-]
+    z_water: depth of ground water table, None for dry ground [m]
+    gamma_w: unit weight of water [kN/m^3]
+    q: surcharge on ground surface [kPa]
+    """
+    z = np.asarray(z, dtype=float)
+    z_bottom = np.atleast_1d(np.asarray(z_bottom, dtype=float))
+    z_top = np.concatenate(([0.0], z_bottom[:-1]))
+    thickness = np.concatenate((np.diff(np.concatenate(([0.0], z_bottom)))[:-1], [np.inf]))
+
+    # total vertical stress, pore pressure and effective vertical stress
+    sigma_v = q + np.sum(np.asarray(gamma)*np.clip(z[..., np.newaxis] - z_top, 0.0, thickness), axis=-1)
+    u = 0.0 if z_water is None else gamma_w*np.maximum(z - z_water, 0.0)
+    sigma_v_eff = sigma_v - u
+
+    K_z = np.asarray(K, dtype=float)[np.minimum(np.searchsorted(z_bottom, z), z_bottom.size - 1)]
+    p = K_z*sigma_v_eff + u
+    return r*p
+
+
+def check_for_hoop_force_profile(z, F_hoop, d_eff, gamma_G, f_ck, alpha_cc=0.7, gamma_c=1.5):
+    """ Checks for hoop stress at all depths
+    z: depths [m]
+    F_hoop: hoop forces at depths z [kN/m]
+    d_eff: effective thicknesses at depths z [m], NaN or d_eff <= 0 means no contact (infinite utilisation)
+    Returns governing depth [m], maximum utilisation [-] and utilisation sigma_cd/f_cd at depths z [-]
+    """
+    touch = d_eff > 0
+    sigma_cd, f_cd = check_for_hoop_force(F_hoop, np.where(touch, d_eff, 1.0), gamma_G, f_ck, alpha_cc, gamma_c)
+    utilisation = np.where(touch, sigma_cd/f_cd, np.inf)
+    i_governing = np.argmax(utilisation)
+    return z[i_governing], utilisation[i_governing], utilisation
+
+
+def read_table_from_text(text, n_columns):
+    """ Reads a comma separated table of numbers from text, e.g. from a text area
+    n_columns: expected number of columns
+    Returns columns as arrays
+    """
+    table = np.loadtxt(StringIO(text), delimiter=',', ndmin=2)
+    if table.shape[1] != n_columns:
+        raise ValueError('Expected {0} columns, got {1}'.format(n_columns, table.shape[1]))
+    return table.T
+
+
+def plot_hoop_utilisation_profile(z, utilisation, z_governing=None, shaft_name='Shaft'):
+    """ Plots utilisation sigma_cd/f_cd against depth as a single line
+    """
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots()
+    ax.plot(np.where(np.isfinite(utilisation), utilisation, np.nan), z, color='black')
+    ax.axvline(1.0, color='red', linestyle='--')
+    if z_governing is not None:
+        ax.axhline(z_governing, color='gray', linestyle=':')
+    ax.set_xlabel('Utilisation sigma_cd/f_cd [-]')
+    ax.set_ylabel('Depth from top of shaft [m]')
+    ax.set_title(shaft_name + ' hoop stress utilisation')
+    ax.set_xlim(left=0.0)
+    ax.invert_yaxis()
+    ax.grid(True)
+    return fig
@@ -0,0 +1,157 @@
+import numpy as np
+
+# As-built check of secant piles from inclinometer surveys
+# A survey log gives the measured offsets dx, dy of the pile axis from its design center against depth z below top of
+# piles. All logs are interpolated onto a common depth grid, then the c/c distance s of each pair of neighboring piles
+# gives the real overlap at every depth: d_eff = sqrt(D**2 - s**2), a window opens where s >= D.
+# Logs are stored in long format, one row per reading: pile index, z [m], dx [m], dy [m], the readings of each pile in
+# consecutive rows, so that memory-mapped archives are interpolated block by block of piles.
+
+LOG_COLUMNS = ['pile', 'z', 'dx', 'dy']
+
+
+def load_inclinometer_logs(file_name):
+    """ Loads inclinometer logs of all piles
+    file_name: .npy file of shape (n_readings, 4), memory-mapped, see convert_csv_to_npy
+               .npz file with arrays 'pile', 'z', 'dx', 'dy'
+               .csv file with header pile,z,dx,dy
+    Returns pile, z, dx, dy as arrays of shape (n_readings,)
+    """
+    if file_name.lower().endswith('.npy'):
+        table = np.load(file_name, mmap_mode='r')
+        return tuple(table[:, i] for i in range(4))
+    if file_name.lower().endswith('.npz'):
+        with np.load(file_name) as data:
+            return tuple(data[column] for column in LOG_COLUMNS)
+    table = np.loadtxt(file_name, delimiter=',', skiprows=1, ndmin=2)
+    return tuple(table[:, i] for i in range(4))
+
+
+def convert_csv_to_npy(csv_file, npy_file, chunk_rows=1000000):
+    """ Converts a CSV file of logs (header pile,z,dx,dy) to a .npy file that can be memory-mapped
+    The CSV file is read in chunks of chunk_rows readings, so that archives larger than memory can be converted
+    Returns number of readings
+    """
+    with open(csv_file) as f:
+        n_readings = sum(1 for line in f if line.strip()) - 1
+    table = np.lib.format.open_memmap(npy_file, mode='w+', dtype=float, shape=(n_readings, 4))
+    with open(csv_file) as f:
+        f.readline()    # header
+        start = 0
+        while start < n_readings:
+            chunk = np.loadtxt(f, delimiter=',', max_rows=chunk_rows, ndmin=2)
+            table[start:start + len(chunk)] = chunk
+            start += len(chunk)
+    table.flush()
+    return n_readings
+
+
+def interpolate_logs(pile, z, dx, dy, z_grid, n_piles=None, block_size=1000000):
+    """ Interpolates the logs of all piles linearly onto a common depth grid
+    The readings are processed in blocks of about block_size readings which end where the pile changes, so that a
+    memory-mapped archive larger than memory is read block by block and only the grids of all piles are held in memory.
+    The readings of each pile must then be consecutive, as written pile by pile, in any order of depth.
+    pile, z, dx, dy: readings in long format, see load_inclinometer_logs
+    z_grid: depths below top of piles [m]
+    n_piles: number of piles, defaults to the largest pile index + 1
+    block_size: number of readings per block, None for all readings at once in any order
+    Returns dx, dy of shape (n_piles, len(z_grid)) [m], NaN outside the surveyed depths of a pile
+    """
+    z_grid = np.asarray(z_grid, dtype=float)
+    n_readings = len(pile)
+    if n_piles is None:
+        n_piles = int(np.max(pile)) + 1
+    if block_size is None:
+        block_size = max(n_readings, 1)
+    dx_grid = np.full((n_piles, z_grid.size), np.nan)
+    dy_grid = np.full((n_piles, z_grid.size), np.nan)
+    done = np.zeros(n_piles, dtype=bool)
+
+    start = 0
+    while start < n_readings:
+        stop = min(start + block_size, n_readings)
+        last = pile[stop - 1]
+        while stop < n_readings:    # extend block to the last reading of its last pile
+            change = np.flatnonzero(np.asarray(pile[stop:stop + block_size]) != last)
+            if change.size:
+                stop += int(change[0])
+                break
+            stop += block_size
+        stop = min(stop, n_readings)
+
+        block_pile = np.asarray(pile[start:stop]).astype(np.int64)
+        piles = np.unique(block_pile)
+        if done[piles].any():
+            raise ValueError('Readings of pile {} are not consecutive, sort the logs by pile or use block_size=None'.format(piles[done[piles]][0]))
+        done[piles] = True
+        dx_grid[piles], dy_grid[piles] = interpolate_logs_block(np.searchsorted(piles, block_pile), z[start:stop], dx[start:stop], dy[start:stop],
+                                                                z_grid, piles.size)
+        start = stop
+    return dx_grid, dy_grid
+
+
+def interpolate_logs_block(pile, z, dx, dy, z_grid, n_piles):
+    """ Interpolates the logs of a block of piles onto a common depth grid in one pass
+    The readings of all piles are put on one axis with key pile*span + z, so that a single searchsorted finds the
+    readings around each grid depth of each pile
+    pile: pile indices 0 .. n_piles - 1 of the readings
+    Returns dx, dy of shape (n_piles, len(z_grid)) [m], see interpolate_logs
+    """
+    pile = np.asarray(pile).astype(np.int64)
+    z = np.asarray(z, dtype=float)
+    span = 2.0*(max(np.max(np.abs(z)), np.max(np.abs(z_grid))) + 1.0)    # depth range of keys of each pile
+    key = pile*span + z
+    order = np.argsort(key, kind='stable')
+    key = key[order]
+    pile = pile[order]
+    dx = np.asarray(dx, dtype=float)[order]
+    dy = np.asarray(dy, dtype=float)[order]
+
+    key_grid = (np.arange(n_piles)[:, np.newaxis]*span + z_grid).ravel()
+    i1 = np.clip(np.searchsorted(key, key_grid, side='right'), 1, key.size - 1)
+    i0 = i1 - 1
+    pile_grid = np.repeat(np.arange(n_piles), z_grid.size)
+    inside = (pile[i0] == pile_grid) & ((key[i0] == key_grid) | ((pile[i1] == pile_grid) & (key[i0] <= key_grid) & (key_grid <= key[i1])))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        w = np.where((key[i1] > key[i0]) & (key[i0] != key_grid), (key_grid - key[i0])/(key[i1] - key[i0]), 0.0)
+    dx_grid = np.where(inside, dx[i0] + w*(dx[i1] - dx[i0]), np.nan).reshape(n_piles, z_grid.size)
+    dy_grid = np.where(inside, dy[i0] + w*(dy[i1] - dy[i0]), np.nan).reshape(n_piles, z_grid.size)
+    return dx_grid, dy_grid
+
+
+def get_joint_gaps(xc, yc, dx_grid, dy_grid, D, pairs=None, closed=False):
+    """ Gets c/c distance, effective thickness and windows of all joints at all depths
+    xc, yc: design coordinates of pile centers [m]
+    dx_grid, dy_grid: measured offsets from design centers of shape (n_piles, n_depths), see interpolate_logs [m]
+    D: pile diameter [m]
+    pairs: joints as pairs of pile indices, defaults to consecutive piles (see src.wall_alignment.get_neighbor_pairs for other walls)
+    closed: last pile is neighbor of first pile (shaft), only for the default pairs
+    Returns c/c distances s, d_eff (0.0 for windows, NaN without survey data) and windows (bool), each of shape (n_pairs, n_depths)
+    """
+    xc = np.asarray(xc, dtype=float)
+    yc = np.asarray(yc, dtype=float)
+    if pairs is None:
+        i = np.arange(xc.size if closed else xc.size - 1)
+        pairs = np.column_stack((i, (i + 1) % xc.size))
+    i, j = pairs[:, 0], pairs[:, 1]
+    sx = (xc[j] - xc[i])[:, np.newaxis] + dx_grid[j] - dx_grid[i]
+    sy = (yc[j] - yc[i])[:, np.newaxis] + dy_grid[j] - dy_grid[i]
+    s = np.hypot(sx, sy)
+    with np.errstate(invalid='ignore'):
+        d_eff = np.sqrt(np.maximum(D**2 - s**2, 0.0))
+        window = s >= D
+    return s, d_eff, window
+
+
+def get_joint_summary(z_grid, d_eff, window):
+    """ Gets minimum effective thickness and first window of each joint
+    z_grid: depths [m]
+    d_eff, window: see get_joint_gaps
+    Returns minimum d_eff [m], depth of minimum d_eff [m] and depth of first window [m] (NaN for no window) of each joint
+    """
+    d_eff_filled = np.where(np.isnan(d_eff), np.inf, d_eff)
+    i_min = np.argmin(d_eff_filled, axis=1)
+    d_eff_min = d_eff_filled[np.arange(len(d_eff)), i_min]
+    d_eff_min[np.isinf(d_eff_min)] = np.nan
+    z_window = np.where(window.any(axis=1), np.asarray(z_grid)[np.argmax(window, axis=1)], np.nan)
+    return d_eff_min, np.asarray(z_grid)[i_min], z_window
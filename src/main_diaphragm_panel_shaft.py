@@ -1,12 +1,41 @@
 import numpy as np
-from src.shaft_diaphragm_panels import (get_parameters_shaft_diaphragm_panels, plot_shaft_diaphragm_panels)
+from functools import partial
+from src.shaft_diaphragm_panels import (get_parameters_shaft_diaphragm_panels_ring, plot_shaft_diaphragm_panels)
 from src.shaft_secant_piles import check_for_hoop_force
+from src.figure_cache import figure_cache
+from src.compute_graph import get_graph
+from src.mesh_export import get_shaft_diaphragm_panels_mesh, get_mesh_bytes
+from src.design_limits import get_critical_depth_shaft_diaphragm_panels, get_max_verticality_shaft_diaphragm_panels
+from src.sensitivities import get_sensitivities_shaft_diaphragm_panels, plot_tornado
+from src.hoop_profile import (get_depth_profile_shaft_diaphragm_panels_ring, get_hoop_force_from_table, get_hoop_force_from_earth_pressure,
+                              check_for_hoop_force_profile, read_table_from_text, plot_hoop_utilisation_profile)
 
 # Initial parameters
 parameters_init = {"project_name_dws": "Sample project", "project_revision_dws": "First issue, rev0", "shaft_name_dws": "Shaft 1", "di_dws": 12.0, "D_dws": 0.8,
             "B_dws": 2.8, "L_dws": 51.3, "v_dws": 0.4, "H_drilling_platform_dws": 0.0, 
             "F_hoop_at_base_dws": 1200.0, "gamma_G_dws": 1.35, "f_ck_dws": 10.0, "alpha_cc_dws": 0.7, "gamma_c_dws": 1.5, 
-            "check_more_dws": False, "F_hoop_dws": 1100.0, "L_hoop_dws": 10.0}
+            "check_more_dws": False, "F_hoop_dws": 1100.0, "L_hoop_dws": 10.0,
+            "check_profile_dws": False, "hoop_force_option_dws": "Table", "hoop_force_table_dws": "0.0, 0.0\n51.3, 1200.0", "soil_layers_dws": "51.3, 19.0, 0.5", "z_water_dws": 3.0, "seed_dws": 0}
+
+def build_graph(graph):
+    """ Declares the computations of the form as nodes of a compute graph, see src.compute_graph"""
+    geometry = ['ri', 'D', 'B', 'L', 'H_drilling_platform', 'v']
+    hoop = ['F_hoop_at_base', 'gamma_G', 'f_ck', 'alpha_cc', 'gamma_c']
+    graph.add_node('geometry', get_parameters_shaft_diaphragm_panels_ring, geometry, outputs=['n_pieces', 'x0', 'x', 'd_eff'])
+    graph.add_node('critical depth', get_critical_depth_shaft_diaphragm_panels, ['ri', 'D', 'B', 'H_drilling_platform', 'v'])
+    graph.add_node('max verticality', get_max_verticality_shaft_diaphragm_panels, ['ri', 'D', 'B', 'L', 'H_drilling_platform'])
+    graph.add_node('2D plot', partial(figure_cache.get_or_render, plot_shaft_diaphragm_panels), ['di', 'D', 'B', 'x0', 'x', 'shaft_name', 'seed'])
+    graph.add_node('3D model', get_3d_model, ['di', 'D', 'B', 'L', 'x0', 'x', 'seed', 'shaft_name'])
+    graph.add_node('hoop check', check_for_hoop_force, ['F_hoop_at_base', 'd_eff', 'gamma_G', 'f_ck', 'alpha_cc', 'gamma_c'])
+    graph.add_node('hoop critical depth', get_hoop_critical_depth, ['ri', 'D', 'B', 'H_drilling_platform', 'v'] + hoop)
+    graph.add_node('sensitivities', get_sensitivities_figure, geometry + hoop + ['shaft_name'])
+    graph.add_node('hoop check at depth', check_for_hoop_force_at_depth, ['ri', 'D', 'B', 'L_hoop', 'H_drilling_platform', 'v', 'F_hoop',
+                                                                          'gamma_G', 'f_ck', 'alpha_cc', 'gamma_c'])
+    graph.add_node('hoop profile', get_depth_profile_shaft_diaphragm_panels_ring, geometry, outputs=['z', 'd_eff_z'])
+    graph.add_node('hoop profile check', check_for_hoop_force_profile, ['z', 'F_hoop_z', 'd_eff_z', 'gamma_G', 'f_ck', 'alpha_cc', 'gamma_c'],
+                   outputs=['z_governing', 'utilisation_max', 'utilisation'])
+    graph.add_node('hoop profile plot', partial(figure_cache.get_or_render, plot_hoop_utilisation_profile), ['z', 'utilisation', 'z_governing', 'shaft_name'])
+
 
 def main_diaphragm_panel_shaft(st, parameters=None):
     """Main form for diagragm panel shaft
@@ -16,6 +45,8 @@ def main_diaphragm_panel_shaft(st, parameters=None):
     """
     if parameters is None:
         parameters = parameters_init
+    graph = get_graph(st.session_state, 'Diaphragm panel shaft', build_graph)
+    graph.start_rerun()
 
     st.title('Geometric and plain concrete resistance check for diaphragm panel shaft')
 
@@ -29,7 +60,7 @@ def main_diaphragm_panel_shaft(st, parameters=None):
     shaft_name = col1.text_input('Shaft identification', value=parameters['shaft_name_dws'], key='shaft_name_dws')
     di = col1.number_input('Shaft inner diameter [m]', value=parameters['di_dws'], format='%.2f', min_value=1.0, max_value=100.0, step=1.0, key='di_dws')
     D = col2.number_input('Pannel thickness [m]', value=parameters['D_dws'], format='%.2f', min_value=0.3, max_value=5.0, step=0.1, key='D_dws')
-    B = col3.number_input('Pannel length (for plotting) [m]', value=parameters['B_dws'], format='%.2f', min_value=0.3, max_value=15.0, step=0.1, key='B_dws')
+    B = col3.number_input('Pannel length [m]', value=parameters['B_dws'], format='%.2f', min_value=0.3, max_value=15.0, step=0.1, key='B_dws')
     #n_pieces = int(col3.number_input('Numer of pannels [-]', value=int(parameters['n_pieces_dws']), format='%i', min_value=4, max_value=1000, step=1, key='n_pieces_dws'))
     L = col2.number_input('Length of shaft [m]', value=parameters['L_dws'], step=1.0,min_value=1.0, max_value=150.0, key='L_dws')
     v = col3.number_input('Drilling verticality [%]', value=parameters['v_dws'], step=0.1, min_value=0.05, max_value=2.0, key='v_dws')
@@ -37,19 +68,27 @@ def main_diaphragm_panel_shaft(st, parameters=None):
     H_drilling_platform = col1.number_input('Height of drilling platform above top of panels [m]', value=parameters['H_drilling_platform_dws'], step=1.0, min_value=0.0, max_value=20.0, key='H_drilling_platform_dws')
     col2.write('The initial devivation by free drilling x0 = {:.2f} cm'.format(H_drilling_platform*v))
 
-    x0, x, d_eff = get_parameters_shaft_diaphragm_panels(D, L, H_drilling_platform, v)
+    graph.set_inputs(shaft_name=shaft_name, di=di, ri=di/2, D=D, B=B, L=L, v=v, H_drilling_platform=H_drilling_platform)
+    n_pieces, x0, x, d_eff = graph.get('geometry')
 
     st.header('Output parameters for {}'.format(shaft_name))
     col1, col2 = st.columns(2)
+    col1.write('Number of panels in polygonal ring n = {}'.format(n_pieces))
     col1.write('Deviation at bottom of shaft dx = {:.2f} cm'.format(x*100))
-    col1.write('Effective pannel thickness at bottom of shaft d_eff = {:.2f} cm'.format(d_eff*100))
+    z_critical = graph.get('critical depth')
+    col1.write('Contact between panels is lost at depth z = {:.2f} m'.format(z_critical) if np.isfinite(z_critical) else 'Contact between panels is lost already at top')
+    v_max = graph.get('max verticality')
+    col1.write('Maximum verticality for contact down to base of shaft v = {:.3f} %'.format(v_max) if np.isfinite(v_max) else 'Maximum verticality for contact down to base of shaft: not possible even for vertical panels')
+    col1.write('Effective ring thickness at weakest joint at bottom of shaft d_eff = {:.2f} cm'.format(d_eff*100))
     if d_eff <= 0:
         col2.warning('PANELS DO NOT TOUCH IN BASE OF SHAFT!!')
 
 
     st.header('Visualization for {}'.format(shaft_name))
-    fig1 = plot_shaft_diaphragm_panels(di, D, B, x0, x, shaft_name)
-    st.pyplot(fig1)
+    seed = int(st.number_input('Seed for random drilling deviations [-]', value=int(parameters['seed_dws']), format='%i', min_value=0, max_value=2**31-1, step=1, key='seed_dws'))
+    graph.set_inputs(seed=seed)
+    st.image(graph.get('2D plot'))
+    st.download_button('Download 3D model of panels (.glb)', graph.get('3D model'), file_name='{}.glb'.format(shaft_name), mime='model/gltf-binary')
 
 
     st.header('Check for hoop stress at base of shaft')
@@ -59,11 +98,21 @@ def main_diaphragm_panel_shaft(st, parameters=None):
     f_ck = col3.number_input('f_ck [MPa]', value=parameters['f_ck_dws'], min_value=5.0, max_value=80.0, step=5.0, key='f_ck_dws')
     alpha_cc = col1.number_input('alpha_cc [-]', value=0.7, min_value=0.0, max_value=1.0, step=0.1, key='alpha_cc_dws')
     gamma_c = col2.number_input('gamma_c [-]', value=1.5, min_value=0.0, max_value=2.0, step=0.1, key='gamma_c_dws')
-    sigma_cd, f_cd = check_for_hoop_force(F_hoop_at_base, d_eff, gamma_G, f_ck, alpha_cc, gamma_c)
+    graph.set_inputs(F_hoop_at_base=F_hoop_at_base, gamma_G=gamma_G, f_ck=f_ck, alpha_cc=alpha_cc, gamma_c=gamma_c)
+    sigma_cd, f_cd = graph.get('hoop check')
     if sigma_cd < f_cd:
         st.success('Hoop stress = {0:.2f} MPa < design hoop stress = {1:.2f} MPa: PASSED'.format(sigma_cd, f_cd))
     else:
         st.error('Hoop stress = {0:.2f} MPa > design hoop stress = {1:.2f} MPa: NOT PASSED'.format(sigma_cd, f_cd))
+    z_hoop = graph.get('hoop critical depth')
+    st.write('Effective thickness suffices for this hoop force down to depth z = {:.2f} m'.format(z_hoop) if np.isfinite(z_hoop) else 'Effective thickness does not suffice for this hoop force even at top of panels')
+
+    with st.expander('Sensitivities of hoop stress utilisation at base of shaft'):
+        figure = graph.get('sensitivities')
+        if figure is None:
+            st.write('Panels do not touch in base of shaft: no sensitivities')
+        else:
+            st.image(figure)
 
     check_more = st.checkbox('Check for hoop stress at any shaft depth', value=parameters['check_more_dws'], key='check_more_dws')
     if check_more:
@@ -71,10 +120,65 @@ def main_diaphragm_panel_shaft(st, parameters=None):
         col1, col2 = st.columns(2)
         F_hoop = col1.number_input('Hoop force [kN/m]', value=parameters['F_hoop_dws'], min_value=10.0, max_value=100000.0, step=100.0, key='F_hoop_dws')
         L_hoop_dws = col2.number_input('Depth from top of shaft [m]', value=parameters['L_hoop_dws'], min_value=1.0, max_value=150.0, step=1.0, key='L_hoop_dws')
-        x0, x, d_eff = get_parameters_shaft_diaphragm_panels(D, L_hoop_dws, H_drilling_platform, v)
-        sigma_cd, f_cd = check_for_hoop_force(F_hoop, d_eff, gamma_G, f_ck, alpha_cc, gamma_c)
+        graph.set_inputs(F_hoop=F_hoop, L_hoop=L_hoop_dws)
+        sigma_cd, f_cd = graph.get('hoop check at depth')
         if sigma_cd < f_cd:
             st.success('Hoop stress = {0:.2f} MPa < design hoop stress = {1:.2f} MPa: PASSED'.format(sigma_cd, f_cd))
         else:
             st.error('Hoop stress = {0:.2f} MPa > design hoop stress = {1:.2f} MPa: NOT PASSED'.format(sigma_cd, f_cd))
 
+    check_profile = st.checkbox('Check for hoop stress along full shaft depth', value=parameters['check_profile_dws'], key='check_profile_dws')
+    if check_profile:
+        hoop_force_options = ['Table', 'Layered earth pressure']
+        hoop_force_option = st.selectbox('Hoop force distribution', hoop_force_options, index=hoop_force_options.index(parameters['hoop_force_option_dws']), key='hoop_force_option_dws')
+        z = graph.get_value('z')
+        try:
+            if hoop_force_option == 'Table':
+                hoop_force_table = st.text_area('Depth from top of shaft [m], hoop force [kN/m]', value=parameters['hoop_force_table_dws'], key='hoop_force_table_dws')
+                F_hoop_z = get_hoop_force_from_table(z, *read_table_from_text(hoop_force_table, 2))
+            else:
+                col1, col2 = st.columns(2)
+                soil_layers = col1.text_area('Depth of layer bottom [m], unit weight [kN/m^3], earth pressure coefficient K [-]', value=parameters['soil_layers_dws'], key='soil_layers_dws')
+                z_water = col2.number_input('Depth of ground water table [m]', value=parameters['z_water_dws'], min_value=0.0, max_value=150.0, step=1.0, key='z_water_dws')
+                F_hoop_z = get_hoop_force_from_earth_pressure(z, di/2 + D, *read_table_from_text(soil_layers, 3), z_water=z_water)
+        except ValueError as e:
+            st.error('Invalid table: {}'.format(e))
+        else:
+            graph.set_inputs(F_hoop_z=F_hoop_z)
+            z_governing, utilisation_max, utilisation = graph.get('hoop profile check')
+            if utilisation_max < 1.0:
+                st.success('Maximum utilisation = {0:.2f} at depth {1:.2f} m: PASSED'.format(utilisation_max, z_governing))
+            else:
+                st.error('Maximum utilisation = {0:.2f} at depth {1:.2f} m: NOT PASSED'.format(utilisation_max, z_governing))
+            st.image(graph.get('hoop profile plot'))
+
+
+def get_3d_model(di, D, B, L, x0, x, seed, shaft_name):
+    """ Gets 3D model of the deviated panels as binary glTF, see src.mesh_export"""
+    vertices, triangles = get_shaft_diaphragm_panels_mesh(di, D, B, L, x0, x, seed)
+    return get_mesh_bytes(vertices, triangles, '.glb', shaft_name)
+
+
+def get_hoop_critical_depth(ri, D, B, H_drilling_platform, v, F_hoop_at_base, gamma_G, f_ck, alpha_cc, gamma_c):
+    """ Gets depth down to which the effective ring thickness suffices for the hoop force, see get_critical_depth_shaft_diaphragm_panels"""
+    return get_critical_depth_shaft_diaphragm_panels(ri, D, B, H_drilling_platform, v, F_hoop=F_hoop_at_base, gamma_G=gamma_G, f_ck=f_ck,
+                                                     alpha_cc=alpha_cc, gamma_c=gamma_c)
+
+
+def check_for_hoop_force_at_depth(ri, D, B, L_hoop, H_drilling_platform, v, F_hoop, gamma_G, f_ck, alpha_cc, gamma_c):
+    """ Checks hoop force at depth L_hoop from top of shaft, returns sigma_cd, f_cd"""
+    d_eff = get_parameters_shaft_diaphragm_panels_ring(ri, D, B, L_hoop, H_drilling_platform, v)[3]
+    return check_for_hoop_force(F_hoop, d_eff, gamma_G, f_ck, alpha_cc, gamma_c)
+
+
+def get_sensitivities_figure(ri, D, B, L, H_drilling_platform, v, F_hoop_at_base, gamma_G, f_ck, alpha_cc, gamma_c, shaft_name):
+    """ Gets tornado chart of the change of hoop stress utilisation at base of shaft for +-10 % of each input
+    Returns figure bytes, None where panels do not touch in base of shaft
+    """
+    parameters = dict(ri=ri, D=D, B=B, L=L, H_drilling_platform=H_drilling_platform, v=v, F_hoop=F_hoop_at_base, gamma_G=gamma_G, f_ck=f_ck,
+                      alpha_cc=alpha_cc, gamma_c=gamma_c)
+    du = get_sensitivities_shaft_diaphragm_panels(**parameters)[1]
+    if not np.isfinite(du['D']):
+        return None
+    du = {key: float(value) for key, value in du.items()}
+    return figure_cache.get_or_render(plot_tornado, du, parameters, 'utilisation sigma_cd/f_cd [-]', 0.1, shaft_name + ' hoop stress utilisation at base')
@@ -1,11 +1,23 @@
 import numpy as np
+from functools import partial
 from src.shaft_diaphragm_panels import (get_parameters_shaft_diaphragm_panels, plot_wall_diaphragm_panels)
+from src.figure_cache import figure_cache
+from src.compute_graph import get_graph
+from src.design_limits import get_critical_depth_diaphragm_panels, get_max_verticality_diaphragm_panels
 
 # Initial parameters
 parameters_init = {"project_name_dw": "Sample project", "project_revision_dw": "First issue, rev0", "wall_name_dw": "Wall 1", "D_dw": 1.2,
 
             "B_dw": 2.8, "L_dw": 35.0, "v_dw": 0.5, "H_drilling_platform_dw": 0.0}
 
+def build_graph(graph):
+    """ Declares the computations of the form as nodes of a compute graph, see src.compute_graph"""
+    graph.add_node('geometry', get_parameters_shaft_diaphragm_panels, ['D', 'L', 'H_drilling_platform', 'v'], outputs=['x0', 'x', 'd_eff'])
+    graph.add_node('critical depth', get_critical_depth_diaphragm_panels, ['D', 'H_drilling_platform', 'v'])
+    graph.add_node('max verticality', get_max_verticality_diaphragm_panels, ['D', 'L', 'H_drilling_platform'])
+    graph.add_node('2D plot', partial(figure_cache.get_or_render, plot_wall_diaphragm_panels, 2), ['D', 'B', 'x0', 'x', 'wall_name'])
+
+
 def main_diaphragm_panel_wall(st, parameters=None):
     """Main form for diagragm panel wall
 
@@ -14,6 +26,8 @@ def main_diaphragm_panel_wall(st, parameters=None):
     """
     if parameters is None:
         parameters = parameters_init
+    graph = get_graph(st.session_state, 'Diaphragm panel wall', build_graph)
+    graph.start_rerun()
 
     st.title('Geometric check for diaphragm panel wall')
 
@@ -35,16 +49,20 @@ def main_diaphragm_panel_wall(st, parameters=None):
     H_drilling_platform = col1.number_input('Height of drilling platform above top of panels [m]', value=parameters['H_drilling_platform_dw'], step=1.0, min_value=0.0, max_value=20.0, key='H_drilling_platform_dw')
     col2.write('The initial devivation by free drilling x0 = {:.2f} cm'.format(H_drilling_platform*v))
 
-    x0, x, d_eff = get_parameters_shaft_diaphragm_panels(D, L, H_drilling_platform, v)
+    graph.set_inputs(wall_name=wall_name, D=D, B=B, L=L, v=v, H_drilling_platform=H_drilling_platform)
+    x0, x, d_eff = graph.get('geometry')
 
     st.header('Output parameters for {}'.format(wall_name))
     col1, col2 = st.columns(2)
     col1.write('Deviation at bottom of shaft dx = {:.2f} cm'.format(x*100))
+    z_critical = graph.get('critical depth')
+    col1.write('Contact between panels is lost at depth z = {:.2f} m'.format(z_critical) if np.isfinite(z_critical) else 'Contact between panels is lost already at top')
+    v_max = graph.get('max verticality')
+    col1.write('Maximum verticality for contact down to base of wall v = {:.3f} %'.format(v_max) if np.isfinite(v_max) else 'Maximum verticality for contact down to base of wall: not possible even for vertical panels')
     col1.write('Effective pannel thickness at bottom of shaft d_eff = {:.2f} cm'.format(d_eff*100))
     if d_eff <= 0:
         col2.warning('PANELS DO NOT TOUCH IN BASE OF WALL!!')
 
     st.header('Visualization for {}'.format(wall_name))
-    fig1 = plot_wall_diaphragm_panels(2, D, B, x0, x, wall_name)
-    st.pyplot(fig1)
+    st.image(graph.get('2D plot'))
 
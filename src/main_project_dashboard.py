@@ -0,0 +1,127 @@
+import io
+import numpy as np
+from src.batch import DEFAULTS, STRUCTURE_TYPES, evaluate_structures, get_parameters, plot_structure, parse_structures
+from src.figure_cache import figure_cache
+from src.compute_graph import get_graph
+
+# Project view of many shafts and walls of all four types
+# All output columns are computed in one vectorized pass per structure type (src.batch.evaluate_structures) and memoized
+# by the compute graph of the view. Only the rows of the visible page are listed, and figures are rendered only for the
+# selected row (or for the visible page on request), through the figure cache.
+
+PAGE_SIZES = [10, 20, 50, 100]
+N_FIGURES = {'Secant piled shaft': 2, 'Secant piled wall': 1, 'Diaphragm panel shaft': 1, 'Diaphragm panel wall': 1}
+
+
+def get_sample_structures():
+    """ Gets one structure of each type with the default parameters of the forms"""
+    return [dict(DEFAULTS[structure_type], structure_type=structure_type, name='{0} {1}'.format(structure_type, 1))
+            for structure_type in STRUCTURE_TYPES]
+
+
+def normalize_structure(structure):
+    """ Gets structure with the name and all parameters of its type as numbers, see src.batch.get_parameters"""
+    normalized = {'structure_type': structure['structure_type'], 'name': structure.get('name', '')}
+    normalized.update(get_parameters(structure))
+    return normalized
+
+
+def get_project_table(structures):
+    """ Gets output columns of all structures, vectorized for each structure type
+    structures: list of structures, see src.batch
+    Returns dict of columns: name, structure_type, d_eff [cm], utilisation (sigma_cd/f_cd, NaN without hoop check), passed, error
+    """
+    results = evaluate_structures(structures)
+    column = lambda key: np.array([np.nan if result.get(key) is None else result[key] for result in results], dtype=float)
+    d_eff, sigma_cd, f_cd = column('d_eff'), column('sigma_cd'), column('f_cd')
+    touching = np.array([bool(result.get('touching', False)) for result in results])
+    has_hoop_check = np.array(['hoop_passed' in result for result in results])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        utilisation = np.where(has_hoop_check, np.where(touching, sigma_cd/f_cd, np.inf), np.nan)
+    passed = touching & ~(has_hoop_check & ~(utilisation < 1.0))
+    return {'name': [result['name'] for result in results], 'structure_type': [result['structure_type'] for result in results],
+            'd_eff': d_eff*100, 'utilisation': utilisation, 'passed': passed, 'error': [result.get('error', '') for result in results]}
+
+
+def plot_structure_figure(structure, index):
+    """ Plots figure index of a structure, see src.batch.plot_structure"""
+    import matplotlib.pyplot as plt
+
+    figs = plot_structure(structure, get_parameters(structure))
+    for i, fig in enumerate(figs):
+        if i != index:
+            plt.close(fig)
+    return figs[index]
+
+
+def build_graph(graph):
+    """ Declares the computations of the view as nodes of a compute graph, see src.compute_graph"""
+    graph.add_node('project table', get_project_table, ['structures'])
+
+
+def read_uploaded_structures(uploaded_file):
+    """ Reads structures from an uploaded CSV, JSONL or project (.json) file"""
+    text = io.StringIO(uploaded_file.getvalue().decode('utf-8'), newline='')
+    return [normalize_structure(structure) for structure in parse_structures(text, uploaded_file.name)]
+
+
+def main_project_dashboard(st, structures=None):
+    """ Main view for a project of many structures
+    structures: structures of a loaded project file (see src.batch), None for the sample structures
+    """
+    graph = get_graph(st.session_state, 'Project dashboard', build_graph)
+    graph.start_rerun()
+
+    st.title('Project dashboard')
+    uploaded_file = st.file_uploader('Load table of structures (CSV, JSONL or project file)', type=['csv', 'jsonl', 'json'], key='project_table_file')
+    try:
+        if uploaded_file is not None:
+            structures = read_uploaded_structures(uploaded_file)
+        elif structures is not None:
+            structures = [normalize_structure(structure) for structure in structures]
+        else:
+            structures = get_sample_structures()
+    except (ValueError, TypeError, KeyError) as e:
+        st.error('Invalid table of structures: {}'.format(e))
+        return
+    st.session_state['project_structures'] = structures    # for report and project file of the whole project
+
+    graph.set_inputs(structures=structures)
+    table = graph.get('project table')
+    n_structures = len(structures)
+    n_passed = int(np.count_nonzero(table['passed']))
+    utilisation = table['utilisation'][np.isfinite(table['utilisation'])]
+    col1, col2, col3 = st.columns(3)
+    col1.write('Structures: {}'.format(n_structures))
+    col2.write('Passed: {0}, not passed: {1}'.format(n_passed, n_structures - n_passed))
+    col3.write('Maximum hoop utilisation: {:.2f}'.format(utilisation.max()) if utilisation.size else 'No hoop checks')
+
+    col1, col2, col3 = st.columns(3)
+    only_failed = col1.checkbox('Show only structures not passed', value=False, key='project_only_failed')
+    page_size = col2.selectbox('Rows per page', PAGE_SIZES, index=1, key='project_page_size')
+    rows = np.flatnonzero(~table['passed']) if only_failed else np.arange(n_structures)
+    n_pages = max(1, -(-rows.size//page_size))
+    page = int(col3.number_input('Page (of {})'.format(n_pages), value=1, min_value=1, max_value=n_pages, step=1, key='project_page'))
+    rows = rows[(min(page, n_pages) - 1)*page_size:min(page, n_pages)*page_size]
+
+    format_value = lambda value, fmt: '-' if not np.isfinite(value) else fmt.format(value)
+    st.dataframe({'#': (rows + 1).tolist(), 'Name': [table['name'][i] for i in rows], 'Type': [table['structure_type'][i] for i in rows],
+                  'd_eff [cm]': [format_value(table['d_eff'][i], '{:.1f}') for i in rows],
+                  'Hoop utilisation': [format_value(table['utilisation'][i], '{:.2f}') for i in rows],
+                  'Status': [table['error'][i] or ('PASSED' if table['passed'][i] else 'NOT PASSED') for i in rows]})
+
+    labels = ['{0}. {1} ({2})'.format(i + 1, table['name'][i], table['structure_type'][i]) for i in rows]
+    label = st.selectbox('Show figures of', ['None'] + labels, key='project_detail')
+    if label != 'None':
+        i = rows[labels.index(label)]
+        if table['error'][i]:
+            st.error('Invalid input: {}'.format(table['error'][i]))
+        else:
+            for index in range(N_FIGURES[structures[i]['structure_type']]):
+                st.image(figure_cache.get_or_render(plot_structure_figure, structures[i], index))
+
+    if st.checkbox('Show figures of all structures on this page', value=False, key='project_page_figures'):
+        columns = st.columns(3)
+        for j, i in enumerate(rows):
+            if not table['error'][i]:
+                columns[j % 3].image(figure_cache.get_or_render(plot_structure_figure, structures[i], 0), caption=labels[j])
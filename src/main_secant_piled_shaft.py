@@ -1,18 +1,57 @@
 import numpy as np
+from functools import partial
 from src.shaft_secant_piles import (get_parameters_shaft_secant_piles, plot_shaft, 
                                     plot_shaft_3d, check_for_hoop_force, get_area_moment_of_inertia_rect)
+from src.figure_cache import figure_cache
+from src.compute_graph import get_graph
+from src.stiffness_export import get_stiffness_csv
+from src.mesh_export import get_shaft_secant_piles_mesh, get_mesh_bytes
+from src.design_limits import get_critical_depth_shaft_secant_piles, get_max_verticality_shaft_secant_piles
+from src.sensitivities import get_sensitivities_shaft_secant_piles, plot_tornado
+from src.hoop_profile import (get_depth_profile_shaft_secant_piles, get_hoop_force_from_table, get_hoop_force_from_earth_pressure,
+                              check_for_hoop_force_profile, read_table_from_text, plot_hoop_utilisation_profile)
+from src.shaft_secant_piles_design import (get_min_number_of_piles, get_max_length, get_max_verticality,
+                                           get_min_pile_diameter)
 
 # Initial parameters
 parameters_init = {"project_name": "Sample project", "project_revision": "First issue, rev0", "shaft_name": "Shaft 1", "di": 12.0, "D": 1.2,
             "n_pieces": 44, "L": 15.0, "v": 0.75, "H_drilling_platform": 0.0, "E": 30.e6,
             "F_hoop_at_base": 700.0, "gamma_G": 1.35, "f_ck": 10.0, "alpha_cc": 0.7, "gamma_c": 1.5, 
-            "check_more": False, "F_hoop": 500.0, "L_hoop": 10.0}
+            "check_more": False, "F_hoop": 500.0, "L_hoop": 10.0,
+            "check_profile": False, "hoop_force_option": "Table", "hoop_force_table": "0.0, 0.0\n15.0, 700.0", "soil_layers": "15.0, 19.0, 0.5", "z_water": 3.0, "seed": 0}
+
+def build_graph(graph):
+    """ Declares the computations of the form as nodes of a compute graph, see src.compute_graph"""
+    geometry = ['ri', 'n_pieces', 'D', 'L', 'H_drilling_platform', 'v']
+    hoop = ['F_hoop_at_base', 'gamma_G', 'f_ck', 'alpha_cc', 'gamma_c']
+    graph.add_node('geometry', partial(get_parameters_shaft_secant_piles, print_results=False), geometry,
+                   outputs=['a', 't_top', 'd_top', 'x0', 'x', 't_eff', 'd_eff'])
+    graph.add_node('critical depth', get_critical_depth_shaft_secant_piles, ['ri', 'n_pieces', 'D', 'H_drilling_platform', 'v'])
+    graph.add_node('max verticality', get_max_verticality_shaft_secant_piles, ['ri', 'n_pieces', 'D', 'L', 'H_drilling_platform'])
+    graph.add_node('stiffnesses', get_shaft_stiffnesses, ['d_top', 'd_eff', 'E'])
+    graph.add_node('stiffness table', get_stiffness_table_csv, ['shaft_name', 'di', 'n_pieces', 'D', 'L', 'v', 'H_drilling_platform', 'E'])
+    graph.add_node('2D plot', partial(figure_cache.get_or_render, plot_shaft), ['ri', 'n_pieces', 'D', 'x0', 'x', 'shaft_name', 'seed'])
+    graph.add_node('3D plot', partial(figure_cache.get_or_render, plot_shaft_3d), ['ri', 'n_pieces', 'D', 'L', 'x0', 'x', 'shaft_name', 'seed'])
+    graph.add_node('3D model', get_3d_model, ['ri', 'n_pieces', 'D', 'L', 'x0', 'x', 'seed', 'shaft_name'])
+    graph.add_node('hoop check', check_for_hoop_force, ['F_hoop_at_base', 'd_eff', 'gamma_G', 'f_ck', 'alpha_cc', 'gamma_c'])
+    graph.add_node('hoop critical depth', get_hoop_critical_depth, ['ri', 'n_pieces', 'D', 'H_drilling_platform', 'v'] + hoop)
+    graph.add_node('design limits', get_design_limits, geometry + hoop)
+    graph.add_node('sensitivities', get_sensitivities_figure, geometry + hoop + ['shaft_name'])
+    graph.add_node('hoop check at depth', check_for_hoop_force_at_depth, ['ri', 'n_pieces', 'D', 'L_hoop', 'H_drilling_platform', 'v', 'F_hoop',
+                                                                          'gamma_G', 'f_ck', 'alpha_cc', 'gamma_c'])
+    graph.add_node('hoop profile', get_depth_profile_shaft_secant_piles, geometry, outputs=['z', 'd_eff_z'])
+    graph.add_node('hoop profile check', check_for_hoop_force_profile, ['z', 'F_hoop_z', 'd_eff_z', 'gamma_G', 'f_ck', 'alpha_cc', 'gamma_c'],
+                   outputs=['z_governing', 'utilisation_max', 'utilisation'])
+    graph.add_node('hoop profile plot', partial(figure_cache.get_or_render, plot_hoop_utilisation_profile), ['z', 'utilisation', 'z_governing', 'shaft_name'])
+
 
 def main_secant_piled_shaft(st, parameters=None):
     """ Main program for secant piled shaft
     """
     if parameters is None:
         parameters = parameters_init
+    graph = get_graph(st.session_state, 'Secant piled shaft', build_graph)
+    graph.start_rerun()
 
     st.title('Geometric and plain concrete resistance check for secant piled shaft')
 
@@ -31,7 +70,8 @@ def main_secant_piled_shaft(st, parameters=None):
     col1, col2 = st.columns(2)
     H_drilling_platform = col1.number_input('Height of drilling platform above top of piles [m]', value=parameters['H_drilling_platform'], step=1.0, min_value=0.0, max_value=50.0, key='H_drilling_platform')
     col2.write('The initial devivation by free drilling x0 = {:.2f} cm'.format(H_drilling_platform*v))
-    a, t_top, d_top, x0, x, t_eff, d_eff = get_parameters_shaft_secant_piles(di/2, n_pieces, D, L, H_drilling_platform, v, shaft_name=shaft_name, print_results=False)
+    graph.set_inputs(shaft_name=shaft_name, di=di, ri=di/2, D=D, n_pieces=n_pieces, L=L, v=v, H_drilling_platform=H_drilling_platform)
+    a, t_top, d_top, x0, x, t_eff, d_eff = graph.get('geometry')
 
 
     st.header('Output parameters for {}'.format(shaft_name))
@@ -41,24 +81,30 @@ def main_secant_piled_shaft(st, parameters=None):
     col1.write('Overcut at top of shaft t = {:.2f} cm'.format(t_top*100))
     col1.write('Effective thickness at top of shaft d = {:.2f} cm'.format(d_top*100))
     col1.write('Deviation at bottom of shaft dx = {:.2f} cm'.format(x*100))
+    z_critical = graph.get('critical depth')
+    col1.write('Interlock is lost at depth z = {:.2f} m'.format(z_critical) if np.isfinite(z_critical) else 'Interlock is lost already at top')
+    v_max = graph.get('max verticality')
+    col1.write('Maximum verticality for interlock down to base of shaft v = {:.3f} %'.format(v_max) if np.isfinite(v_max) else 'Maximum verticality for interlock down to base of shaft: not possible even for vertical piles')
 
     if t_eff > 0:
-        d_eff = 2*np.sqrt((D/2)*t_eff - (t_eff/2)**2) # overlapped thickness, m    
         col2.write('Overcut at bottom of shaft t_eff = {:.2f} cm'.format(t_eff*100))
         col2.write('Effective thickness at bottom of shaft d_eff = {:.2f} cm'.format(d_eff*100))
         with st.expander('Axial and flexural rigidity considering effective thickness at top and bottom of shaft'):
             E = st.number_input("Concrete Young's modulus E [KPa]", value=parameters['E'], format='%.0f', min_value=25.0e6, max_value=35.0e6, step=1.0E6, key='E')
-            display_shaft_stiffnesses(d_top, d_eff, E, st)
+            graph.set_inputs(E=E)
+            display_shaft_stiffnesses(graph.get('stiffnesses'), st)
+            st.download_button('Download EA(z), EI(z) table for FE plates', graph.get('stiffness table'),
+                               file_name='{}_stiffness.csv'.format(shaft_name), mime='text/csv')
     else:
-        d_eff = np.nan
         col2.warning('PILES DO NOT TOUCH IN BASE OF SHAFT!!')
 
 
     st.header('Visualization for {}'.format(shaft_name))
-    fig1 = plot_shaft(di/2, n_pieces, D, x0, x, shaft_name)
-    st.pyplot(fig1)
-    fig2 = plot_shaft_3d(di/2, n_pieces, D, L, x0, x, shaft_name)
-    st.pyplot(fig2)
+    seed = int(st.number_input('Seed for random drilling deviations [-]', value=int(parameters['seed']), format='%i', min_value=0, max_value=2**31-1, step=1, key='seed'))
+    graph.set_inputs(seed=seed)
+    st.image(graph.get('2D plot'))
+    st.image(graph.get('3D plot'))
+    st.download_button('Download 3D model of piles (.glb)', graph.get('3D model'), file_name='{}.glb'.format(shaft_name), mime='model/gltf-binary')
 
 
     st.header('Check for hoop stress at base of shaft')
@@ -68,11 +114,24 @@ def main_secant_piled_shaft(st, parameters=None):
     f_ck = col3.number_input('f_ck [MPa]', value=parameters['f_ck'], min_value=5.0, max_value=80.0, step=5.0, key='f_ck')
     alpha_cc = col1.number_input('alpha_cc [-]', value=0.7, min_value=0.0, max_value=1.0, step=0.1, key='alpha_cc')
     gamma_c = col2.number_input('gamma_c [-]', value=1.5, min_value=0.0, max_value=2.0, step=0.1, key='gamma_c')
-    sigma_cd, f_cd = check_for_hoop_force(F_hoop_at_base, d_eff, gamma_G, f_ck, alpha_cc, gamma_c)
+    graph.set_inputs(F_hoop_at_base=F_hoop_at_base, gamma_G=gamma_G, f_ck=f_ck, alpha_cc=alpha_cc, gamma_c=gamma_c)
+    sigma_cd, f_cd = graph.get('hoop check')
     if sigma_cd < f_cd:
         st.success('Hoop stress = {0:.2f} MPa < design hoop stress = {1:.2f} MPa: PASSED'.format(sigma_cd, f_cd))
     else:
         st.error('Hoop stress = {0:.2f} MPa > design hoop stress = {1:.2f} MPa: NOT PASSED'.format(sigma_cd, f_cd))
+    z_hoop = graph.get('hoop critical depth')
+    st.write('Effective thickness suffices for this hoop force down to depth z = {:.2f} m'.format(z_hoop) if np.isfinite(z_hoop) else 'Effective thickness does not suffice for this hoop force even at top of piles')
+
+    with st.expander('Design limits for interlock at toe and hoop stress at base of shaft'):
+        display_design_limits(graph.get('design limits'), st)
+
+    with st.expander('Sensitivities of hoop stress utilisation at base of shaft'):
+        figure = graph.get('sensitivities')
+        if figure is None:
+            st.write('Piles do not touch in base of shaft: no sensitivities')
+        else:
+            st.image(figure)
 
 
     check_more = st.checkbox('Check for hoop stress at any shaft depth', value=parameters['check_more'], key='check_more')
@@ -81,21 +140,111 @@ def main_secant_piled_shaft(st, parameters=None):
         col1, col2 = st.columns(2)
         F_hoop = col1.number_input('Hoop force [kN/m]', value=parameters['F_hoop'], min_value=10.0, max_value=100000.0, step=100.0, key='F_hoop')
         L_hoop = col2.number_input('Depth from top of shaft [m]', value=parameters['L_hoop'], min_value=1.0, max_value=150.0, step=1.0, key='L_hoop')
-        a, t_top, d_top, x0, x, t_eff, d_eff = get_parameters_shaft_secant_piles(di/2, n_pieces, D, L_hoop, H_drilling_platform, v, shaft_name=shaft_name, print_results=False)
-        sigma_cd, f_cd = check_for_hoop_force(F_hoop, d_eff, gamma_G, f_ck, alpha_cc, gamma_c)
+        graph.set_inputs(F_hoop=F_hoop, L_hoop=L_hoop)
+        sigma_cd, f_cd = graph.get('hoop check at depth')
         if sigma_cd < f_cd:
             st.success('Hoop stress = {0:.2f} MPa < design hoop stress = {1:.2f} MPa: PASSED'.format(sigma_cd, f_cd))
         else:
             st.error('Hoop stress = {0:.2f} MPa > design hoop stress = {1:.2f} MPa: NOT PASSED'.format(sigma_cd, f_cd))
 
-def display_shaft_stiffnesses(d_top, d_eff, E, st):
-    """ Displays shaft stiffness
+    check_profile = st.checkbox('Check for hoop stress along full shaft depth', value=parameters['check_profile'], key='check_profile')
+    if check_profile:
+        hoop_force_options = ['Table', 'Layered earth pressure']
+        hoop_force_option = st.selectbox('Hoop force distribution', hoop_force_options, index=hoop_force_options.index(parameters['hoop_force_option']), key='hoop_force_option')
+        z = graph.get_value('z')
+        try:
+            if hoop_force_option == 'Table':
+                hoop_force_table = st.text_area('Depth from top of shaft [m], hoop force [kN/m]', value=parameters['hoop_force_table'], key='hoop_force_table')
+                F_hoop_z = get_hoop_force_from_table(z, *read_table_from_text(hoop_force_table, 2))
+            else:
+                col1, col2 = st.columns(2)
+                soil_layers = col1.text_area('Depth of layer bottom [m], unit weight [kN/m^3], earth pressure coefficient K [-]', value=parameters['soil_layers'], key='soil_layers')
+                z_water = col2.number_input('Depth of ground water table [m]', value=parameters['z_water'], min_value=0.0, max_value=150.0, step=1.0, key='z_water')
+                F_hoop_z = get_hoop_force_from_earth_pressure(z, di/2 + D, *read_table_from_text(soil_layers, 3), z_water=z_water)
+        except ValueError as e:
+            st.error('Invalid table: {}'.format(e))
+        else:
+            graph.set_inputs(F_hoop_z=F_hoop_z)
+            z_governing, utilisation_max, utilisation = graph.get('hoop profile check')
+            if utilisation_max < 1.0:
+                st.success('Maximum utilisation = {0:.2f} at depth {1:.2f} m: PASSED'.format(utilisation_max, z_governing))
+            else:
+                st.error('Maximum utilisation = {0:.2f} at depth {1:.2f} m: NOT PASSED'.format(utilisation_max, z_governing))
+            st.image(graph.get('hoop profile plot'))
+
+
+def get_shaft_stiffnesses(d_top, d_eff, E):
+    """ Gets shaft stiffnesses EI [kNm**2/m] and EA [kN/m] at top and bottom of shaft
+    Returns EI_top, EA_top, EI_bottom, EA_bottom
+    """
+    EI_top = E*get_area_moment_of_inertia_rect(1.0, d_top)
+    EI_bottom = E*get_area_moment_of_inertia_rect(1.0, d_eff)
+    return EI_top, E*d_top, EI_bottom, E*d_eff
+
+
+def display_shaft_stiffnesses(stiffnesses, st):
+    """ Displays shaft stiffness, see get_shaft_stiffnesses
+    """
+    EI_top, EA_top, EI_bottom, EA_bottom = stiffnesses
+    st.write('EI at top = {0:.2f} [kNm^2/m], EA at top = {1:.2f} [kN/m]'.format(EI_top, EA_top))
+    st.write('EI at bottom = {0:.2f} [kNm^2/m], EA at bottom = {1:.2f} [kN/m]'.format(EI_bottom, EA_bottom))
+
+
+def get_stiffness_table_csv(shaft_name, di, n_pieces, D, L, v, H_drilling_platform, E):
+    """ Gets EA(z), EI(z) table of the shaft as CSV text, see src.stiffness_export"""
+    structure = dict(structure_type='Secant piled shaft', name=shaft_name, di=di, n_pieces=n_pieces, D=D, L=L, v=v, H_drilling_platform=H_drilling_platform, E=E)
+    return get_stiffness_csv([structure], dz=0.5)
+
+
+def get_3d_model(ri, n_pieces, D, L, x0, x, seed, shaft_name):
+    """ Gets 3D model of the deviated piles as binary glTF, see src.mesh_export"""
+    vertices, triangles = get_shaft_secant_piles_mesh(ri, n_pieces, D, L, x0, x, seed)
+    return get_mesh_bytes(vertices, triangles, '.glb', shaft_name)
+
+
+def get_hoop_critical_depth(ri, n_pieces, D, H_drilling_platform, v, F_hoop_at_base, gamma_G, f_ck, alpha_cc, gamma_c):
+    """ Gets depth down to which the effective thickness suffices for the hoop force, see get_critical_depth_shaft_secant_piles"""
+    return get_critical_depth_shaft_secant_piles(ri, n_pieces, D, H_drilling_platform, v, F_hoop=F_hoop_at_base, gamma_G=gamma_G, f_ck=f_ck,
+                                                 alpha_cc=alpha_cc, gamma_c=gamma_c)
+
+
+def check_for_hoop_force_at_depth(ri, n_pieces, D, L_hoop, H_drilling_platform, v, F_hoop, gamma_G, f_ck, alpha_cc, gamma_c):
+    """ Checks hoop force at depth L_hoop from top of shaft, returns sigma_cd, f_cd"""
+    d_eff = get_parameters_shaft_secant_piles(ri, n_pieces, D, L_hoop, H_drilling_platform, v, print_results=False)[6]
+    return check_for_hoop_force(F_hoop, d_eff, gamma_G, f_ck, alpha_cc, gamma_c)
+
+
+def get_design_limits(ri, n_pieces, D, L, H_drilling_platform, v, F_hoop_at_base, gamma_G, f_ck, alpha_cc, gamma_c):
+    """ Gets the design limits for which piles interlock at toe and hoop stress check passes at base of shaft
+    Each limit is obtained by varying one parameter while keeping the others
+    Returns n_min, L_max, v_max, D_min
+    """
+    hoop = dict(F_hoop=F_hoop_at_base, gamma_G=gamma_G, f_ck=f_ck, alpha_cc=alpha_cc, gamma_c=gamma_c)
+    n_min = get_min_number_of_piles(ri, D, L, H_drilling_platform, v, **hoop)
+    L_max = get_max_length(ri, n_pieces, D, H_drilling_platform, v, **hoop)
+    v_max = get_max_verticality(ri, n_pieces, D, L, H_drilling_platform, **hoop)
+    D_min = get_min_pile_diameter(ri, n_pieces, L, H_drilling_platform, v, **hoop)
+    return n_min, L_max, v_max, D_min
+
+
+def display_design_limits(limits, st):
+    """ Displays the design limits, see get_design_limits
+    """
+    n_min, L_max, v_max, D_min = limits
+    st.write('Minimum number of piles n_pieces = {:.0f}'.format(n_min) if np.isfinite(n_min) else 'Minimum number of piles: not possible for the given pile diameter and shaft length')
+    st.write('Maximum length of shaft L = {:.2f} m'.format(L_max) if np.isfinite(L_max) else 'Maximum length of shaft: not possible for the given number of piles')
+    st.write('Maximum drilling verticality v = {:.3f} %'.format(v_max) if np.isfinite(v_max) else 'Maximum drilling verticality: not possible for the given number of piles')
+    st.write('Minimum pile diameter D = {:.3f} m'.format(D_min) if np.isfinite(D_min) else 'Minimum pile diameter: not possible for the given number of piles')
+
+
+def get_sensitivities_figure(ri, n_pieces, D, L, H_drilling_platform, v, F_hoop_at_base, gamma_G, f_ck, alpha_cc, gamma_c, shaft_name):
+    """ Gets tornado chart of the change of hoop stress utilisation at base of shaft for +-10 % of each input
+    Returns figure bytes, None where piles do not touch in base of shaft
     """
-    I = get_area_moment_of_inertia_rect(1.0, d_top)
-    EI = E*I        # [kNm**2/m]
-    EA = E*d_top    # [kN/m]
-    st.write('EI at top = {0:.2f} [kNm^2/m], EA at top = {1:.2f} [kN/m]'.format(EI, EA))
-    I = get_area_moment_of_inertia_rect(1.0, d_eff)
-    EI = E*I        # [kNm**2/m]
-    EA = E*d_eff    # [kN/m]
-    st.write('EI at bottom = {0:.2f} [kNm^2/m], EA at bottom = {1:.2f} [kN/m]'.format(EI, EA))
+    parameters = dict(ri=ri, n_pieces=n_pieces, D=D, L=L, H_drilling_platform=H_drilling_platform, v=v,
+                      F_hoop=F_hoop_at_base, gamma_G=gamma_G, f_ck=f_ck, alpha_cc=alpha_cc, gamma_c=gamma_c)
+    du = get_sensitivities_shaft_secant_piles(**parameters)[2]
+    if not np.isfinite(du['D']):
+        return None
+    du = {key: float(value) for key, value in du.items()}
+    return figure_cache.get_or_render(plot_tornado, du, parameters, 'utilisation sigma_cd/f_cd [-]', 0.1, shaft_name + ' hoop stress utilisation at base')
@@ -1,17 +1,37 @@
 import numpy as np
+from functools import partial
 from src.wall_secant_piles import (get_parameters_wall_secant_piles, plot_wall_secant_piles,
                                    plot_wall_secant_piles_3d, plot_wall_secant_piles_2items,
                                    plot_wall_secant_piles_3d_2items)
+from src.figure_cache import figure_cache
+from src.compute_graph import get_graph
+from src.mesh_export import get_wall_secant_piles_mesh, get_mesh_bytes
+from src.design_limits import get_critical_depth_secant_piles, get_max_verticality_secant_piles
 
 # Initial parameters
 parameters_init = {"project_name_spw": "Sample project", "project_revision_spw": "First issue, rev0", "wall_name_spw": "Wall 1", "D_spw": 1.2,
-            "n_pieces_spw": 10, "a_spw": 0.75, "L_spw": 25.0, "v_spw": 0.75, "H_drilling_platform_spw": 0.0, "plotting_option_spw":'Two piles apart'}
+            "n_pieces_spw": 10, "a_spw": 0.75, "L_spw": 25.0, "v_spw": 0.75, "H_drilling_platform_spw": 0.0, "plotting_option_spw":'Two piles apart', "seed_spw": 0}
+
+def build_graph(graph):
+    """ Declares the computations of the form as nodes of a compute graph, see src.compute_graph"""
+    graph.add_node('geometry', get_parameters_wall_secant_piles, ['D', 'a', 'L', 'H_drilling_platform', 'v'],
+                   outputs=['t_top', 'd_top', 'x0', 'x', 't_eff', 'd_eff'])
+    graph.add_node('critical depth', get_critical_depth_secant_piles, ['D', 'a', 'H_drilling_platform', 'v'])
+    graph.add_node('max verticality', get_max_verticality_secant_piles, ['D', 'a', 'L', 'H_drilling_platform'])
+    graph.add_node('2D plot two piles', partial(figure_cache.get_or_render, plot_wall_secant_piles_2items), ['a', 'D', 'x0', 'x', 'wall_name'])
+    graph.add_node('3D plot two piles', partial(figure_cache.get_or_render, plot_wall_secant_piles_3d_2items, 2), ['a', 'D', 'L', 'x0', 'x', 'wall_name'])
+    graph.add_node('2D plot', partial(figure_cache.get_or_render, plot_wall_secant_piles), ['n_pieces', 'a', 'D', 'x0', 'x', 'wall_name', 'seed'])
+    graph.add_node('3D plot', partial(figure_cache.get_or_render, plot_wall_secant_piles_3d), ['n_pieces', 'a', 'D', 'L', 'x0', 'x', 'wall_name', 'seed'])
+    graph.add_node('3D model', get_3d_model, ['n_pieces', 'a', 'D', 'L', 'x0', 'x', 'seed', 'wall_name'])
+
 
 def main_secant_piled_wall(st, parameters=None):
     """ Main program for secant piled wall
     """
     if parameters is None:
         parameters = parameters_init
+    graph = get_graph(st.session_state, 'Secant piled wall', build_graph)
+    graph.start_rerun()
 
     st.title('Geometric check for secant piled wall')
 
@@ -28,7 +48,8 @@ def main_secant_piled_wall(st, parameters=None):
     v = col2.number_input('Drilling verticality [%]', value=parameters['v_spw'], step=0.1, min_value=0.05, max_value=2.0, key='v_spw')
     H_drilling_platform = st.number_input('Height of drilling platform above top of piles [m]', value=parameters['H_drilling_platform_spw'], step=1.0, min_value=0.0, max_value=20.0, key='H_drilling_platform_spw')
     st.write('The initial devivation by free drilling x0 = {:.2f} cm'.format(H_drilling_platform*v))
-    t_top, d_top, x0, x, t_eff, d_eff = get_parameters_wall_secant_piles(D, a, L, H_drilling_platform, v)
+    graph.set_inputs(wall_name=wall_name, D=D, a=a, L=L, v=v, H_drilling_platform=H_drilling_platform)
+    t_top, d_top, x0, x, t_eff, d_eff = graph.get('geometry')
 
     st.header('Output parameters for {}'.format(wall_name))
     col1, col2 = st.columns(2)
@@ -36,13 +57,15 @@ def main_secant_piled_wall(st, parameters=None):
     col1.write('Overcut at top of wall t = {:.2f} cm'.format(t_top*100))
     col1.write('Effective thickness at top of wall d = {:.2f} cm'.format(d_top*100))
     col1.write('Deviation at bottom of wall dx = {:.2f} cm'.format(x*100))
+    z_critical = graph.get('critical depth')
+    col1.write('Interlock is lost at depth z = {:.2f} m'.format(z_critical) if np.isfinite(z_critical) else 'Interlock is lost already at top')
+    v_max = graph.get('max verticality')
+    col1.write('Maximum verticality for interlock down to base of wall v = {:.3f} %'.format(v_max) if np.isfinite(v_max) else 'Maximum verticality for interlock down to base of wall: not possible even for vertical piles')
 
     if t_eff > 0:
-        d_eff = 2*np.sqrt((D/2)*t_eff - (t_eff/2)**2) # overlapped thickness, m    
         col2.write('Overcut at bottom of wall t_eff = {:.2f} cm'.format(t_eff*100))
         col2.write('Effective thickness at bottom of wall d_eff = {:.2f} cm'.format(d_eff*100))
     else:
-        d_eff = np.nan
         col2.warning('PILES DO NOT TOUCH IN BASE OF WALL!!')
 
 
@@ -51,13 +74,18 @@ def main_secant_piled_wall(st, parameters=None):
     plotting_options = ['Two piles apart', 'Random deviations']
     plotting_option = col1.selectbox('Type of visualization', plotting_options, index=plotting_options.index(parameters['plotting_option_spw']), key='plotting_option_spw')
     if plotting_option == 'Two piles apart':
-        fig1 = plot_wall_secant_piles_2items(a, D, x0, x, wall_name)
-        st.pyplot(fig1)
-        fig2 = plot_wall_secant_piles_3d_2items(2, a, D, L, x0, x, wall_name)
-        st.pyplot(fig2)
+        st.image(graph.get('2D plot two piles'))
+        st.image(graph.get('3D plot two piles'))
     else:
         n_pieces = int(col2.number_input('Number of piles to plot', value=int(parameters['n_pieces_spw']), format='%i', min_value=2, max_value=100, step=1, key='n_pieces_spw'))
-        fig1 = plot_wall_secant_piles(n_pieces, a, D, x0, x, wall_name)
-        st.pyplot(fig1)
-        fig2 = plot_wall_secant_piles_3d(n_pieces, a, D, L, x0, x, wall_name)
-        st.pyplot(fig2)
+        seed = int(col2.number_input('Seed for random drilling deviations [-]', value=int(parameters['seed_spw']), format='%i', min_value=0, max_value=2**31-1, step=1, key='seed_spw'))
+        graph.set_inputs(n_pieces=n_pieces, seed=seed)
+        st.image(graph.get('2D plot'))
+        st.image(graph.get('3D plot'))
+        st.download_button('Download 3D model of piles (.glb)', graph.get('3D model'), file_name='{}.glb'.format(wall_name), mime='model/gltf-binary')
+
+
+def get_3d_model(n_pieces, a, D, L, x0, x, seed, wall_name):
+    """ Gets 3D model of the deviated piles as binary glTF, see src.mesh_export"""
+    vertices, triangles = get_wall_secant_piles_mesh(n_pieces, a, D, L, x0, x, seed)
+    return get_mesh_bytes(vertices, triangles, '.glb', wall_name)
@@ -0,0 +1,243 @@
+""" Mesh export of deviated piles and panels for BIM/CAD viewers
+
+All piles (panels) of a structure form one triangle mesh with a shared vertex buffer (float32, shape (n_vertices, 3)) and
+index buffer (uint32, shape (n_triangles, 3)), built in a few vectorized calls:
+    Piles:   closed cylinders from the quadrilaterals of get_cylinders_mesh, split into two triangles each, and end caps
+    Panels:  boxes between the deviated panel footprints at top and base
+Coordinates are in meters with z = 0 at top of piles (panels) and z = -L at their base. Pile centers are deviated with
+the same random directions as in the figures for the same seed. The buffers are written straight to the files:
+    .obj    Wavefront OBJ (text)
+    .stl    binary STL
+    .glb    binary glTF 2.0, y up as required by glTF
+    .gltf   glTF 2.0 with the buffers embedded as base64
+Usage from the repository root, one file per structure:
+
+    python -m src.mesh_export structures.csv meshes --format glb
+"""
+import os
+import re
+import io
+import json
+import base64
+import struct
+import argparse
+import numpy as np
+from src.batch import read_structures, get_parameters
+from src.shaft_secant_piles import get_cylinders_mesh, get_deviated_pile_centers, get_parameters_shaft_secant_piles_batch
+from src.wall_secant_piles import get_parameters_wall_secant_piles_batch
+from src.shaft_diaphragm_panels import get_number_of_panels, get_parameters_shaft_diaphragm_panels_batch
+
+FORMATS = ['.obj', '.stl', '.glb', '.gltf']
+BOX_TRIANGLES = np.array([[0, 1, 2], [0, 2, 3],     # top, corners 0-3 counterclockwise seen from above
+                          [4, 6, 5], [4, 7, 6],     # base, corners 4-7 below corners 0-3
+                          [0, 5, 1], [0, 4, 5], [1, 6, 2], [1, 5, 6], [2, 7, 3], [2, 6, 7], [3, 4, 0], [3, 7, 4]])
+
+
+def triangulate_quads(faces):
+    """ Splits quadrilateral faces (n, 4) into triangles (2*n, 3) of the same orientation"""
+    return np.stack((faces[:, [0, 1, 2]], faces[:, [0, 2, 3]]), axis=1).reshape(-1, 3)
+
+
+def get_piles_mesh(x0, y0, x, y, D, L, n_sides=16):
+    """ Gets mesh of closed cylinders for piles
+    x0, y0: coordinates of pile centers at top of piles
+    x, y: coordinates of pile centers at base of piles
+    D: pile diameter [m]
+    L: pile length [m]
+    n_sides: number of sides around the circumference
+    Returns vertices (n_vertices, 3) and triangles as vertex indices (n_triangles, 3)
+    """
+    n = len(x0)
+    points0 = np.column_stack((x0, y0, np.zeros(n)))        # top
+    points1 = np.column_stack((x, y, np.full(n, -float(L)))) # base
+    vertices, faces = get_cylinders_mesh(points0, points1, D/2, n_sides, n_rings=2)
+    n_mantle = vertices.shape[0]
+
+    # caps as triangle fans around the axis end points, the first ring lies at the top
+    i_pile, i_side = np.meshgrid(np.arange(n), np.arange(n_sides), indexing='ij')
+    i_next = (i_side + 1) % n_sides
+    top = np.stack((np.broadcast_to(n_mantle + 2*i_pile, i_side.shape), 2*n_sides*i_pile + i_side, 2*n_sides*i_pile + i_next), axis=-1)
+    base = np.stack((np.broadcast_to(n_mantle + 2*i_pile + 1, i_side.shape), 2*n_sides*i_pile + n_sides + i_next, 2*n_sides*i_pile + n_sides + i_side), axis=-1)
+    vertices = np.concatenate((vertices, np.stack((points0, points1), axis=1).reshape(-1, 3)))
+    triangles = np.concatenate((triangulate_quads(faces), top.reshape(-1, 3), base.reshape(-1, 3)))
+    return vertices.astype(np.float32), triangles.astype(np.uint32)
+
+
+def get_boxes_mesh(corners0, corners, L):
+    """ Gets mesh of boxes for panels
+    corners0: corners of the panel footprints at top of panels, counterclockwise, array of shape (n, 4, 2)
+    corners: corners at base of panels, array of shape (n, 4, 2)
+    L: panel length (depth) [m]
+    Returns vertices (8*n, 3) and triangles as vertex indices (12*n, 3)
+    """
+    corners0, corners = np.asarray(corners0, dtype=float), np.asarray(corners, dtype=float)
+    n = corners0.shape[0]
+    z = np.concatenate((np.zeros((n, 4, 1)), np.full((n, 4, 1), -float(L))), axis=1)
+    vertices = np.concatenate((np.concatenate((corners0, corners), axis=1), z), axis=2)
+    triangles = BOX_TRIANGLES[np.newaxis, :, :] + 8*np.arange(n)[:, np.newaxis, np.newaxis]
+    return vertices.reshape(-1, 3).astype(np.float32), triangles.reshape(-1, 3).astype(np.uint32)
+
+
+def get_shaft_secant_piles_mesh(ri, n_pieces, D, L, dev0=0.0, dev=0.0, seed=None, n_sides=16):
+    """ Gets mesh of secant piled shaft with random drilling deviation, see plot_shaft_3d"""
+    angles = np.linspace(0, 2*np.pi-2*np.pi/n_pieces, n_pieces)
+    r = ri + D/2
+    x0, y0, x, y = get_deviated_pile_centers(r*np.cos(angles), r*np.sin(angles), dev0, dev, seed)
+    return get_piles_mesh(x0, y0, x, y, D, L, n_sides)
+
+
+def get_wall_secant_piles_mesh(n_pieces, a, D, L, dev0=0.0, dev=0.0, seed=None, n_sides=16):
+    """ Gets mesh of secant piled wall with random drilling deviation, see plot_wall_secant_piles_3d"""
+    x = np.linspace(0.0, (n_pieces-1)*a, n_pieces)
+    x0, y0, x, y = get_deviated_pile_centers(x, np.zeros_like(x), dev0, dev, seed)
+    return get_piles_mesh(x0, y0, x, y, D, L, n_sides)
+
+
+def get_shaft_diaphragm_panels_mesh(di, D, B, L, dev0=0.0, dev=0.0, seed=None):
+    """ Gets mesh of diaphragm panel shaft with random radial deviation of the panels, see plot_shaft_diaphragm_panels"""
+    ri = di/2
+    n_pieces = int(get_number_of_panels(ri, D, B))
+    angles = 2*np.pi*np.arange(n_pieces)/n_pieces
+    directions = np.random.default_rng(seed).choice(np.array([-1, 1]), n_pieces)
+    radial = np.column_stack((np.cos(angles), np.sin(angles)))[:, np.newaxis, :]
+    tangential = np.column_stack((-np.sin(angles), np.cos(angles)))[:, np.newaxis, :]
+    r = np.array([ri, ri + D, ri + D, ri])[np.newaxis, :, np.newaxis]
+    t = np.array([-B/2, -B/2, B/2, B/2])[np.newaxis, :, np.newaxis]
+    corners = [(r + directions[:, np.newaxis, np.newaxis]*deviation)*radial + t*tangential for deviation in (dev0, dev)]
+    return get_boxes_mesh(corners[0], corners[1], L)
+
+
+def get_wall_diaphragm_panels_mesh(n_pieces, D, B, L, dev0=0.0, dev=0.0):
+    """ Gets mesh of diaphragm panel wall, neighboring panels deviate in opposite directions, see plot_wall_diaphragm_panels"""
+    directions = np.where(np.arange(n_pieces) % 2 == 0, -1.0, 1.0)[:, np.newaxis, np.newaxis]
+    x = np.arange(n_pieces)[:, np.newaxis, np.newaxis]*B + np.array([0.0, B, B, 0.0])[np.newaxis, :, np.newaxis]
+    y = np.array([-D/2, -D/2, D/2, D/2])[np.newaxis, :, np.newaxis]
+    corners = [np.concatenate((x, y + directions*deviation), axis=2) for deviation in (dev0, dev)]
+    return get_boxes_mesh(corners[0], corners[1], L)
+
+
+def get_structure_mesh(structure, parameters=None, n_sides=16):
+    """ Gets mesh of a structure, see src.batch
+    parameters: parameters of the structure completed with default values, None for get_parameters(structure)
+    """
+    p = get_parameters(structure) if parameters is None else parameters
+    structure_type = structure['structure_type']
+    if structure_type == 'Secant piled shaft':
+        x0, x = get_parameters_shaft_secant_piles_batch(p['di']/2, p['n_pieces'], p['D'], p['L'], p['H_drilling_platform'], p['v'])[3:5]
+        return get_shaft_secant_piles_mesh(p['di']/2, int(p['n_pieces']), p['D'], p['L'], x0, x, int(p['seed']), n_sides)
+    if structure_type == 'Secant piled wall':
+        x0, x = get_parameters_wall_secant_piles_batch(p['D'], p['a'], p['L'], p['H_drilling_platform'], p['v'])[2:4]
+        return get_wall_secant_piles_mesh(int(p['n_pieces']), p['a'], p['D'], p['L'], x0, x, int(p['seed']), n_sides)
+    x0, x = get_parameters_shaft_diaphragm_panels_batch(p['D'], p['L'], p['H_drilling_platform'], p['v'])[:2]
+    if structure_type == 'Diaphragm panel shaft':
+        return get_shaft_diaphragm_panels_mesh(p['di'], p['D'], p['B'], p['L'], x0, x, int(p['seed']))
+    return get_wall_diaphragm_panels_mesh(2, p['D'], p['B'], p['L'], x0, x)
+
+
+def write_obj(f, vertices, triangles, name='', block_size=100000):
+    """ Writes mesh to a binary file object as Wavefront OBJ, block by block"""
+    f.write('o {}\n'.format(re.sub(r'\s+', '_', name) or 'mesh').encode())
+    for records, line in ((vertices, 'v %.4f %.4f %.4f\n'), (triangles.astype(np.int64) + 1, 'f %d %d %d\n')):
+        for start in range(0, len(records), block_size):
+            block = records[start:start + block_size]
+            f.write(((line*len(block)) % tuple(block.ravel().tolist())).encode())
+
+
+def write_stl(f, vertices, triangles, name=''):
+    """ Writes mesh to a binary file object as binary STL"""
+    corners = vertices[triangles]
+    normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    lengths = np.linalg.norm(normals, axis=1)
+    normals /= np.where(lengths > 0, lengths, 1.0)[:, np.newaxis]
+    records = np.zeros(len(triangles), dtype=np.dtype([('normal', '<f4', (3,)), ('corners', '<f4', (3, 3)), ('attribute', '<u2')]))
+    records['normal'] = normals
+    records['corners'] = corners
+    f.write(name.encode('ascii', 'replace')[:80].ljust(80, b' '))
+    f.write(struct.pack('<I', len(triangles)))
+    f.write(records.tobytes())
+
+
+def get_gltf(vertices, triangles, name=''):
+    """ Gets glTF 2.0 JSON and binary buffer of a mesh, positions converted to y up"""
+    positions = np.ascontiguousarray(vertices[:, [0, 2, 1]]*np.array([1, 1, -1], dtype=np.float32), dtype='<f4')
+    indices = np.ascontiguousarray(triangles, dtype='<u4')
+    buffer = positions.tobytes() + indices.tobytes()
+    gltf = {'asset': {'version': '2.0', 'generator': 'piles_and_panels'},
+            'scene': 0, 'scenes': [{'nodes': [0]}], 'nodes': [{'mesh': 0, 'name': name}],
+            'meshes': [{'name': name, 'primitives': [{'attributes': {'POSITION': 0}, 'indices': 1, 'mode': 4}]}],
+            'buffers': [{'byteLength': len(buffer)}],
+            'bufferViews': [{'buffer': 0, 'byteOffset': 0, 'byteLength': positions.nbytes, 'target': 34962},
+                            {'buffer': 0, 'byteOffset': positions.nbytes, 'byteLength': indices.nbytes, 'target': 34963}],
+            'accessors': [{'bufferView': 0, 'componentType': 5126, 'count': len(positions), 'type': 'VEC3',
+                           'min': positions.min(axis=0).tolist(), 'max': positions.max(axis=0).tolist()},
+                          {'bufferView': 1, 'componentType': 5125, 'count': indices.size, 'type': 'SCALAR'}]}
+    return gltf, buffer
+
+
+def write_glb(f, vertices, triangles, name=''):
+    """ Writes mesh to a binary file object as binary glTF (.glb)"""
+    gltf, buffer = get_gltf(vertices, triangles, name)
+    json_chunk = json.dumps(gltf, separators=(',', ':')).encode()
+    json_chunk += b' '*(-len(json_chunk) % 4)
+    buffer += b'\x00'*(-len(buffer) % 4)
+    f.write(struct.pack('<4sII', b'glTF', 2, 12 + 8 + len(json_chunk) + 8 + len(buffer)))
+    f.write(struct.pack('<I4s', len(json_chunk), b'JSON') + json_chunk)
+    f.write(struct.pack('<I4s', len(buffer), b'BIN\x00') + buffer)
+
+
+def write_gltf(f, vertices, triangles, name=''):
+    """ Writes mesh to a binary file object as glTF (.gltf) with the buffer embedded as base64"""
+    gltf, buffer = get_gltf(vertices, triangles, name)
+    gltf['buffers'][0]['uri'] = 'data:application/octet-stream;base64,' + base64.b64encode(buffer).decode()
+    f.write(json.dumps(gltf, separators=(',', ':')).encode())
+
+
+WRITERS = {'.obj': write_obj, '.stl': write_stl, '.glb': write_glb, '.gltf': write_gltf}
+
+
+def write_mesh(file_name, vertices, triangles, name=''):
+    """ Writes mesh to file_name, the format is given by the extension, see FORMATS"""
+    extension = os.path.splitext(file_name)[1].lower()
+    if extension not in WRITERS:
+        raise ValueError('Unknown mesh format {}'.format(extension))
+    with open(file_name, 'wb') as f:
+        WRITERS[extension](f, vertices, triangles, name)
+
+
+def get_mesh_bytes(vertices, triangles, file_format='.glb', name=''):
+    """ Gets mesh file as bytes, e.g. for a download in the app
+    file_format: see FORMATS
+    """
+    buffer = io.BytesIO()
+    WRITERS[file_format](buffer, vertices, triangles, name)
+    return buffer.getvalue()
+
+
+def export_meshes(input_file, output_dir, file_format='.glb', n_sides=16):
+    """ Writes a mesh file of each structure of input_file to output_dir
+    Returns number of structures
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    n_structures = 0
+    for i, structure in enumerate(read_structures(input_file)):
+        vertices, triangles = get_structure_mesh(structure, n_sides=n_sides)
+        name = structure.get('name', '')
+        file_stem = '{0:06d}_{1}'.format(i, re.sub(r'[^\w\-]+', '_', name))
+        write_mesh(os.path.join(output_dir, file_stem + file_format), vertices, triangles, name)
+        n_structures += 1
+    return n_structures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Mesh export of deviated piles and panels (OBJ, binary STL, glTF)')
+    parser.add_argument('input_file', help='CSV or JSONL table of structures, or JSON project file')
+    parser.add_argument('output_dir', help='directory for the mesh files, one per structure')
+    parser.add_argument('--format', default='glb', choices=[file_format[1:] for file_format in FORMATS], help='mesh format (default: glb)')
+    parser.add_argument('--n-sides', type=int, default=16, help='number of sides around the circumference of piles (default: 16)')
+    args = parser.parse_args(argv)
+    n_structures = export_meshes(args.input_file, args.output_dir, '.' + args.format, args.n_sides)
+    print('{0} meshes written to {1}'.format(n_structures, args.output_dir))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,227 @@
+import math
+import numpy as np
+from src.shaft_diaphragm_panels import get_number_of_panels
+
+# First-order reliability method (FORM) for the interlock (contact) and hoop checks
+# Instead of one worst-case verticality and partial factors, the inputs v, H_drilling_platform, F_hoop and f_ck are random
+# variables with the input values as means (give f_ck as mean strength, e.g. f_ck + 8 MPa) and a coefficient of variation:
+#     normal:     x = mean*(1 + cov*u)
+#     lognormal:  x = mean*exp(zeta*u - zeta**2/2), zeta = sqrt(ln(1 + cov**2))
+# with u standard normal. The reliability index beta is the distance from the origin to the design point u*, the most likely
+# failure point on the limit state surface g(x(u)) = 0, found with the Hasofer-Lind-Rackwitz-Fiessler iteration
+#     u_k+1 = (grad_g(u_k).u_k - g(u_k))/|grad_g(u_k)|**2*grad_g(u_k)
+# and the probability of failure is p_f = Phi(-beta). The limit states (g > 0 safe) with their analytic gradients are
+#     Secant piles, interlock:    g = t_eff - t_min,  t_eff = D - a - (4*H_drilling_platform + 2*L)*v/100
+#     Secant piles, hoop:         g = R**2*d_eff**2 - S*|S|,  d_eff**2 = t_eff*(2*D - t_eff),  R = 1000*alpha_cc*f_ck/gamma_c,  S = gamma_G*F_hoop
+#     Panels, contact:            g = d_eff - d_min,  d_eff = D - 2*(H_drilling_platform + L)*v/100
+#     Panels, hoop:               g = R*d_eff - S
+# with d_eff = min((ri + D - x)/c, B/(2*s)) - (ri + x)/c, x = (H_drilling_platform + L)*v/100, c = cos(pi/n_pieces), s = sin(pi/n_pieces)
+# for panel shafts (polygonal ring, see get_parameters_shaft_diaphragm_panels_ring) instead of the straight joints of walls.
+# The hoop limit state of secant piles is R*d_eff - S in squared form, which has the same failure surface but stays smooth
+# where piles lose interlock (t_eff <= 0). Partial factors default to 1.0. All inputs are scalars or numpy arrays which
+# broadcast against each other, so that every structure of a portfolio is iterated at once.
+
+DEFAULT_RANDOM_VARIABLES = {'v': ('lognormal', 0.3), 'H_drilling_platform': ('normal', 0.1), 'F_hoop': ('lognormal', 0.2), 'f_ck': ('lognormal', 0.15)}
+
+
+def transform_to_physical(u, means, random_variables):
+    """ Gets values of the random variables and their derivatives dx/du at standard normal u
+    u: dict {variable name: array of u}
+    means: dict {variable name: mean value}
+    random_variables: dict {variable name: (distribution 'normal' or 'lognormal', coefficient of variation)}
+    """
+    x, dx = {}, {}
+    for name, (distribution, cov) in random_variables.items():
+        mean = np.asarray(means[name], dtype=float)
+        if distribution == 'normal':
+            x[name] = mean*(1 + cov*u[name])
+            dx[name] = mean*cov + np.zeros_like(u[name])
+        elif distribution == 'lognormal':
+            zeta = math.sqrt(math.log1p(cov**2))
+            x[name] = mean*np.exp(zeta*u[name] - zeta**2/2)
+            dx[name] = zeta*x[name]
+        else:
+            raise ValueError('Unknown distribution {}'.format(distribution))
+    return x, dx
+
+
+def get_probability_of_failure(beta):
+    """ Gets probability of failure p_f = Phi(-beta) for reliability index beta"""
+    return 0.5*np.vectorize(math.erfc, otypes=[float])(np.asarray(beta, dtype=float)/math.sqrt(2))
+
+
+def get_form_reliability(limit_state, parameters, random_variables, tol=1.0e-6, max_iterations=100):
+    """ Gets reliability index and design point with the HL-RF iteration, vectorized over structures
+    limit_state: function of the keyword parameters returning g and dict {variable name: dg/dx}, g > 0 safe
+    parameters: dict of all parameters of limit_state, the values of the random variables are their means
+    random_variables: dict {variable name: (distribution, coefficient of variation)}, see transform_to_physical
+    tol: convergence tolerance for the change of u
+    Returns dict of beta, p_f, design_point (dict {variable name: x*}), converged, n_iterations
+    converged is False where the iteration did not end on the limit state surface, beta is -inf (p_f = 1) there if g < 0 at the
+    means and at the end, e.g. piles which do not interlock at any verticality
+    """
+    names = list(random_variables)
+    if not names:
+        raise ValueError('No random variables')
+    shape = np.broadcast_shapes(*[np.shape(value) for value in parameters.values()])
+    u = np.zeros(shape + (len(names),))
+    converged = np.zeros(shape, dtype=bool)
+    g0 = None
+    for n_iterations in range(1, max_iterations + 1):
+        x, dx = transform_to_physical({name: u[..., i] for i, name in enumerate(names)}, parameters, random_variables)
+        g, dg = limit_state(**dict(parameters, **x))
+        gradient = np.stack([dg[name]*dx[name] for name in names], axis=-1)
+        if g0 is None:
+            g0 = np.broadcast_to(g, shape)
+        norm2 = np.sum(gradient**2, axis=-1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            u_new = ((np.sum(gradient*u, axis=-1) - g)/norm2)[..., np.newaxis]*gradient
+        u_new = np.where((norm2 > 0)[..., np.newaxis], u_new, u)     # g independent of the random variables: u stays at origin
+        step = np.max(np.abs(u_new - u), axis=-1)
+        u = np.where(converged[..., np.newaxis], u, u_new)
+        converged |= step < tol
+        if converged.all():
+            break
+
+    design_point, dx = transform_to_physical({name: u[..., i] for i, name in enumerate(names)}, parameters, random_variables)
+    g, dg = limit_state(**dict(parameters, **design_point))
+    norm2 = np.sum(np.stack([dg[name]*dx[name] for name in names], axis=-1)**2, axis=-1)
+    independent = np.all(u == 0, axis=-1) & (norm2 == 0)
+    converged &= independent | (np.abs(g) <= 1.0e-3*np.sqrt(norm2))     # design point on the limit state surface, within 1e-3 in u
+    beta = np.where(g0 > 0, 1.0, -1.0)*np.sqrt(np.sum(u**2, axis=-1))
+    beta = np.where(independent, np.where(g0 > 0, np.inf, -np.inf), beta)
+    beta = np.where(~converged & (g0 < 0) & (g < 0), -np.inf, beta)     # limit state surface not found, failing all the way
+    return {'beta': beta, 'p_f': get_probability_of_failure(beta), 'design_point': design_point, 'converged': converged, 'n_iterations': n_iterations}
+
+
+def get_interlock_limit_state_secant_piles(D, a, L, H_drilling_platform, v, t_min=0.0, **kwargs):
+    """ Gets limit state g = t_eff - t_min of interlock at depth L and its derivatives, see get_parameters_wall_secant_piles"""
+    t_eff = D - a - (4*H_drilling_platform + 2*L)*v/100
+    return t_eff - t_min, {'v': -(4*H_drilling_platform + 2*L)/100, 'H_drilling_platform': -4*v/100}
+
+
+def get_hoop_limit_state_secant_piles(D, a, L, H_drilling_platform, v, F_hoop, f_ck, gamma_G=1.0, alpha_cc=0.7, gamma_c=1.0, **kwargs):
+    """ Gets limit state g = R**2*d_eff**2 - S*|S| of hoop stress at depth L and its derivatives, see check_for_hoop_force"""
+    t_eff = D - a - (4*H_drilling_platform + 2*L)*v/100
+    d_eff2 = t_eff*(2*D - t_eff)
+    R = 1000*alpha_cc*f_ck/gamma_c     # design hoop stress [kPa]
+    S = gamma_G*F_hoop
+    dg_dt = R**2*(2*D - 2*t_eff)
+    dg = {'v': -dg_dt*(4*H_drilling_platform + 2*L)/100, 'H_drilling_platform': -dg_dt*4*v/100,
+          'F_hoop': -2*np.abs(S)*gamma_G, 'f_ck': 2*R*d_eff2*1000*alpha_cc/gamma_c}
+    return R**2*d_eff2 - S*np.abs(S), dg
+
+
+def get_contact_limit_state_diaphragm_panels(D, L, H_drilling_platform, v, d_min=0.0, **kwargs):
+    """ Gets limit state g = d_eff - d_min of contact at depth L and its derivatives, see get_parameters_shaft_diaphragm_panels"""
+    d_eff = D - 2*(H_drilling_platform + L)*v/100
+    return d_eff - d_min, {'v': -2*(H_drilling_platform + L)/100, 'H_drilling_platform': -2*v/100}
+
+
+def get_hoop_limit_state_diaphragm_panels(D, L, H_drilling_platform, v, F_hoop, f_ck, gamma_G=1.0, alpha_cc=0.7, gamma_c=1.0, **kwargs):
+    """ Gets limit state g = R*d_eff - S of hoop stress at depth L and its derivatives, see check_for_hoop_force"""
+    d_eff = D - 2*(H_drilling_platform + L)*v/100
+    R = 1000*alpha_cc*f_ck/gamma_c
+    dg = {'v': -R*2*(H_drilling_platform + L)/100, 'H_drilling_platform': -R*2*v/100,
+          'F_hoop': -gamma_G, 'f_ck': d_eff*1000*alpha_cc/gamma_c}
+    return R*d_eff - gamma_G*F_hoop, dg
+
+
+def get_ring_thickness_shaft_diaphragm_panels(ri, D, B, x):
+    """ Gets effective ring thickness d_eff of a polygonal ring of panels deviating by x and its derivative d(d_eff)/dx"""
+    n_pieces = get_number_of_panels(ri, D, B)
+    c, s = np.cos(np.pi/n_pieces), np.sin(np.pi/n_pieces)
+    outer = (ri + D - x)/c
+    return np.minimum(outer, B/(2*s)) - (ri + x)/c, np.where(outer <= B/(2*s), -2/c, -1/c)
+
+
+def get_contact_limit_state_shaft_diaphragm_panels(ri, D, B, L, H_drilling_platform, v, d_min=0.0, **kwargs):
+    """ Gets limit state g = d_eff - d_min of contact at depth L of diaphragm panel shaft and its derivatives,
+    see get_parameters_shaft_diaphragm_panels_ring
+    """
+    d_eff, dd_dx = get_ring_thickness_shaft_diaphragm_panels(ri, D, B, (H_drilling_platform + L)*v/100)
+    return d_eff - d_min, {'v': dd_dx*(H_drilling_platform + L)/100, 'H_drilling_platform': dd_dx*v/100}
+
+
+def get_hoop_limit_state_shaft_diaphragm_panels(ri, D, B, L, H_drilling_platform, v, F_hoop, f_ck, gamma_G=1.0, alpha_cc=0.7, gamma_c=1.0, **kwargs):
+    """ Gets limit state g = R*d_eff - S of hoop stress at depth L of diaphragm panel shaft and its derivatives, see check_for_hoop_force"""
+    d_eff, dd_dx = get_ring_thickness_shaft_diaphragm_panels(ri, D, B, (H_drilling_platform + L)*v/100)
+    R = 1000*alpha_cc*f_ck/gamma_c
+    dg = {'v': R*dd_dx*(H_drilling_platform + L)/100, 'H_drilling_platform': R*dd_dx*v/100,
+          'F_hoop': -gamma_G, 'f_ck': d_eff*1000*alpha_cc/gamma_c}
+    return R*d_eff - gamma_G*F_hoop, dg
+
+
+def get_random_variables(random_variables, names):
+    """ Gets random variables among names, DEFAULT_RANDOM_VARIABLES for None"""
+    random_variables = DEFAULT_RANDOM_VARIABLES if random_variables is None else random_variables
+    return {name: value for name, value in random_variables.items() if name in names}
+
+
+def get_reliability_secant_piles(D, a, L, H_drilling_platform, v=0.75, F_hoop=None, f_ck=10.0, t_min=0.0, gamma_G=1.0, alpha_cc=0.7, gamma_c=1.0,
+                                 random_variables=None, **kwargs):
+    """ Gets FORM reliability of interlock and hoop stress at depth L of secant piles
+    D: pile diameter [m]
+    a: C/C pile spacing at top [m]
+    L: depth of the check below top of piles, e.g. pile length [m]
+    H_drilling_platform: height of drilling platform above top of piles [m], mean
+    v: percentage of verticality [%], mean
+    F_hoop: hoop force [kN/m], mean, None for interlock only
+    f_ck: mean compressive strength of concrete [MPa]
+    t_min: minimum overcut for interlock [m]
+    random_variables: dict {variable name: (distribution, coefficient of variation)}, None for DEFAULT_RANDOM_VARIABLES
+    kwargs: tol, max_iterations, see get_form_reliability
+    Returns results of interlock and of hoop stress (None without F_hoop), see get_form_reliability
+    """
+    parameters = {'D': D, 'a': a, 'L': L, 'H_drilling_platform': H_drilling_platform, 'v': v, 't_min': t_min}
+    interlock = get_form_reliability(get_interlock_limit_state_secant_piles, parameters,
+                                     get_random_variables(random_variables, ['v', 'H_drilling_platform']), **kwargs)
+    if F_hoop is None:
+        return interlock, None
+    parameters.update({'F_hoop': F_hoop, 'f_ck': f_ck, 'gamma_G': gamma_G, 'alpha_cc': alpha_cc, 'gamma_c': gamma_c})
+    hoop = get_form_reliability(get_hoop_limit_state_secant_piles, parameters,
+                                get_random_variables(random_variables, ['v', 'H_drilling_platform', 'F_hoop', 'f_ck']), **kwargs)
+    return interlock, hoop
+
+
+def get_reliability_shaft_secant_piles(ri, n_pieces, D, L, H_drilling_platform, v=0.75, F_hoop=None, f_ck=10.0, **kwargs):
+    """ Gets FORM reliability of interlock and hoop stress at depth L of secant piled shaft, see get_reliability_secant_piles
+    ri: inner shaft radius [m]
+    n_pieces: number of piles
+    """
+    a = np.pi*(2*np.asarray(ri, dtype=float) + np.asarray(D, dtype=float))/np.asarray(n_pieces, dtype=float)
+    return get_reliability_secant_piles(D, a, L, H_drilling_platform, v, F_hoop, f_ck, **kwargs)
+
+
+def get_reliability_diaphragm_panels(D, L, H_drilling_platform, v=0.5, F_hoop=None, f_ck=10.0, d_min=0.0, gamma_G=1.0, alpha_cc=0.7, gamma_c=1.0,
+                                     random_variables=None, **kwargs):
+    """ Gets FORM reliability of contact and hoop stress at depth L of diaphragm panel wall (straight joints), see get_reliability_secant_piles
+    D: panel thickness [m]
+    d_min: minimum contact thickness [m]
+    """
+    parameters = {'D': D, 'L': L, 'H_drilling_platform': H_drilling_platform, 'v': v, 'd_min': d_min}
+    contact = get_form_reliability(get_contact_limit_state_diaphragm_panels, parameters,
+                                   get_random_variables(random_variables, ['v', 'H_drilling_platform']), **kwargs)
+    if F_hoop is None:
+        return contact, None
+    parameters.update({'F_hoop': F_hoop, 'f_ck': f_ck, 'gamma_G': gamma_G, 'alpha_cc': alpha_cc, 'gamma_c': gamma_c})
+    hoop = get_form_reliability(get_hoop_limit_state_diaphragm_panels, parameters,
+                                get_random_variables(random_variables, ['v', 'H_drilling_platform', 'F_hoop', 'f_ck']), **kwargs)
+    return contact, hoop
+
+
+def get_reliability_shaft_diaphragm_panels(ri, D, B, L, H_drilling_platform, v=0.5, F_hoop=None, f_ck=10.0, d_min=0.0, gamma_G=1.0, alpha_cc=0.7, gamma_c=1.0,
+                                           random_variables=None, **kwargs):
+    """ Gets FORM reliability of contact and hoop stress at depth L of diaphragm panel shaft (polygonal ring), see get_reliability_diaphragm_panels
+    ri: inner shaft radius [m]
+    B: panel length [m]
+    """
+    parameters = {'ri': ri, 'D': D, 'B': B, 'L': L, 'H_drilling_platform': H_drilling_platform, 'v': v, 'd_min': d_min}
+    contact = get_form_reliability(get_contact_limit_state_shaft_diaphragm_panels, parameters,
+                                   get_random_variables(random_variables, ['v', 'H_drilling_platform']), **kwargs)
+    if F_hoop is None:
+        return contact, None
+    parameters.update({'F_hoop': F_hoop, 'f_ck': f_ck, 'gamma_G': gamma_G, 'alpha_cc': alpha_cc, 'gamma_c': gamma_c})
+    hoop = get_form_reliability(get_hoop_limit_state_shaft_diaphragm_panels, parameters,
+                                get_random_variables(random_variables, ['v', 'H_drilling_platform', 'F_hoop', 'f_ck']), **kwargs)
+    return contact, hoop
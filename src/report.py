@@ -1,2 +1,157 @@
+""" Multi-page PDF reports for one or many structures
+
+Each structure gets a page with its input parameters, output parameters and hoop check, followed by one page per figure.
+Figures are rendered to PNG in a pool of worker processes and the pages are written one at a time through PdfPages,
+so that only the figures of a few structures are held in memory. Usage from the repository root:
+
+    python -m src.report structures.jsonl report.pdf --workers 4
+"""
 import os
-import sys
\ No newline at end of file
+import argparse
+from io import BytesIO
+from itertools import islice, chain
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from src.batch import read_structures, get_parameters, evaluate_structures, plot_structure, init_worker
+
+PAGE_SIZE = (8.27, 11.69)   # A4 portrait [inch]
+
+
+def render_structure_figures(structures, dpi=150):
+    """ Renders the figures of structures to PNG bytes
+    Returns list of lists of PNG bytes, empty for structures with invalid parameters
+    """
+    import matplotlib.pyplot as plt
+
+    pngs = []
+    for structure in structures:
+        try:
+            figs = plot_structure(structure, get_parameters(structure))
+        except (ValueError, TypeError):
+            figs = []
+        pngs_structure = []
+        for fig in figs:
+            buffer = BytesIO()
+            fig.savefig(buffer, format='png', dpi=dpi)
+            plt.close(fig)
+            pngs_structure.append(buffer.getvalue())
+        pngs.append(pngs_structure)
+    return pngs
+
+
+def get_report_lines(structure, result):
+    """ Gets text lines for inputs, outputs and hoop check of a structure"""
+    lines = ['Structure type: {}'.format(result['structure_type']), '', 'INPUT PARAMETERS']
+    if 'error' in result:
+        return lines + ['Invalid input: {}'.format(result['error'])]
+    parameters = get_parameters(structure)
+    lines += ['{0} = {1:g}'.format(key, value) for key, value in parameters.items()]
+
+    lines += ['', 'OUTPUT PARAMETERS']
+    units = {'a': ('C/c spacing at top a', 1.0, 'm'), 't_top': ('Overcut at top t', 100.0, 'cm'), 'd_top': ('Effective thickness at top d', 100.0, 'cm'),
+             'x0': ('Deviation at top x0', 100.0, 'cm'), 'x': ('Deviation at bottom dx', 100.0, 'cm'),
+             't_eff': ('Overcut at bottom t_eff', 100.0, 'cm'), 'd_eff': ('Effective thickness at bottom d_eff', 100.0, 'cm')}
+    for key, (label, factor, unit) in units.items():
+        if result.get(key) is not None:
+            lines.append('{0} = {1:.2f} {2}'.format(label, result[key]*factor, unit))
+    if not result['touching']:
+        lines.append('PILES/ PANELS DO NOT TOUCH IN BASE!!')
+
+    if 'hoop_passed' in result:
+        lines += ['', 'CHECK FOR HOOP STRESS AT BASE']
+        if result['sigma_cd'] is None:
+            lines.append('No effective thickness at base: NOT PASSED')
+        else:
+            lines.append('Hoop stress = {0:.2f} MPa {1} design hoop stress = {2:.2f} MPa: {3}'.format(result['sigma_cd'], '<' if result['hoop_passed'] else '>',
+                         result['f_cd'], 'PASSED' if result['hoop_passed'] else 'NOT PASSED'))
+    return lines
+
+
+def plot_text_page(title, lines):
+    """ Plots a report page with a title and text lines"""
+    import matplotlib.pyplot as plt
+
+    fig = plt.figure(figsize=PAGE_SIZE)
+    fig.text(0.08, 0.95, title, fontsize=16, weight='bold', va='top')
+    fig.text(0.08, 0.90, '\n'.join(lines), fontsize=10, family='monospace', va='top', linespacing=1.6)
+    return fig
+
+
+def plot_image_page(png):
+    """ Plots a report page showing a rendered figure"""
+    import matplotlib.pyplot as plt
+
+    image = plt.imread(BytesIO(png), format='png')
+    fig = plt.figure(figsize=PAGE_SIZE)
+    ax = fig.add_axes([0.05, 0.05, 0.9, 0.9])
+    ax.imshow(image)
+    ax.set_axis_off()
+    return fig
+
+
+def write_report(structures, output, title='Piles and panels report', workers=None, chunk_size=4, dpi=150):
+    """ Writes multi-page PDF report for structures
+    structures: iterable of structure dicts, see src.batch
+    output: PDF file name or binary file object
+    workers: number of worker processes for rendering figures, None for a pool only when there are several structures, 0 for no pool
+    chunk_size: number of structures per rendering task
+    dpi: resolution of rendered figures
+    Returns number of structures
+    """
+    import matplotlib.pyplot as plt
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    structures = iter(structures)
+    first_chunk = list(islice(structures, chunk_size))
+    if workers is None:
+        workers = 0 if len(first_chunk) < chunk_size else None
+    n_workers = workers or os.cpu_count() or 1
+    executor = ProcessPoolExecutor(max_workers=n_workers, initializer=init_worker) if workers != 0 else None
+    max_pending = 2*n_workers
+
+    n_structures = 0
+    try:
+        with PdfPages(output) as pdf:
+            pdf.infodict()['Title'] = title
+            pending = deque()
+            chunk = first_chunk
+            while chunk or pending:
+                if chunk:
+                    if executor is not None:
+                        pending.append((chunk, executor.submit(render_structure_figures, chunk, dpi)))
+                    else:
+                        pending.append((chunk, None))
+                    chunk = list(islice(structures, chunk_size))
+                if pending and (not chunk or len(pending) >= max_pending):
+                    chunk_done, future = pending.popleft()
+                    pngs = future.result() if future is not None else render_structure_figures(chunk_done, dpi)
+                    for structure, result, pngs_structure in zip(chunk_done, evaluate_structures(chunk_done), pngs):
+                        n_structures += 1
+                        page_title = '{0}. {1}'.format(n_structures, result['name'] or result['structure_type'])
+                        pages = chain([lambda: plot_text_page(page_title, get_report_lines(structure, result))],
+                                      [lambda png=png: plot_image_page(png) for png in pngs_structure])
+                        for plot_page in pages:
+                            fig = plot_page()
+                            pdf.savefig(fig)
+                            plt.close(fig)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return n_structures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Multi-page PDF report for secant piled and diaphragm panel shafts and walls')
+    parser.add_argument('input_file', help='CSV or JSONL table of structures, or JSON project file')
+    parser.add_argument('output_file', help='PDF file')
+    parser.add_argument('--workers', type=int, default=None, help='number of worker processes (default: number of CPUs)')
+    parser.add_argument('--dpi', type=int, default=150, help='resolution of figures (default: 150)')
+    args = parser.parse_args(argv)
+    import matplotlib
+    matplotlib.use('Agg')
+    n_structures = write_report(read_structures(args.input_file), args.output_file, workers=args.workers, dpi=args.dpi)
+    print('{0} structures written to {1}'.format(n_structures, args.output_file))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+import os
+import json
+from operator import attrgetter
+from dataclasses import dataclass, fields
+import numpy as np
+
+# Result types of the geometry functions
+# Single calls return frozen dataclasses with __slots__ holding scalars, batch calls return the same types holding one array
+# per field (columns), so that a sweep of millions of parameter sets is a few arrays instead of millions of tuples.
+# The types unpack, index and slice like the tuples returned before, e.g. a, t_top, d_top, x0, x, t_eff, d_eff = result
+# or result[6], and name their fields, e.g. result.d_eff. Batch results are saved as
+#     .npz        compressed archive with one array per field
+#     directory   one .npy file per field and columns.json, read back memory-mapped with load_results(path, mmap_mode='r')
+
+
+class Result:
+    """ Base of the result types, behaves as the tuple of its fields
+    Field names and a getter of all fields are cached on each result type, see set_field_names
+    """
+    __slots__ = ()
+    _names = ()
+    _get_fields = None
+
+    @classmethod
+    def names(cls):
+        """ Gets field names in order"""
+        return list(cls._names)
+
+    def __iter__(self):
+        return iter(self._get_fields(self))
+
+    def __len__(self):
+        return len(self._names)
+
+    def __getitem__(self, index):
+        return self._get_fields(self)[index]
+
+    def as_dict(self):
+        """ Gets fields as dict {field name: value}"""
+        return {name: getattr(self, name) for name in self.names()}
+
+    def item(self, index=()):
+        """ Gets result of one row of a batch result, () for 0-d arrays to scalars
+        Single rows hold Python scalars, slices hold arrays
+        """
+        values = [np.asarray(value)[index] for value in self]
+        return type(self)(*[value.item() if np.ndim(value) == 0 else value for value in values])
+
+    @property
+    def shape(self):
+        """ Gets shape of the batch, () for single results"""
+        return np.broadcast_shapes(*[np.shape(value) for value in self])
+
+    def to_records(self):
+        """ Gets batch result as numpy structured array with one field per result field"""
+        columns = np.broadcast_arrays(*[np.asarray(value) for value in self])
+        records = np.empty(self.shape, dtype=[(name, column.dtype) for name, column in zip(self.names(), columns)])
+        for name, column in zip(self.names(), columns):
+            records[name] = column
+        return records
+
+    @classmethod
+    def from_records(cls, records):
+        """ Gets batch result from numpy structured array, see to_records"""
+        return cls(*[records[name] for name in cls.names()])
+
+
+@dataclass(frozen=True, slots=True)
+class SecantPiledShaftResult(Result):
+    """ Geometry of secant piled shaft, see get_parameters_shaft_secant_piles"""
+    a: float        # c/c spacing of piles at top [m]
+    t_top: float    # overcut at top [m]
+    d_top: float    # effective thickness at top [m]
+    x0: float       # deviation at top [m]
+    x: float        # deviation at toe [m]
+    t_eff: float    # overcut at toe [m]
+    d_eff: float    # effective thickness at toe [m], NaN where piles do not touch
+
+
+@dataclass(frozen=True, slots=True)
+class SecantPiledWallResult(Result):
+    """ Geometry of secant piled wall, see get_parameters_wall_secant_piles"""
+    t_top: float
+    d_top: float
+    x0: float
+    x: float
+    t_eff: float
+    d_eff: float
+
+
+@dataclass(frozen=True, slots=True)
+class DiaphragmPanelsResult(Result):
+    """ Geometry of diaphragm panel wall (or shaft with straight joints), see get_parameters_shaft_diaphragm_panels"""
+    x0: float       # deviation at top [m]
+    x: float        # deviation at toe [m]
+    d_eff: float    # effective thickness at toe [m], panels do not touch where d_eff <= 0
+
+
+@dataclass(frozen=True, slots=True)
+class DiaphragmPanelShaftResult(Result):
+    """ Geometry of diaphragm panel shaft as polygonal ring, see get_parameters_shaft_diaphragm_panels_ring"""
+    n_pieces: int
+    x0: float
+    x: float
+    d_eff: float
+
+
+RESULT_TYPES = {cls.__name__: cls for cls in (SecantPiledShaftResult, SecantPiledWallResult, DiaphragmPanelsResult, DiaphragmPanelShaftResult)}
+
+
+def set_field_names(cls):
+    """ Caches field names and a getter of all fields on a result type, once after the dataclass is created"""
+    cls._names = tuple(field.name for field in fields(cls))
+    cls._get_fields = attrgetter(*cls._names)     # returns tuple of the fields, all result types have several fields
+
+
+for cls in RESULT_TYPES.values():
+    set_field_names(cls)
+
+
+def save_results(path, results):
+    """ Saves batch result (or dict of equally long columns) to a compressed .npz file or to a directory of .npy files
+    path: file name ending with .npz, else directory (created if missing)
+    """
+    result_type = type(results).__name__ if isinstance(results, Result) else 'columns'
+    columns = results.as_dict() if isinstance(results, Result) else dict(results)
+    if path.lower().endswith('.npz'):
+        np.savez_compressed(path, __type__=np.array(result_type), **columns)
+        return
+    os.makedirs(path, exist_ok=True)
+    for name, column in columns.items():
+        np.save(os.path.join(path, name + '.npy'), np.ascontiguousarray(column))
+    with open(os.path.join(path, 'columns.json'), 'w') as f:
+        json.dump({'type': result_type, 'columns': list(columns)}, f)
+
+
+def load_results(path, mmap_mode=None):
+    """ Loads batch result saved with save_results
+    mmap_mode: e.g. 'r' to memory-map the columns of a directory, so that only the rows read are loaded (not for .npz)
+    Returns result of the saved type, or dict of columns
+    """
+    if path.lower().endswith('.npz'):
+        with np.load(path) as data:
+            result_type = str(data['__type__'])
+            columns = {name: data[name] for name in data.files if name != '__type__'}
+    else:
+        with open(os.path.join(path, 'columns.json')) as f:
+            meta = json.load(f)
+        result_type = meta['type']
+        columns = {name: np.load(os.path.join(path, name + '.npy'), mmap_mode=mmap_mode) for name in meta['columns']}
+    if result_type in RESULT_TYPES:
+        return RESULT_TYPES[result_type](**columns)
+    return columns
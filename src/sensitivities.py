@@ -0,0 +1,118 @@
+import numpy as np
+from src.shaft_secant_piles import get_parameters_shaft_secant_piles_batch, check_for_hoop_force
+from src.wall_secant_piles import get_parameters_wall_secant_piles_batch
+from src.shaft_diaphragm_panels import get_parameters_shaft_diaphragm_panels_ring_batch
+
+# Analytic sensitivities (partial derivatives) of overcut, effective thickness and hoop utilisation
+# Secant piles:   t_eff = D - a - (4*H_drilling_platform + 2*L)*v/100, a = pi*(2*ri + D)/n_pieces for shafts
+#                 d_eff = sqrt(t_eff*(2*D - t_eff)), d(d_eff)/dX = (D - t_eff)/d_eff*d(t_eff)/dX (+ t_eff/d_eff for X = D)
+# Panel shafts:   d_eff = min((ri + D - x)/c, B/(2*s)) - (ri + x)/c, x = (H_drilling_platform + L)*v/100, c = cos(pi/n_pieces),
+#                 s = sin(pi/n_pieces) for the polygonal ring, the number of panels n_pieces is taken as constant
+# Hoop check:     u = sigma_cd/f_cd = gamma_G*F_hoop/d_eff/1000/(alpha_cc*f_ck/gamma_c), du/dX = -u/d_eff*d(d_eff)/dX for geometry inputs
+# All inputs are scalars or numpy arrays which broadcast against each other, so that a whole portfolio is done in one call.
+# Derivatives are returned as dicts {input name: array}, NaN where the piles or panels do not touch.
+
+
+def get_hoop_utilisation_sensitivities(d_eff, dd_eff, F_hoop, gamma_G, f_ck, alpha_cc, gamma_c):
+    """ Gets hoop utilisation u = sigma_cd/f_cd and its derivatives
+    d_eff: effective thickness [m]
+    dd_eff: derivatives of d_eff with respect to the geometry inputs
+    Returns u and dict of du/dX for geometry and hoop check inputs
+    """
+    with np.errstate(invalid='ignore', divide='ignore'):
+        d_eff = np.where(d_eff > 0, d_eff, np.nan)
+        sigma_cd, f_cd = check_for_hoop_force(F_hoop, d_eff, gamma_G, f_ck, alpha_cc, gamma_c)
+        u = sigma_cd/f_cd
+        du = {key: -u/d_eff*value for key, value in dd_eff.items()}
+    du.update({'F_hoop': u/F_hoop, 'gamma_G': u/gamma_G, 'f_ck': -u/f_ck, 'alpha_cc': -u/alpha_cc, 'gamma_c': u/gamma_c})
+    return u, du
+
+
+def get_effective_thickness_sensitivities(t_eff, d_eff, D, dt_eff):
+    """ Gets derivatives of d_eff = sqrt(t_eff*(2*D - t_eff)) from the derivatives of t_eff"""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        dd_dt = (D - t_eff)/d_eff
+        dd_eff = {key: dd_dt*value for key, value in dt_eff.items()}
+        dd_eff['D'] = dd_eff['D'] + t_eff/d_eff
+    return dd_eff
+
+
+def get_sensitivities_shaft_secant_piles(ri, n_pieces, D, L, H_drilling_platform, v=0.75, F_hoop=None, gamma_G=1.35, f_ck=10.0, alpha_cc=0.7, gamma_c=1.5):
+    """ Gets analytic derivatives of t_eff, d_eff and hoop utilisation at toe of secant piled shaft
+    See get_parameters_shaft_secant_piles and check_for_hoop_force for the parameters
+    F_hoop: hoop force [kN/m], None for no hoop utilisation
+    Returns dicts dt_eff, dd_eff, du (None without F_hoop) of derivatives with respect to ri, n_pieces, D, L, H_drilling_platform, v
+    and for du also F_hoop, gamma_G, f_ck, alpha_cc, gamma_c
+    """
+    ri, n_pieces, D, L, H_drilling_platform, v = np.broadcast_arrays(*[np.asarray(p, dtype=float) for p in (ri, n_pieces, D, L, H_drilling_platform, v)])
+    t_eff, d_eff = get_parameters_shaft_secant_piles_batch(ri, n_pieces, D, L, H_drilling_platform, v)[5:7]
+    dt_eff = {'ri': -2*np.pi/n_pieces, 'n_pieces': np.pi*(2*ri + D)/n_pieces**2, 'D': 1 - np.pi/n_pieces,
+              'L': -2*v/100, 'H_drilling_platform': -4*v/100, 'v': -(4*H_drilling_platform + 2*L)/100}
+    dd_eff = get_effective_thickness_sensitivities(t_eff, d_eff, D, dt_eff)
+    du = None if F_hoop is None else get_hoop_utilisation_sensitivities(d_eff, dd_eff, F_hoop, gamma_G, f_ck, alpha_cc, gamma_c)[1]
+    return dt_eff, dd_eff, du
+
+
+def get_sensitivities_wall_secant_piles(D, a, L, H_drilling_platform, v=0.75):
+    """ Gets analytic derivatives of t_eff and d_eff at toe of secant piled wall
+    See get_parameters_wall_secant_piles for the parameters
+    Returns dicts dt_eff, dd_eff of derivatives with respect to D, a, L, H_drilling_platform, v
+    """
+    D, a, L, H_drilling_platform, v = np.broadcast_arrays(*[np.asarray(p, dtype=float) for p in (D, a, L, H_drilling_platform, v)])
+    t_eff, d_eff = get_parameters_wall_secant_piles_batch(D, a, L, H_drilling_platform, v)[4:6]
+    dt_eff = {'D': np.ones_like(D), 'a': -np.ones_like(a), 'L': -2*v/100, 'H_drilling_platform': -4*v/100, 'v': -(4*H_drilling_platform + 2*L)/100}
+    return dt_eff, get_effective_thickness_sensitivities(t_eff, d_eff, D, dt_eff)
+
+
+def get_sensitivities_shaft_diaphragm_panels(ri, D, B, L, H_drilling_platform, v=0.5, F_hoop=None, gamma_G=1.35, f_ck=10.0, alpha_cc=0.7, gamma_c=1.5):
+    """ Gets analytic derivatives of d_eff and hoop utilisation at toe of diaphragm panel shaft (polygonal ring)
+    See get_parameters_shaft_diaphragm_panels_ring and check_for_hoop_force for the parameters
+    F_hoop: hoop force [kN/m], None for no hoop utilisation
+    Returns dicts dd_eff, du (None without F_hoop) of derivatives with respect to ri, D, B, L, H_drilling_platform, v
+    and for du also F_hoop, gamma_G, f_ck, alpha_cc, gamma_c
+    """
+    ri, D, B, L, H_drilling_platform, v = np.broadcast_arrays(*[np.asarray(p, dtype=float) for p in (ri, D, B, L, H_drilling_platform, v)])
+    n_pieces, x0, x, d_eff = get_parameters_shaft_diaphragm_panels_ring_batch(ri, D, B, L, H_drilling_platform, v)
+    c, s = np.cos(np.pi/n_pieces), np.sin(np.pi/n_pieces)
+    closed = (ri + D - x)/c <= B/(2*s)      # outer faces of the panels govern, else the ends of the panels
+    dd_dx = np.where(closed, -2/c, -1/c)
+    touch = d_eff > 0
+    dd_eff = {key: np.where(touch, value, np.nan) for key, value in
+              {'ri': np.where(closed, 0.0, -1/c), 'D': np.where(closed, 1/c, 0.0), 'B': np.where(closed, 0.0, 1/(2*s)),
+               'L': dd_dx*v/100, 'H_drilling_platform': dd_dx*v/100, 'v': dd_dx*(H_drilling_platform + L)/100}.items()}
+    du = None if F_hoop is None else get_hoop_utilisation_sensitivities(d_eff, dd_eff, F_hoop, gamma_G, f_ck, alpha_cc, gamma_c)[1]
+    return dd_eff, du
+
+
+def get_tornado_data(derivatives, parameters, relative_change=0.1):
+    """ Gets linearized changes of an output for a relative change of each input, largest first
+    derivatives: derivatives of the output for one structure, dict {input name: value}
+    parameters: input values of the structure, dict {input name: value}
+    relative_change: relative change of each input, e.g. 0.1 for +-10 %
+    Returns list of (input name, change of output for +relative_change)
+    """
+    changes = [(key, float(value)*parameters[key]*relative_change) for key, value in derivatives.items() if key in parameters]
+    return sorted(changes, key=lambda change: -abs(change[1]) if np.isfinite(change[1]) else 0.0)
+
+
+def plot_tornado(derivatives, parameters, output_name='d_eff [m]', relative_change=0.1, title='Sensitivities'):
+    """ Plots tornado chart of the linearized change of an output for +-relative_change of each input
+    See get_tornado_data for the parameters
+    """
+    import matplotlib.pyplot as plt
+
+    changes = [change for change in get_tornado_data(derivatives, parameters, relative_change) if np.isfinite(change[1])][::-1]
+    names = [name for name, _ in changes]
+    delta = np.array([value for _, value in changes])
+    fig, ax = plt.subplots()
+    y = np.arange(len(changes))
+    ax.barh(y, delta, color='tab:blue', label='+{:.0f} % of input'.format(relative_change*100))
+    ax.barh(y, -delta, color='tab:orange', label='-{:.0f} % of input'.format(relative_change*100))
+    ax.set_yticks(y)
+    ax.set_yticklabels(names)
+    ax.axvline(0.0, color='black', linewidth=0.8)
+    ax.set_xlabel('Change of ' + output_name)
+    ax.set_title(title)
+    ax.legend(loc='lower right')
+    fig.tight_layout()
+    return fig
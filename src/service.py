@@ -0,0 +1,231 @@
+""" Headless HTTP/JSON service for the geometry checks, hoop checks and figures
+
+Runs on the Python standard library only (asyncio for the connections, a process pool for the computations).
+Usage from the repository root:
+
+    python -m src.service --port 8050 --workers 4
+
+Endpoints, all batch endpoints take many structures per request:
+
+    GET  /health      -> {"status": "ok"}
+    POST /evaluate    {"structures": [{"structure_type": "Secant piled shaft", "di": 12.0, ...}, ...]}
+                      -> {"results": [...]}, geometry and hoop check of each structure as in src.batch
+    POST /hoop        {"F_hoop": [...], "d_eff": [...], "gamma_G": 1.35, "f_ck": 10.0, "alpha_cc": 0.7, "gamma_c": 1.5}
+                      -> {"sigma_cd": [...], "f_cd": [...], "passed": [...]}, inputs are numbers or lists which broadcast
+    POST /figures     {"structures": [...], "dpi": 100}
+                      -> {"figures": [[base64 PNG, ...], ...]}, the figures of each structure
+
+Responses are strict JSON, numbers which are not finite (e.g. the stress of a zero thickness) are written as null.
+
+For example:
+
+    curl -X POST localhost:8050/evaluate -d '{"structures": [{"structure_type": "Secant piled wall", "a": 0.8}]}'
+"""
+import os
+import json
+import math
+import base64
+import asyncio
+import argparse
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from src.batch import evaluate_structures, init_worker
+from src.shaft_secant_piles import check_for_hoop_force
+
+MAX_BODY_SIZE = 64*1024**2     # [bytes]
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+    def __reduce__(self):
+        return type(self), (self.status, str(self))  # picklable, e.g. when raised in a worker process
+
+
+def get_hoop_parameters(request):
+    """ Gets arrays of a /hoop request, raises HTTPError for missing or invalid fields"""
+    if not isinstance(request, dict):
+        raise HTTPError(400, 'Request must be an object')
+    try:
+        parameters = {key: np.asarray(request[key], dtype=float) for key in ('F_hoop', 'd_eff')}
+        parameters.update({key: np.asarray(request[key], dtype=float) for key in ('gamma_G', 'f_ck', 'alpha_cc', 'gamma_c') if key in request})
+        np.broadcast_shapes(*[value.shape for value in parameters.values()])
+    except KeyError as e:
+        raise HTTPError(400, 'Missing field {}'.format(e))
+    except (TypeError, ValueError) as e:
+        raise HTTPError(400, 'Invalid field: {}'.format(e))
+    return parameters
+
+
+def check_hoop_forces(parameters):
+    """ Runs check_for_hoop_force for arrays of hoop forces and effective thicknesses, see get_hoop_parameters"""
+    parameters = dict(parameters)
+    F_hoop, d_eff = parameters.pop('F_hoop'), parameters.pop('d_eff')
+    with np.errstate(divide='ignore', invalid='ignore'):    # zero thicknesses give infinite stresses, written as null
+        sigma_cd, f_cd = check_for_hoop_force(F_hoop, d_eff, parameters.pop('gamma_G', 1.35), parameters.pop('f_ck', 10.0), **parameters)
+    sigma_cd, f_cd = np.broadcast_arrays(sigma_cd, f_cd)
+    passed = sigma_cd < f_cd
+    return {'sigma_cd': sigma_cd.ravel().tolist(), 'f_cd': f_cd.ravel().tolist(), 'passed': passed.ravel().tolist()}
+
+
+def get_finite(response):
+    """ Gets response with numbers which are not finite replaced by None, for strict JSON"""
+    if isinstance(response, float):
+        return response if math.isfinite(response) else None
+    if isinstance(response, dict):
+        return {key: get_finite(value) for key, value in response.items()}
+    if isinstance(response, (list, tuple)):
+        return [get_finite(value) for value in response]
+    return response
+
+
+def render_figures_base64(structures, dpi=100):
+    """ Renders the figures of structures to base64 encoded PNG, see src.report.render_structure_figures"""
+    from src.report import render_structure_figures
+
+    return [[base64.b64encode(png).decode('ascii') for png in pngs] for pngs in render_structure_figures(structures, dpi)]
+
+
+class Service:
+    """ HTTP/JSON service, CPU-heavy work of each request is split in chunks and run in a process pool"""
+
+    def __init__(self, workers=None, chunk_size=500, figure_chunk_size=4):
+        """ Initializes service
+        workers: number of worker processes, None for number of CPUs, 0 for threads of the event loop (no process pool)
+        chunk_size: number of structures per task for /evaluate
+        figure_chunk_size: number of structures per task for /figures
+        """
+        self.executor = ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1, initializer=init_worker) if workers != 0 else None
+        self.chunk_size = chunk_size
+        self.figure_chunk_size = figure_chunk_size
+        self.figure_lock = asyncio.Lock()
+        self.routes = {('GET', '/health'): self.health, ('POST', '/evaluate'): self.evaluate,
+                       ('POST', '/hoop'): self.hoop, ('POST', '/figures'): self.figures}
+
+    async def run_in_chunks(self, function, items, chunk_size, *args):
+        """ Runs function on chunks of items concurrently in the executor and joins the results"""
+        loop = asyncio.get_running_loop()
+        chunks = [items[start:start + chunk_size] for start in range(0, len(items), chunk_size)]
+        results = await asyncio.gather(*[loop.run_in_executor(self.executor, function, chunk, *args) for chunk in chunks])
+        return [result for chunk_results in results for result in chunk_results]
+
+    @staticmethod
+    def get_structures(request):
+        structures = request.get('structures') if isinstance(request, dict) else None
+        if not isinstance(structures, list) or not all(isinstance(structure, dict) for structure in structures):
+            raise HTTPError(400, "Field 'structures' must be a list of objects")
+        return structures
+
+    async def health(self, request):
+        return {'status': 'ok'}
+
+    async def evaluate(self, request):
+        return {'results': await self.run_in_chunks(evaluate_structures, self.get_structures(request), self.chunk_size)}
+
+    async def hoop(self, request):
+        parameters = get_hoop_parameters(request)  # validated here, so that only valid requests reach the worker processes
+        return await asyncio.get_running_loop().run_in_executor(self.executor, check_hoop_forces, parameters)
+
+    async def figures(self, request):
+        dpi = request.get('dpi', 100) if isinstance(request, dict) else 100
+        if not isinstance(dpi, int) or not 10 <= dpi <= 600:
+            raise HTTPError(400, "Field 'dpi' must be an integer between 10 and 600")
+        structures = self.get_structures(request)
+        if self.executor is None:   # pyplot is not thread-safe, figures are rendered one request after the other in one thread
+            async with self.figure_lock:
+                figures = await asyncio.get_running_loop().run_in_executor(None, render_figures_base64, structures, dpi)
+        else:
+            figures = await self.run_in_chunks(render_figures_base64, structures, self.figure_chunk_size, dpi)
+        return {'figures': figures}
+
+    async def handle_request(self, method, path, body):
+        """ Routes request to its endpoint, returns status and response object"""
+        path = path.split('?', 1)[0]
+        endpoint = self.routes.get((method, path))
+        if endpoint is None:
+            if any(route_path == path for _, route_path in self.routes):
+                raise HTTPError(405, 'Method {0} not allowed for {1}'.format(method, path))
+            raise HTTPError(404, 'Unknown path {}'.format(path))
+        try:
+            request = json.loads(body) if body else {}
+        except ValueError as e:
+            raise HTTPError(400, 'Invalid JSON: {}'.format(e))
+        return 200, await endpoint(request)
+
+    async def handle_connection(self, reader, writer):
+        """ Serves HTTP/1.1 requests of a connection until the client closes it"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                keep_alive = True
+                try:
+                    method, path, version = request_line.decode('latin-1').split()
+                    headers = {}
+                    while True:
+                        line = await reader.readline()
+                        if line in (b'\r\n', b'\n', b''):
+                            break
+                        name, _, value = line.decode('latin-1').partition(':')
+                        headers[name.strip().lower()] = value.strip()
+                    keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                    n_bytes = int(headers.get('content-length', 0))
+                    if n_bytes > MAX_BODY_SIZE:
+                        keep_alive = False
+                        raise HTTPError(413, 'Request body larger than {} bytes'.format(MAX_BODY_SIZE))
+                    body = await reader.readexactly(n_bytes) if n_bytes else b''
+                    status, response = await self.handle_request(method, path, body)
+                except HTTPError as e:
+                    status, response = e.status, {'error': str(e)}
+                except ValueError:
+                    status, response, keep_alive = 400, {'error': 'Malformed request'}, False
+                except Exception as e:
+                    status, response = 500, {'error': '{0}: {1}'.format(type(e).__name__, e)}
+                payload = json.dumps(get_finite(response), allow_nan=False).encode()
+                writer.write('HTTP/1.1 {0} {1}\r\nContent-Type: application/json\r\nContent-Length: {2}\r\nConnection: {3}\r\n\r\n'.format(
+                    status, REASONS[status], len(payload), 'keep-alive' if keep_alive else 'close').encode('latin-1') + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=8050, ready=None):
+        """ Serves until cancelled
+        ready: optional callback called with the bound (host, port), e.g. for port=0
+        """
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        if ready is not None:
+            ready(server.sockets[0].getsockname()[:2])
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='HTTP/JSON service for secant piled and diaphragm panel shafts and walls')
+    parser.add_argument('--host', default='127.0.0.1', help='host to bind (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8050, help='port (default: 8050)')
+    parser.add_argument('--workers', type=int, default=None, help='number of worker processes (default: number of CPUs, 0 for no process pool)')
+    args = parser.parse_args(argv)
+    service = Service(args.workers)
+    try:
+        asyncio.run(service.serve(args.host, args.port, ready=partial(print, 'Serving on')))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+""" Versioned JSON format for session states and project bundles
+
+A project file holds any number of structures, each with the form it belongs to and the parameters of that form:
+
+    {"format": "piles_and_panels", "version": 1,
+     "structures": [{"form": "Secant piled shaft", "parameters": {"project_name": "Sample project", "di": 10.0, ...}},
+                    {"form": "Diaphragm panel wall", "parameters": {"wall_name_dw": "Wall 1", "D_dw": 1.2, ...}}]}
+
+The parameters are validated against SCHEMA. Missing parameters take the default values of the schema, unknown
+parameters are dropped. Structures are parsed one at a time, so large bundles load in bounded memory.
+Session state files of earlier versions (a Python dict as JSON string) are still read, without eval.
+"""
+import io
+import ast
+import json
+
+FORMAT_NAME = 'piles_and_panels'
+FORMAT_VERSION = 1
+
+# Parameters of the forms as (key, type, default value), keys with the session state key suffix of the form
+SCHEMA = {'Secant piled shaft': [('project_name', str, 'Sample project'), ('project_revision', str, 'First issue, rev0'), ('shaft_name', str, 'Shaft 1'),
+                                 ('di', float, 10.0), ('D', float, 1.2), ('n_pieces', int, 40), ('L', float, 30.5), ('v', float, 0.5),
+                                 ('H_drilling_platform', float, 0.0), ('E', float, 3.0e6), ('F_hoop_at_base', float, 700.0), ('gamma_G', float, 1.35),
+                                 ('f_ck', float, 10.0), ('alpha_cc', float, 0.7), ('gamma_c', float, 1.5), ('check_more', bool, False),
+                                 ('F_hoop', float, 500.0), ('L_hoop', float, 10.0), ('check_profile', bool, False), ('hoop_force_option', str, 'Table'),
+                                 ('hoop_force_table', str, '0.0, 0.0\n15.0, 700.0'), ('soil_layers', str, '15.0, 19.0, 0.5'), ('z_water', float, 3.0),
+                                 ('seed', int, 0)],
+          'Secant piled wall': [('project_name_spw', str, 'Sample project'), ('project_revision_spw', str, 'First issue, rev0'), ('wall_name_spw', str, 'Wall 1'),
+                                ('a_spw', float, 0.75), ('D_spw', float, 1.2), ('n_pieces_spw', int, 10), ('L_spw', float, 25.0), ('v_spw', float, 0.75),
+                                ('H_drilling_platform_spw', float, 0.0), ('plotting_option_spw', str, 'Two piles apart'), ('seed_spw', int, 0)],
+          'Diaphragm panel shaft': [('project_name_dws', str, 'Sample project'), ('project_revision_dws', str, 'First issue, rev0'), ('shaft_name_dws', str, 'Shaft 1'),
+                                    ('di_dws', float, 10.0), ('D_dws', float, 1.2), ('B_dws', float, 2.8), ('L_dws', float, 30.5), ('v_dws', float, 0.5),
+                                    ('H_drilling_platform_dws', float, 0.0), ('F_hoop_at_base_dws', float, 700.0), ('gamma_G_dws', float, 1.35),
+                                    ('f_ck_dws', float, 10.0), ('alpha_cc_dws', float, 0.7), ('gamma_c_dws', float, 1.5), ('check_more_dws', bool, False),
+                                    ('F_hoop_dws', float, 500.0), ('L_hoop_dws', float, 10.0), ('check_profile_dws', bool, False),
+                                    ('hoop_force_option_dws', str, 'Table'), ('hoop_force_table_dws', str, '0.0, 0.0\n30.5, 700.0'),
+                                    ('soil_layers_dws', str, '30.5, 19.0, 0.5'), ('z_water_dws', float, 3.0), ('seed_dws', int, 0)],
+          'Diaphragm panel wall': [('project_name_dw', str, 'Sample project'), ('project_revision_dw', str, 'First issue, rev0'), ('wall_name_dw', str, 'Wall 1'),
+                                   ('D_dw', float, 1.2), ('B_dw', float, 2.8), ('L_dw', float, 35.0), ('v_dw', float, 0.5), ('H_drilling_platform_dw', float, 0.0)]}
+
+# Key suffixes and name keys of the forms in session state
+FORM_KEYS = {'Secant piled shaft': ('', 'shaft_name'), 'Secant piled wall': ('_spw', 'wall_name_spw'),
+             'Diaphragm panel shaft': ('_dws', 'shaft_name_dws'), 'Diaphragm panel wall': ('_dw', 'wall_name_dw')}
+
+
+def validate_value(key, value, value_type):
+    """ Validates a parameter value against its type in the schema
+    Integers are accepted for float parameters and integral floats for integer parameters
+    Returns value converted to value_type
+    """
+    if value_type is bool:
+        if isinstance(value, bool):
+            return value
+    elif value_type is str:
+        if isinstance(value, str):
+            return value
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        if value_type is float:
+            return float(value)
+        if float(value).is_integer():
+            return int(value)
+    raise ValueError('Invalid value {0!r} for parameter {1}, expected {2}'.format(value, key, value_type.__name__))
+
+
+def assign_parameters(form, **kwargs):
+    """ Assigns parameters of a form from the schema, missing parameters take the default values
+    form: one of the forms in SCHEMA
+    kwargs: parameters, e.g. the session state, parameters not in the schema of the form are ignored
+    """
+    if form not in SCHEMA:
+        raise ValueError('Unknown form {}'.format(form))
+    return {key: validate_value(key, kwargs[key], value_type) if key in kwargs else default for key, value_type, default in SCHEMA[form]}
+
+
+def get_project_structure(form, parameters):
+    """ Gets structure entry of a project file"""
+    return {'form': form, 'parameters': assign_parameters(form, **parameters)}
+
+
+def dump_project(structures, fp):
+    """ Writes structures to a project file one at a time
+    structures: iterable of (form, parameters) pairs
+    fp: text file object
+    Returns number of structures
+    """
+    fp.write('{{"format": {0}, "version": {1}, "structures": ['.format(json.dumps(FORMAT_NAME), FORMAT_VERSION))
+    n_structures = 0
+    for form, parameters in structures:
+        fp.write((',\n' if n_structures else '\n') + json.dumps(get_project_structure(form, parameters)))
+        n_structures += 1
+    fp.write('\n]}\n')
+    return n_structures
+
+
+def dumps_project(structures):
+    """ Gets project file contents as string, see dump_project"""
+    fp = io.StringIO()
+    dump_project(structures, fp)
+    return fp.getvalue()
+
+
+class _Reader:
+    """ Reads text from a file object in chunks and decodes JSON values at the current position"""
+
+    def __init__(self, fp, chunk_size):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def read_more(self):
+        if self.eof:
+            return False
+        chunk = self.fp.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        if self.pos > len(self.buffer)//2:     # drop what has been parsed already
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+        self.buffer += chunk
+        return True
+
+    def peek(self):
+        """ Gets next non-whitespace character without consuming it, '' at end of file"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in ' \t\n\r':
+                self.pos += 1
+            if self.pos < len(self.buffer) or not self.read_more():
+                return self.buffer[self.pos:self.pos + 1]
+
+    def expect(self, characters):
+        character = self.peek()
+        if not character or character not in characters:
+            raise ValueError('Invalid project file: expected {0}, got {1!r}'.format(' or '.join(map(repr, characters)), character))
+        self.pos += 1
+        return character
+
+    def decode(self):
+        """ Decodes next JSON value, reading more text until the value is complete"""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.read_more():
+                    continue
+                raise
+            # a number may continue in the next chunk
+            if end == len(self.buffer) and not isinstance(value, (dict, list, str)) and self.read_more():
+                continue
+            self.pos = end
+            return value
+
+
+def _read_legacy(reader):
+    """ Reads session state file of earlier versions, a Python dict as JSON string"""
+    while reader.read_more():
+        pass
+    parameters = ast.literal_eval(reader.decode())
+    if not isinstance(parameters, dict) or 'selected_form' not in parameters:
+        raise ValueError('Invalid session state file')
+    yield parameters['selected_form'], assign_parameters(parameters['selected_form'], **parameters)
+
+
+def iter_project(fp, chunk_size=2**16):
+    """ Reads structures from a project file one at a time
+    fp: text or binary file object, e.g. an uploaded file
+    chunk_size: number of characters read at once
+    Yields (form, parameters) pairs with validated parameters
+    """
+    if isinstance(fp, (io.RawIOBase, io.BufferedIOBase)):
+        fp = io.TextIOWrapper(fp, encoding='utf-8')
+    reader = _Reader(fp, chunk_size)
+    if reader.peek() == '"':
+        yield from _read_legacy(reader)
+        return
+
+    header = {}
+    reader.expect('{')
+    if reader.peek() == '}':
+        raise ValueError('Invalid project file: no structures')
+    while True:
+        key = reader.decode()
+        reader.expect(':')
+        if key == 'structures':
+            if header.get('format') != FORMAT_NAME:
+                raise ValueError('Invalid project file: format must be {0!r} and precede structures'.format(FORMAT_NAME))
+            if not isinstance(header.get('version'), int) or header['version'] > FORMAT_VERSION:
+                raise ValueError('Unsupported project file version {}'.format(header.get('version')))
+            reader.expect('[')
+            if reader.peek() == ']':
+                reader.pos += 1
+            else:
+                while True:
+                    structure = reader.decode()
+                    if not isinstance(structure, dict) or 'form' not in structure:
+                        raise ValueError('Invalid structure in project file')
+                    yield structure['form'], assign_parameters(structure['form'], **structure.get('parameters', {}))
+                    if reader.expect(',]') == ']':
+                        break
+        else:
+            header[key] = reader.decode()
+        if reader.expect(',}') == '}':
+            if reader.peek():
+                raise ValueError('Invalid project file: unexpected data after the end, got {0!r}'.format(reader.peek()))
+            return
+
+
+def load_project(fp):
+    """ Reads all structures from a project file, see iter_project
+    Returns list of (form, parameters) pairs
+    """
+    return list(iter_project(fp))
+
+
+def get_structure_from_parameters(form, parameters):
+    """ Gets structure dict with parameter names without key suffixes (see src.batch)"""
+    suffix, name_key = FORM_KEYS[form]
+    structure = {'structure_type': form, 'name': parameters.get(name_key, '')}
+    for key, value in parameters.items():
+        if key.endswith(suffix) and isinstance(value, (int, float)) and not isinstance(value, bool):
+            structure[key[:len(key) - len(suffix)] if suffix else key] = value
+    return structure
+
+
+def get_parameters_from_structure(structure):
+    """ Gets form and its parameters with key suffixes from a structure dict, inverse of get_structure_from_parameters"""
+    form = structure['structure_type']
+    if form not in FORM_KEYS:
+        raise ValueError('Unknown structure_type {}'.format(form))
+    suffix, name_key = FORM_KEYS[form]
+    parameters = {key + suffix: value for key, value in structure.items() if key not in ('structure_type', 'name')}
+    parameters[name_key] = structure.get('name', '')
+    return form, assign_parameters(form, **parameters)
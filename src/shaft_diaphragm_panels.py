@@ -1,8 +1,35 @@
-import numpy as np
 import math
-import matplotlib.pyplot as plt
-from matplotlib.patches import Rectangle
-from matplotlib.transforms import Affine2D  # for rotation around center of rectangle
+import numpy as np
+from src.results import DiaphragmPanelsResult, DiaphragmPanelShaftResult
+
+# Polygonal ring of diaphragm panels
+# n_pieces straight panels of length B and thickness D form a regular polygon around the shaft, the inner faces of the panels
+# are tangent to the circle of radius ri. n_pieces is the smallest number for which the outer faces close: 2*(ri + D)*tan(pi/n_pieces) <= B.
+# Panel k is at angle theta_k = 2*pi*k/n_pieces and deviates radially (outward > 0) by delta_k(z) = s_k*(H_drilling_platform + z)*v/100, s_k = +-1.
+# Joint k between panels k and k+1 is the radial plane at angle theta_k + pi/n_pieces. Along that plane panel k covers the radii
+# from (ri + delta_k)/c to min((ri + D + delta_k)/c, B/(2*s)), c = cos(pi/n_pieces), s = sin(pi/n_pieces), beyond which its ends do not reach.
+# The overlap of both ranges is the contact width of the joint, i.e. the effective ring thickness d_eff which carries the hoop force.
+# Neighbors deviating in opposite directions govern: d_eff = min((ri + D - x)/c, B/(2*s)) - (ri + x)/c, about D - 2*x for many panels.
+
+
+def get_parameters_shaft_diaphragm_panels_batch(D, L, H_drilling_platform, v=0.5):
+    """ Gets parameters for diaphragm panels, vectorized over many parameter sets
+    All inputs are scalars or numpy arrays which broadcast against each other, see get_parameters_shaft_diaphragm_panels.
+    Returns DiaphragmPanelsResult of arrays (x0, x, d_eff), panels do not touch where d_eff <= 0
+    """
+    D, L, H_drilling_platform, v = np.broadcast_arrays(*[np.asarray(p, dtype=float) for p in (D, L, H_drilling_platform, v)])
+    return DiaphragmPanelsResult(*get_deviations_diaphragm_panels(D, L, H_drilling_platform, v))
+
+
+def get_deviations_diaphragm_panels(D, L, H_drilling_platform, v):
+    """ Gets deviations and effective thickness of two neighboring panels, the formulas shared by the scalar and batch functions
+    All inputs are floats or numpy arrays
+    Returns x0, x, d_eff
+    """
+    x0 = H_drilling_platform*v/100  # deviation at top of pile when drilling platform is above, m
+    x = x0 + L*v/100    # deviation at bottom of wall, m
+    d_eff = D - 2*x
+    return x0, x, d_eff
 
 
 def get_parameters_shaft_diaphragm_panels(D, L, H_drilling_platform, v=0.5):
@@ -13,60 +40,151 @@ def get_parameters_shaft_diaphragm_panels(D, L, H_drilling_platform, v=0.5):
     L: pannel length [m]
     v: percentage of verticality [%]
     H_drilling_platform: height of drilling platform above top of piles [m]
+    Returns DiaphragmPanelsResult (x0, x, d_eff)
     """
-    x0 = H_drilling_platform*v/100  # deviation at top of pile when drilling platform is above, m
+    return DiaphragmPanelsResult(*get_deviations_diaphragm_panels(float(D), float(L), float(H_drilling_platform), float(v)))
 
-    x = x0 + L*v/100    # deviation at bottom of wall, m
-    d_eff = D - 2*x
 
-    return x0, x, d_eff
+def get_number_of_panels(ri, D, B):
+    """ Gets the smallest number of panels which close a polygonal ring, vectorized
+    ri: shaft inner radius [m]
+    D: pannel thickness [m]
+    B: pannel length [m]
+    """
+    ri, D, B = np.broadcast_arrays(*[np.asarray(p, dtype=float) for p in (ri, D, B)])
+    n_pieces = np.ceil(np.pi/np.arctan(B/(2*(ri + D))) - 1.0e-9)
+    return np.maximum(n_pieces, 3).astype(int)
+
+
+def get_contact_widths_ring_diaphragm_panels(ri, D, B, n_pieces, delta):
+    """ Gets contact width (effective ring thickness) of each joint of a polygonal ring of panels
+    ri, D, B: see get_number_of_panels
+    n_pieces: number of panels
+    delta: radial deviations of the panels (outward > 0) of shape (n_pieces, ...), e.g. (n_pieces, n_depths) [m]
+    Returns d_eff of shape of delta, joint k is between panels k and k+1, panels do not touch where d_eff <= 0
+    """
+    delta = np.asarray(delta, dtype=float)
+    c, s = np.cos(np.pi/n_pieces), np.sin(np.pi/n_pieces)
+    inner = (ri + delta)/c
+    outer = np.minimum((ri + D + delta)/c, B/(2*s))
+    return np.minimum(outer, np.roll(outer, -1, axis=0)) - np.maximum(inner, np.roll(inner, -1, axis=0))
+
+
+def get_joint_parameters_shaft_diaphragm_panels(ri, D, B, z, H_drilling_platform, v=0.5, directions=None):
+    """ Gets deviations and contact widths at all joints and depths of diaphragm panel shaft in one vectorized pass
+    ri, D, B: see get_number_of_panels
+    z: depths below top of panels [m]
+    H_drilling_platform: height of drilling platform above top of panels [m]
+    v: percentage of verticality [%]
+    directions: direction of deviation of each panel, +1 outward, -1 inward, defaults to alternating (worst case)
+    Returns n_pieces, deviations delta and d_eff, both of shape (n_pieces, len(z)) [m]
+    """
+    n_pieces = int(get_number_of_panels(ri, D, B))
+    if directions is None:
+        directions = np.where(np.arange(n_pieces) % 2 == 0, 1.0, -1.0)
+    directions = np.asarray(directions, dtype=float)
+    if directions.shape != (n_pieces,):
+        raise ValueError('Expected {0} directions, got {1}'.format(n_pieces, directions.size))
+    z = np.atleast_1d(np.asarray(z, dtype=float))
+    delta = directions[:, np.newaxis]*(H_drilling_platform + z)*v/100
+    d_eff = get_contact_widths_ring_diaphragm_panels(ri, D, B, n_pieces, delta)
+    return n_pieces, delta, d_eff
+
+
+def get_parameters_shaft_diaphragm_panels_ring_batch(ri, D, B, L, H_drilling_platform, v=0.5):
+    """ Gets parameters for diaphragm panel shaft as polygonal ring, worst case of neighbors deviating in opposite directions
+    All inputs are scalars or numpy arrays which broadcast against each other, see get_parameters_shaft_diaphragm_panels_ring.
+    Returns DiaphragmPanelShaftResult of arrays (n_pieces, x0, x, d_eff), panels do not touch where d_eff <= 0
+    """
+    ri, D, B, L, H_drilling_platform, v = np.broadcast_arrays(*[np.asarray(p, dtype=float) for p in (ri, D, B, L, H_drilling_platform, v)])
+    n_pieces = get_number_of_panels(ri, D, B)
+    x0, x = get_deviations_diaphragm_panels(D, L, H_drilling_platform, v)[:2]
+    outer, ends, inner = get_joint_extents_ring_diaphragm_panels(ri, D, B, np.cos(np.pi/n_pieces), np.sin(np.pi/n_pieces), x)
+    return DiaphragmPanelShaftResult(n_pieces, x0, x, np.minimum(outer, ends) - inner)
 
 
-def plot_shaft_diaphragm_panels(di, D, B, dev0, dev, shaft_name='Shaft'):
-    """Plot diaphragm wall shaft in 2D
+def get_joint_extents_ring_diaphragm_panels(ri, D, B, c, s, x):
+    """ Gets the radii along the joint plane of the outer face, the ends and the inner face of the panel deviating inward by x,
+    the formulas shared by the scalar and batch functions, d_eff = min(outer, ends) - inner
+    c, s: cos(pi/n_pieces), sin(pi/n_pieces)
+    """
+    return (ri + D - x)/c, B/(2*s), (ri + x)/c
+
+
+def get_parameters_shaft_diaphragm_panels_ring(ri, D, B, L, H_drilling_platform, v=0.5):
+    """ Gets parameters for diaphragm panel shaft as polygonal ring
+    ri: shaft inner radius [m]
+    D: pannel thickness [m]
+    B: pannel length [m]
+    L: pannel length (depth) [m]
+    H_drilling_platform: height of drilling platform above top of panels [m]
+    v: percentage of verticality [%]
+    Returns DiaphragmPanelShaftResult: number of panels, deviations at top and base, effective ring thickness at base [m]
+    """
+    ri, D, B, L, H_drilling_platform, v = float(ri), float(D), float(B), float(L), float(H_drilling_platform), float(v)
+    n_pieces = max(math.ceil(math.pi/math.atan(B/(2*(ri + D))) - 1.0e-9), 3)   # see get_number_of_panels
+    x0, x = get_deviations_diaphragm_panels(D, L, H_drilling_platform, v)[:2]
+    outer, ends, inner = get_joint_extents_ring_diaphragm_panels(ri, D, B, math.cos(math.pi/n_pieces), math.sin(math.pi/n_pieces), x)
+    return DiaphragmPanelShaftResult(n_pieces, x0, x, min(outer, ends) - inner)
+
+
+def add_panels_to_axis(ax, x, y, B, D, angles_deg, facecolor='pink', edgecolor='black', alpha=0.3):
+    """ Adds panels to axis as a single collection of rectangles
+    x, y: coordinates of the rectangle corners around which the panels are rotated
+    B: pannel length
+    D: pannel thickness
+    angles_deg: rotation angles of panels [deg]
+    """
+    from matplotlib.collections import PolyCollection
+
+    corners = np.array([[0.0, 0.0], [B, 0.0], [B, D], [0.0, D]])
+    angles = np.radians(angles_deg)[:, np.newaxis]
+    cos, sin = np.cos(angles), np.sin(angles)
+    vertices = np.stack((x[:, np.newaxis] + cos*corners[:, 0] - sin*corners[:, 1],
+                         y[:, np.newaxis] + sin*corners[:, 0] + cos*corners[:, 1]), axis=-1)
+    panels = PolyCollection(vertices, facecolors=facecolor, edgecolors=edgecolor, alpha=alpha, zorder=0)
+    ax.add_collection(panels)
+    return panels
+
+
+def plot_shaft_diaphragm_panels(di, D, B, dev0, dev, shaft_name='Shaft', seed=None):
+    """Plot diaphragm wall shaft in 2D as polygonal ring of panels
 
     Args:
         di (float): Inner diameter of shaft [m]
         D (float): Pannel thickness [m]
-        n_piecs (integer): Number of pannels
-        x0 (float): Deviation at top of shaft [m]
-        x (float): Deviation at base of shaft [m]
-        shaftname (str, optional): Shaft name. Defaults to 'Shaft'.
+        B (float): Pannel length [m]
+        dev0 (float): Deviation at top of shaft [m]
+        dev (float): Deviation at base of shaft [m]
+        shaft_name (str, optional): Shaft name. Defaults to 'Shaft'.
+        seed (int, optional): Seed for the random directions of deviation. Defaults to None.
     """
-    n_pieces = int(math.ceil(np.pi*(di + D/2)/B) + 1)     # number of pannels for plotting 
-
-    angles = np.linspace(0, 2*np.pi-2*np.pi/n_pieces, n_pieces)
-
-    r = di/2 + D
-    
-    # top
-    directions = np.random.choice(np.array([-1, 1]), angles.size)
-    r_dev0 = dev0 * directions
-    x0 = (r + r_dev0) * np.cos(angles)
-    y0 = (r + r_dev0) * np.sin(angles)
+    import matplotlib.pyplot as plt
+    from matplotlib.collections import LineCollection
+
+    ri = di/2
+    n_pieces = int(get_number_of_panels(ri, D, B))
+    angles = 2*np.pi*np.arange(n_pieces)/n_pieces
+    directions = np.random.default_rng(seed).choice(np.array([-1, 1]), n_pieces)
+    delta = directions[:, np.newaxis]*np.array([dev0, dev])
+    d_eff = get_contact_widths_ring_diaphragm_panels(ri, D, B, n_pieces, delta)
+
+    cos, sin = np.cos(angles)[:, np.newaxis], np.sin(angles)[:, np.newaxis]
+    r = ri + D + delta     # outer face, the panels are drawn from their outer corner
+    x = r*cos + B/2*sin
+    y = r*sin - B/2*cos
+    angles_deg = np.degrees(angles + np.pi/2)
+    angles_joint = angles + np.pi/n_pieces
+    joints = np.stack((np.column_stack((ri*np.cos(angles_joint), ri*np.sin(angles_joint))),
+                       np.column_stack(((ri + D)*np.cos(angles_joint), (ri + D)*np.sin(angles_joint)))), axis=1)/np.cos(np.pi/n_pieces)
 
-    # bottom
-    r_dev = dev * directions
-    x = (r + r_dev) * np.cos(angles)
-    y = (r + r_dev) * np.sin(angles)
-        
     fig, ax = plt.subplots(1, 2)
-    # top of shaft
-    for i in range(0, len(angles), 1):
-        angle_i = (angles[i] + np.pi/n_pieces + np.pi/2)*180/np.pi
-        transform_i = Affine2D().rotate_deg_around(*(x0[i]+D/2, y0[i]+B/2), angle_i) + ax[0].transData
-        rect_top = Rectangle((x0[i]+D/2, y0[i]+B/2), B, D, transform=transform_i, facecolor='pink', edgecolor='black', zorder=0, alpha=0.3)
-        ax[0].add_patch(rect_top)
-
-    # bottom of shaft
-    for i in range(0, len(angles), 1):
-        angle_i = (angles[i] + np.pi/n_pieces + np.pi/2)*180/np.pi
-        transform_i = Affine2D().rotate_deg_around(*(x[i]+D/2, y[i]+B/2), angle_i) + ax[1].transData
-        rect_bottom = Rectangle((x[i]+D/2, y[i]+B/2), B, D, transform=transform_i, facecolor='pink', edgecolor='black', zorder=0, alpha=0.3)
-        ax[1].add_patch(rect_bottom)
+    for i, axi in enumerate(ax):
+        add_panels_to_axis(axi, x[:, i], y[:, i], B, D, angles_deg)
+        axi.add_collection(LineCollection(joints[d_eff[:, i] <= 0], colors='red', linewidths=2.0))  # joints without contact
 
-    ax[0].set_title(shaft_name + ' at top')
-    ax[1].set_title(shaft_name + ' at base (deviation {0:.1f} cm)'.format(dev*100))
+    ax[0].set_title(shaft_name + ' at top\n({} panels)'.format(n_pieces))
+    ax[1].set_title(shaft_name + ' at base (deviation {0:.1f} cm)\nmin. contact width {1:.1f} cm'.format(dev*100, d_eff[:, 1].min()*100))
     for axi in ax:
         axi.autoscale_view()
         axi.set_aspect('equal')
@@ -84,6 +202,7 @@ def plot_wall_diaphragm_panels(n_pieces, D, B, dev0, dev, shaft_name='Shaft'):
         x (float): Deviation at base of shaft [m]
         shaftname (str, optional): Shaft name. Defaults to 'Shaft'.
     """
+    import matplotlib.pyplot as plt
 
     # top
     x0 = np.array([B/2, B + B/2])
@@ -94,17 +213,8 @@ def plot_wall_diaphragm_panels(n_pieces, D, B, dev0, dev, shaft_name='Shaft'):
     y = np.array([0.0 - dev, 0.0 + dev])
         
     fig, ax = plt.subplots(1, 2)
-    # top of shaft
-    for i in range(0, 2):
-        transform_i = Affine2D().rotate_deg_around(*(x0[i], y0[i]), 0.0) + ax[0].transData
-        rect_top = Rectangle((x0[i], y0[i]-D/2), B, D, transform=transform_i, facecolor='pink', edgecolor='black', zorder=0, alpha=0.3)
-        ax[0].add_patch(rect_top)
-
-    # bottom of shaft
-    for i in range(0, 2):
-        transform_i = Affine2D().rotate_deg_around(*(x[i], y[i]), 0.0) + ax[1].transData
-        rect_bottom = Rectangle((x[i], y[i]-D/2), B, D, transform=transform_i, facecolor='pink', edgecolor='black', zorder=0, alpha=0.3)
-        ax[1].add_patch(rect_bottom)
+    add_panels_to_axis(ax[0], x0, y0 - D/2, B, D, np.zeros(2))  # top of shaft
+    add_panels_to_axis(ax[1], x, y - D/2, B, D, np.zeros(2))    # bottom of shaft
 
     ax[0].set_title(shaft_name + ' at top')
     ax[1].set_title(shaft_name + ' at base (deviation {0:.1f} cm)'.format(dev*100))
@@ -112,4 +222,4 @@ def plot_wall_diaphragm_panels(n_pieces, D, B, dev0, dev, shaft_name='Shaft'):
         axi.autoscale_view()
         axi.set_aspect('equal')
 
-    return fig
\ No newline at end of file
+    return fig
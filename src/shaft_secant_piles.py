@@ -1,10 +1,8 @@
 import os
+import math
 import numpy as np
-from scipy.linalg import norm
 from collections import OrderedDict
-import matplotlib.pyplot as plt
-from mpl_toolkits.mplot3d import Axes3D
-from matplotlib.patches import Circle
+from src.results import SecantPiledShaftResult
 
 # Basic methods
 def get_area_moment_of_inertia_circ(D):
@@ -28,6 +26,35 @@ def get_equivalent_thickness_SPW(D, A):
     return h
 
 # Methods for secant piled shaft
+def get_overcuts_secant_piles(D, a, L, H_drilling_platform, v):
+    """ Gets deviations and overcuts of two neighboring piles, the formulas shared by the scalar and batch functions
+    All inputs are floats or numpy arrays
+    Returns t_top, x0, x, t_eff
+    """
+    x0 = H_drilling_platform*v/100  # deviation at top of pile when drilling platform is above, m
+    t_top = D - a - 2*x0 # overcut/ interlock
+    x = x0 + L*v/100 # deviation at bottom of shaft, m
+    t_eff = t_top - 2*x # effective/overlapped thickness at toe of shaft, m
+    return t_top, x0, x, t_eff
+
+
+def get_parameters_shaft_secant_piles_batch(ri, n_pieces, D, L, H_drilling_platform, v=0.75):
+    """ Gets parameters for secant piles, vectorized over many parameter sets
+    All inputs are scalars or numpy arrays which broadcast against each other, see get_parameters_shaft_secant_piles.
+    Returns SecantPiledShaftResult of arrays (a, t_top, d_top, x0, x, t_eff, d_eff), d_eff is NaN where piles do not touch (t_eff <= 0)
+    """
+    ri, n_pieces, D, L, H_drilling_platform, v = np.broadcast_arrays(*[np.asarray(p, dtype=float) for p in (ri, n_pieces, D, L, H_drilling_platform, v)])
+
+    a = np.pi*(2*ri + D)/n_pieces # c/c spacing between 2 neighboring piles at shaft's center line
+    t_top, x0, x, t_eff = get_overcuts_secant_piles(D, a, L, H_drilling_platform, v)
+
+    with np.errstate(invalid='ignore'):
+        d_top = 2*np.sqrt((D/2)**2 - (a/2)**2) # overlapped thickness
+        d_eff = np.where(t_eff > 0, 2*np.sqrt((D/2)*t_eff - (t_eff/2)**2), np.nan) # overlapped thickness, m
+
+    return SecantPiledShaftResult(a, t_top, d_top, x0, x, t_eff, d_eff)
+
+
 def get_parameters_shaft_secant_piles(ri, n_pieces, D, L, H_drilling_platform, v=0.75, shaft_name='Shaft', print_results=True):
     """ Gets parameters for secant piles
     ri: inner shaft radius
@@ -36,6 +63,7 @@ def get_parameters_shaft_secant_piles(ri, n_pieces, D, L, H_drilling_platform, v
     L: pile length
     v: percentage of verticality
     H_drilling_platform: height of drilling platform above top of piles
+    Returns SecantPiledShaftResult (a, t_top, d_top, x0, x, t_eff, d_eff)
     """
     if print_results:
         print('INPUT GEOMETRY {0}...'.format(shaft_name))
@@ -45,31 +73,26 @@ def get_parameters_shaft_secant_piles(ri, n_pieces, D, L, H_drilling_platform, v
         print('Pile length = {:.2f} m'.format(L))
         print('Drilling verticality = {:.2f}%'.format(v))
 
-    a = np.pi*(2*ri + D)/n_pieces # c/c spacing between 2 neighboring piles at shaft's center line
-    x0 = H_drilling_platform*v/100  # deviation at top of pile when drilling platform is above, m
-    t_top = D - a - 2*x0 # overcut/ interlock
-    d_top = 2*np.sqrt((D/2)**2 - (a/2)**2) # overlapped thickness
-    x = x0 + L*v/100 # deviation at bottom of shaft, m
-    
-    if print_results:   
+    ri, D, L, H_drilling_platform, v = float(ri), float(D), float(L), float(H_drilling_platform), float(v)
+    a = math.pi*(2*ri + D)/float(n_pieces) # c/c spacing between 2 neighboring piles at shaft's center line
+    t_top, x0, x, t_eff = get_overcuts_secant_piles(D, a, L, H_drilling_platform, v)
+    d_top = 2*math.sqrt((D/2)**2 - (a/2)**2) if abs(a) <= D else math.nan # overlapped thickness
+    d_eff = 2*math.sqrt((D/2)*t_eff - (t_eff/2)**2) if t_eff > 0 else math.nan # overlapped thickness, m
+    results = SecantPiledShaftResult(a, t_top, d_top, x0, x, t_eff, d_eff)
+
+    if print_results:
         print('\nOUTPUT GEOMETRY {0}...'.format(shaft_name))
         print('C/c spacing at top of shaft a = {:.2f} m'.format(a))
         print('Overcut at top of shaft t = {:.2f} cm'.format(t_top*100))
         print('Effective thickness at top of shaft d = {:.2f} cm'.format(d_top*100))
         print('Deviation at bottom of shaft dx = {:.2f} cm'.format(x*100))
-    
-    t_eff = t_top - 2*x # effective/overlapped thickness at toe of shaft, m
-    if t_eff > 0:
-        d_eff = 2*np.sqrt((D/2)*t_eff - (t_eff/2)**2) # overlapped thickness, m    
-        if print_results:
+        if t_eff > 0:
             print('Overcut at bottom of shaft t_eff = {:.2f} cm'.format(t_eff*100))
             print('Effective thickness at bottom of shaft d_eff = {:.2f} cm'.format(d_eff*100))
-    else:
-        d_eff = np.nan
-        if print_results:
+        else:
             print('PILES DO NOT TOUCH IN BASE OF SHAFT!!')
 
-    return a, t_top, d_top, x0, x, t_eff, d_eff
+    return results
 
 
 def get_design_hoop_stress_from_effective_thickeness(F_hoop, d_eff, gamma_G):
@@ -105,52 +128,58 @@ def check_for_hoop_force(F_hoop, d_eff, gamma_G, f_ck, alpha_cc=0.7, gamma_c=1.5
     return sigma_cd, f_cd
 
 
-def plot_shaft(ri, n_pieces, D, dev_0=0.0, dev=0.0, shaft_name='Shaft'):
+def add_piles_to_axis(ax, x, y, D, facecolor='white', edgecolor='black', alpha=0.3):
+    """ Adds piles to axis as a single collection of circles
+    Primary piles (even indices) are drawn first, secondary piles (odd indices) on top of them with thicker edges
+    x, y: coordinates of pile centers
+    D: pile diameter
+    """
+    from matplotlib.collections import EllipseCollection
+
+    order = np.concatenate((np.arange(0, len(x), 2), np.arange(1, len(x), 2)))
+    linewidths = np.where(order % 2 == 0, 1.0, 2.0)
+    offsets = np.column_stack((x[order], y[order]))
+    piles = EllipseCollection(D, D, 0.0, units='xy', offsets=offsets, offset_transform=ax.transData, facecolors=facecolor,
+                              edgecolors=edgecolor, linewidths=linewidths, alpha=alpha, zorder=0)
+    ax.add_collection(piles, autolim=False)
+    ax.update_datalim([(np.min(x) - D/2, np.min(y) - D/2), (np.max(x) + D/2, np.max(y) + D/2)])
+    return piles
+
+
+def get_deviated_pile_centers(x, y, dev0=0.0, dev=0.0, seed=None):
+    """ Gets pile centers at top and base with random directions of drilling deviation
+    x, y: coordinates of pile centers without deviation
+    dev0: deviation at top of pile [m]
+    dev: deviation at base of pile [m]
+    seed: seed for the random angles of deviation, None for different angles at each call
+    Returns x0, y0 at top and x, y at base"""
+    angles_deviation = 2*np.pi*np.random.default_rng(seed).uniform(0, 1, x.size) # random angle of deviation for each of the piles
+    return x + dev0*np.cos(angles_deviation), y + dev0*np.sin(angles_deviation), x + dev*np.cos(angles_deviation), y + dev*np.sin(angles_deviation)
+
+
+def plot_shaft(ri, n_pieces, D, dev_0=0.0, dev=0.0, shaft_name='Shaft', seed=None):
+    """ Plots shaft at top and base with random drilling deviation
+    seed: seed for the random angles of deviation, None for different angles at each call"""
+    import matplotlib.pyplot as plt
+
     angles = np.linspace(0, 2*np.pi-2*np.pi/n_pieces, n_pieces)
     r = ri + D/2
     
     x = r * np.cos(angles)
     y = r * np.sin(angles)
         
-    pile_types = ['primary', 'secondary']
-    #pile_colors = ['blue', 'red']
-    pile_colors = ['white', 'white']
     fig, ax = plt.subplots(1, 2)
     
-    # deviations
-    #angles_deviation = 2*np.pi*np.random.rand(angles.size) # random angle of deviation for each of the piles
-    angles_deviation = 2*np.pi*np.random.uniform(0, 1, angles.size) # random angle of deviation for each of the piles
-    x0 = x + dev_0*np.cos(angles_deviation) # x top
-    y0 = y + dev_0*np.sin(angles_deviation) # y top
-    x = x + dev*np.cos(angles_deviation)    # x bottom
-    y = y + dev*np.sin(angles_deviation)    # y bottom
-
-    # top of shaft
-    for i in range(0,len(angles),2):
-        circle_p = plt.Circle((x0[i],y0[i]), D/2, facecolor=pile_colors[0], edgecolor='black', zorder=0, alpha=0.3, label=pile_types[0])
-        ax[0].add_patch(circle_p)       
-    for i in range(1, len(angles), 2):
-        circle_s = plt.Circle((x0[i],y0[i]), D/2, facecolor=pile_colors[1], edgecolor='black', zorder=0, alpha=0.3, linewidth=2.0, label=pile_types[1])
-        ax[0].add_patch(circle_s)
-    
-    # bottom of shaft
-    for i in range(0,len(angles),2):
-        circle_p = plt.Circle((x[i],y[i]), D/2, facecolor=pile_colors[0], edgecolor='black', zorder=0, alpha=0.3, label=pile_types[0])
-        ax[1].add_patch(circle_p)       
-    for i in range(1, len(angles), 2):
-        circle_s = plt.Circle((x[i],y[i]), D/2, facecolor=pile_colors[1], edgecolor='black', zorder=0, alpha=0.3, linewidth=2.0, label=pile_types[1])
-        ax[1].add_patch(circle_s)
+    x0, y0, x, y = get_deviated_pile_centers(x, y, dev_0, dev, seed) # deviations at top and bottom
+
+    add_piles_to_axis(ax[0], x0, y0, D) # top of shaft
+    add_piles_to_axis(ax[1], x, y, D)   # bottom of shaft
 
     ax[0].set_title(shaft_name + ' at top')
     ax[1].set_title(shaft_name + ' at base (deviation {0:.1f} cm)'.format(dev*100))
     for axi in ax:
         axi.autoscale_view()
         axi.set_aspect('equal')
-        #ax.legend()
-        #handles, labels = plt.gca().get_legend_handles_labels()
-        #by_label = OrderedDict(zip(labels, handles))
-        #plt.legend(by_label.values(), by_label.keys())
-    #plt.show()
     return fig
 
 
@@ -159,7 +188,7 @@ def data_for_cylinder_2_points(p0, p1, R):
     """ Gets grid data for cylinder
     """
     v = p1 - p0
-    mag = norm(v)
+    mag = np.linalg.norm(v)
     v = v/mag # unit vector
     
     #make some vector not in the same direction as v
@@ -169,7 +198,7 @@ def data_for_cylinder_2_points(p0, p1, R):
     #make vector perpendicular to v
     n1 = np.cross(v, not_v)
     #normalize n1
-    n1 /= norm(n1)
+    n1 /= np.linalg.norm(n1)
     #make unit vector perpendicular to v and n1
     n2 = np.cross(v, n1)
     #surface ranges over t from 0 to length of axis and 0 to 2*pi
@@ -192,41 +221,119 @@ def plot_cylinder_2points(axis, point0, point1, radius, color='blue'):
     axis.plot(*zip(point0, point1), color = 'red')
  
 
-def plot_shaft_3d(ri, n_pieces, D, L, dev0=0.0, dev=0.0, shaft_name='Shaft'):
+def get_cylinder_level_of_detail(n_pieces, D, view_extent, view_size_px=480):
+    """ Gets number of sides and rings of the cylinder meshes from the pile count and view size
+    n_pieces: number of piles
+    D: pile diameter [m]
+    view_extent: largest extent of the structure in the view [m]
+    view_size_px: size of the view [pixels]
+    """
+    D_px = D/view_extent*view_size_px  # projected pile diameter [pixels]
+    n_sides = int(np.clip(np.pi*D_px/4, 8, 20))   # edges of about 4 pixels
+    n_rings = int(np.clip(200//n_pieces, 2, 10))   # more rings help depth sorting of the faces of few piles
+    return n_sides, n_rings
+
+
+def get_cylinders_mesh(points0, points1, R, n_sides=20, n_rings=10):
+    """ Gets mesh of many cylinders in one vectorized call
+    points0, points1: end points of cylinder axes, arrays of shape (n, 3)
+    R: cylinder radius
+    n_sides: number of sides around the circumference
+    n_rings: number of vertex rings along the axis
+    Returns vertices (n*n_rings*n_sides, 3) and quadrilateral faces as vertex indices (n*(n_rings - 1)*n_sides, 4)
+    """
+    points0 = np.asarray(points0, dtype=float)
+    points1 = np.asarray(points1, dtype=float)
+    v = points1 - points0
+    mag = np.linalg.norm(v, axis=1)
+    v = v/mag[:, np.newaxis] # unit vectors
+
+    #make some vector not in the same direction as v
+    not_v = np.where(np.all(v == [1, 0, 0], axis=1)[:, np.newaxis], [0, 1, 0], [1, 0, 0])
+    #make unit vectors perpendicular to v
+    n1 = np.cross(v, not_v)
+    n1 /= np.linalg.norm(n1, axis=1)[:, np.newaxis]
+    n2 = np.cross(v, n1)
+
+    #vertices on rings along t from 0 to length of axis and around theta from 0 to 2*pi
+    t = np.linspace(0.0, 1.0, n_rings)[np.newaxis, :, np.newaxis, np.newaxis]*mag[:, np.newaxis, np.newaxis, np.newaxis]
+    theta = np.linspace(0, 2*np.pi, n_sides, endpoint=False)[np.newaxis, np.newaxis, :, np.newaxis]
+    vertices = (points0[:, np.newaxis, np.newaxis, :] + v[:, np.newaxis, np.newaxis, :]*t
+                + R*np.sin(theta)*n1[:, np.newaxis, np.newaxis, :] + R*np.cos(theta)*n2[:, np.newaxis, np.newaxis, :])
+
+    #quadrilaterals between neighboring rings and sides
+    i_cylinder, i_ring, i_side = np.meshgrid(np.arange(points0.shape[0]), np.arange(n_rings - 1), np.arange(n_sides), indexing='ij')
+    i_next = (i_side + 1) % n_sides
+    first = (i_cylinder*n_rings + i_ring)*n_sides
+    faces = np.stack((first + i_side, first + n_sides + i_side, first + n_sides + i_next, first + i_next), axis=-1) # outward normals
+
+    return vertices.reshape(-1, 3), faces.reshape(-1, 4)
+
+
+def plot_cylinders_2points(axis, points0, points1, radius, colors, n_sides=20, n_rings=10):
+    """ Plots many cylinders connecting 2 points
+    All faces turned away from the current view direction of axis are collected in one collection and the faces turned
+    towards it in another one, so that the first is drawn behind the second
+    points0, points1: end points of cylinder axes, arrays of shape (n, 3)
+    colors: color for each of the cylinders
+    """
+    from mpl_toolkits.mplot3d.art3d import Poly3DCollection, Line3DCollection
+
+    points0 = np.asarray(points0, dtype=float)
+    points1 = np.asarray(points1, dtype=float)
+    vertices, faces = get_cylinders_mesh(points0, points1, radius, n_sides, n_rings)
+    n_faces_per_cylinder = (n_rings - 1)*n_sides
+    facecolors = np.repeat(colors, n_faces_per_cylinder)
+
+    # outward normals of faces and view direction
+    axis_vectors = points1 - points0
+    axis_vectors = np.repeat(axis_vectors/np.linalg.norm(axis_vectors, axis=1)[:, np.newaxis], n_faces_per_cylinder, axis=0)
+    normals = vertices[faces].mean(axis=1) - np.repeat(points0, n_faces_per_cylinder, axis=0)
+    normals -= np.sum(normals*axis_vectors, axis=1)[:, np.newaxis]*axis_vectors
+    azim, elev = np.radians(axis.azim), np.radians(axis.elev)
+    view = np.array([np.cos(elev)*np.cos(azim), np.cos(elev)*np.sin(azim), np.sin(elev)])
+    front = normals @ view > 0
+
+    for faces_selected in (~front, front):
+        axis.add_collection3d(Poly3DCollection(vertices[faces[faces_selected]], facecolors=facecolors[faces_selected], shade=True))
+    #plot axes
+    axis.add_collection3d(Line3DCollection(np.stack((points0, points1), axis=1), colors='red'))
+    axis.auto_scale_xyz(vertices[:, 0], vertices[:, 1], vertices[:, 2], had_data=False)
+
+
+def plot_piles_3d(axis, x_dev, y_dev, x_dev0, y_dev0, D, L):
+    """ Plots piles in 3D, primary piles (even indices) in blue and secondary piles (odd indices) in orange
+    x_dev, y_dev: coordinates of pile centers at base of piles
+    x_dev0, y_dev0: coordinates of pile centers at top of piles
+    """
+    points0 = np.column_stack((x_dev, y_dev, np.zeros_like(x_dev)))    # bottom
+    points1 = np.column_stack((x_dev0, y_dev0, np.full_like(x_dev, L))) # top
+    colors = np.where(np.arange(len(x_dev)) % 2 == 0, 'blue', 'orange')
+    view_extent = max(np.ptp(x_dev0) + D, np.ptp(y_dev0) + D, L)
+    n_sides, n_rings = get_cylinder_level_of_detail(len(x_dev), D, view_extent)
+    plot_cylinders_2points(axis, points0, points1, D/2, colors, n_sides, n_rings)
+
+
+def plot_shaft_3d(ri, n_pieces, D, L, dev0=0.0, dev=0.0, shaft_name='Shaft', seed=None):
     """ Plots shaft in 3D with random drilling deviation
     dev0: maxinum deviation at top of pile [m]
-    dev: maxinum deviation at base of pile [m]"""
+    dev: maxinum deviation at base of pile [m]
+    seed: seed for the random angles of deviation, the same seed gives the same angles as in plot_shaft"""
+    import matplotlib.pyplot as plt
+
     angles = np.linspace(0, 2*np.pi-2*np.pi/n_pieces, n_pieces)
     r = ri + D/2   
     x = r * np.cos(angles)
     y = r * np.sin(angles)
     
-    # deviations
-    #angles_deviation = 2*np.pi*np.random.rand(angles.size) # random angle of deviation for each of the piles
-    angles_deviation = 2*np.pi*np.random.uniform(0,1,angles.size) # random angle of deviation for each of the piles
-    x_dev0 = x + dev0*np.cos(angles_deviation) # x top
-    y_dev0 = y + dev0*np.sin(angles_deviation) # y top
-    x_dev = x + dev*np.cos(angles_deviation)    # x bottom
-    y_dev = y + dev*np.sin(angles_deviation)    # y bottom
+    x_dev0, y_dev0, x_dev, y_dev = get_deviated_pile_centers(x, y, dev0, dev, seed) # deviations at top and bottom
     
     fig = plt.figure()
-    #ax = fig.gca(projection='3d')
     ax = fig.add_subplot(projection='3d')
-    
-    for i in range(0,len(angles),2):
-        point0 = np.array([x_dev[i], y_dev[i], 0])          # bottom
-        point1 = np.array([x_dev0[i], y_dev0[i], L])        # top
-        plot_cylinder_2points(ax, point0, point1, D/2)
-        
-    for i in range(1, len(angles), 2):
-        point0 = np.array([x_dev[i], y_dev[i], 0])  # bottom
-        point1 = np.array([x_dev0[i], y_dev0[i], L])          # top
-        plot_cylinder_2points(ax, point0, point1, D/2, color='orange')
+    plot_piles_3d(ax, x_dev, y_dev, x_dev0, y_dev0, D, L)
         
     ax.set_title(shaft_name + ' 3D')
-    #ax.set_aspect('equal')
     set_axis_equal_3d(ax)
-    #plt.show()
     return fig
     
     
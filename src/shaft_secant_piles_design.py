@@ -0,0 +1,74 @@
+import numpy as np
+from src.design_limits import get_required_overcut, get_critical_depth_shaft_secant_piles, get_max_verticality_shaft_secant_piles
+
+# Design solvers for secant piled shaft
+# All functions invert the closed-form relations of get_parameters_shaft_secant_piles:
+#   a = pi*(2*ri + D)/n_pieces
+#   t_eff = D - a - 2*x0 - 2*x = D - a - (4*H_drilling_platform + 2*L)*v/100
+#   d_eff = 2*sqrt((D/2)*t_eff - (t_eff/2)**2) = sqrt(t_eff*(2*D - t_eff))
+# Inputs are scalars or numpy arrays which broadcast against each other, so that a whole project table is solved in one call.
+# Results are NaN where the constraints cannot be met. The largest length and verticality are the critical depth and the
+# verticality limit of src.design_limits.
+
+
+def get_min_number_of_piles(ri, D, L, H_drilling_platform, v=0.75, t_min=0.0, F_hoop=None, gamma_G=1.35, f_ck=10.0, alpha_cc=0.7, gamma_c=1.5, even=True):
+    """ Gets the smallest number of piles for which piles interlock at toe of shaft (and hoop stress check passes)
+    ri: inner shaft radius [m]
+    D: pile diameter [m]
+    L: pile length [m]
+    H_drilling_platform: height of drilling platform above top of piles [m]
+    v: percentage of verticality [%]
+    even: round up to an even number of piles (alternating primary and secondary piles)
+    """
+    t_req = get_required_overcut(D, t_min, F_hoop, gamma_G, f_ck, alpha_cc, gamma_c)
+    a_max = D - t_req - (4*np.asarray(H_drilling_platform) + 2*np.asarray(L))*np.asarray(v)/100   # largest admissible c/c spacing, m
+    with np.errstate(divide='ignore', invalid='ignore'):
+        n_pieces = np.floor(np.pi*(2*np.asarray(ri) + D)/a_max) + 1
+    if even:
+        n_pieces = n_pieces + n_pieces % 2
+    return np.where(a_max > 0, n_pieces, np.nan)
+
+
+def get_max_length(ri, n_pieces, D, H_drilling_platform, v=0.75, t_min=0.0, F_hoop=None, gamma_G=1.35, f_ck=10.0, alpha_cc=0.7, gamma_c=1.5):
+    """ Gets the largest pile length L for which piles interlock at toe of shaft (and hoop stress check passes)
+    See get_min_number_of_piles for the parameters
+    """
+    return get_critical_depth_shaft_secant_piles(ri, n_pieces, D, H_drilling_platform, v, t_min=t_min, F_hoop=F_hoop, gamma_G=gamma_G,
+                                                 f_ck=f_ck, alpha_cc=alpha_cc, gamma_c=gamma_c)
+
+
+def get_max_verticality(ri, n_pieces, D, L, H_drilling_platform, t_min=0.0, F_hoop=None, gamma_G=1.35, f_ck=10.0, alpha_cc=0.7, gamma_c=1.5):
+    """ Gets the largest percentage of verticality v [%] for which piles interlock at toe of shaft (and hoop stress check passes)
+    See get_min_number_of_piles for the parameters
+    """
+    return get_max_verticality_shaft_secant_piles(ri, n_pieces, D, L, H_drilling_platform, t_min=t_min, F_hoop=F_hoop, gamma_G=gamma_G,
+                                                  f_ck=f_ck, alpha_cc=alpha_cc, gamma_c=gamma_c)
+
+
+def get_min_pile_diameter(ri, n_pieces, L, H_drilling_platform, v=0.75, t_min=0.0, F_hoop=None, gamma_G=1.35, f_ck=10.0, alpha_cc=0.7, gamma_c=1.5, D_max=5.0, tol=1.0e-6):
+    """ Gets the smallest pile diameter D for which piles interlock at toe of shaft (and hoop stress check passes)
+    The margin t_eff(D) - t_req(D) increases monotonically with D, its root is found by vectorized bisection on (0, D_max]
+    D_max: largest pile diameter considered [m]
+    tol: tolerance on D [m]
+    See get_min_number_of_piles for the other parameters
+    """
+    ri, n_pieces, L, H_drilling_platform, v, t_min = np.broadcast_arrays(*[np.asarray(p, dtype=float) for p in (ri, n_pieces, L, H_drilling_platform, v, t_min)])
+    if F_hoop is not None:
+        F_hoop, gamma_G, f_ck, alpha_cc, gamma_c = np.broadcast_arrays(*[np.asarray(p, dtype=float) for p in (F_hoop, gamma_G, f_ck, alpha_cc, gamma_c)])
+
+    def get_margin(D):
+        t_req = get_required_overcut(D, t_min, F_hoop, gamma_G, f_ck, alpha_cc, gamma_c)
+        t_eff = D - np.pi*(2*ri + D)/n_pieces - (4*H_drilling_platform + 2*L)*v/100
+        return np.where(np.isnan(t_req), -np.inf, t_eff - t_req)
+
+    D_lo = np.zeros(ri.shape)
+    D_hi = np.full(ri.shape, float(D_max))
+    feasible = get_margin(D_hi) > 0
+    n_iterations = int(np.ceil(np.log2(D_max/tol)))
+    for _ in range(n_iterations):
+        D_mid = (D_lo + D_hi)/2
+        passed = get_margin(D_mid) > 0
+        D_hi = np.where(passed, D_mid, D_hi)
+        D_lo = np.where(passed, D_lo, D_mid)
+
+    return np.where(feasible, D_hi, np.nan)
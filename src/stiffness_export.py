@@ -0,0 +1,245 @@
+""" Depth-discretized stiffness tables of shafts and walls for plate definitions in numerical (FE) models
+
+Each structure gets EA(z) [kN/m], EI(z) [kNm^2/m] and the equivalent plate thickness h(z) [m] per meter run on a depth grid
+from top (z = 0) to base (z = L) with spacing dz. The plate thickness is
+    Secant piled shaft:     effective thickness d_eff(z) of the interlock, 0.0 where piles do not touch
+    Secant piled wall:      equivalent thickness of the piles for bending (get_equivalent_thickness_SPW), constant
+    Diaphragm panel shaft:  contact width at the weakest joint normal to the panels, d_eff(z)*cos(pi/n_pieces) <= D with the
+                            effective ring thickness d_eff(z) along the joint plane, 0.0 where panels do not touch
+    Diaphragm panel wall:   panel thickness D, constant
+and EA = E*h, EI = E*h**3/12. Structures are read and computed in chunks and the tables are streamed to the output, so that
+memory does not grow with the size of the portfolio. Usage from the repository root:
+
+    python -m src.stiffness_export structures.csv stiffness.csv --dz 0.5
+    python -m src.stiffness_export structures.jsonl stiffness.npz --chunk-size 1000
+
+Output formats, chosen by file extension:
+    .csv    one row per structure and depth: name, structure_type, structure, z, h, EA, EI
+    .npz    columnar, one array per column (structure, z, h, EA, EI) plus names and structure_types of the structures,
+            read with load_stiffness_table or numpy.load
+Structures take the parameters of src.batch and an optional Young's modulus 'E' [kPa]. Structures with an unknown type or
+invalid parameters are skipped and reported, the structure index counts the structures written.
+"""
+import os
+import sys
+import csv
+import zipfile
+import argparse
+import tempfile
+from io import StringIO
+from itertools import islice
+import numpy as np
+from src.batch import read_structures, get_parameters
+from src.shaft_secant_piles import get_parameters_shaft_secant_piles_batch, get_equivalent_thickness_SPW, get_area_moment_of_inertia_rect
+from src.shaft_diaphragm_panels import get_parameters_shaft_diaphragm_panels_ring_batch
+
+E_DEFAULT = 30.0e6  # [kPa], as in the secant piled shaft form
+COLUMNS = ['structure', 'z', 'h', 'EA', 'EI']
+DTYPES = {'structure': np.int64, 'z': float, 'h': float, 'EA': float, 'EI': float}
+
+
+def get_equivalent_plate_thickness(structure_type, p, z):
+    """ Gets equivalent plate thickness h(z) of one structure type, vectorized over rows of (structure, depth)
+    structure_type: see src.batch.STRUCTURE_TYPES
+    p: parameters of the rows, dict of arrays of the same shape as z, see src.batch.get_parameters
+    z: depths below top [m]
+    """
+    if structure_type == 'Secant piled shaft':
+        d_eff = get_parameters_shaft_secant_piles_batch(p['di']/2, p['n_pieces'], p['D'], z, p['H_drilling_platform'], p['v'])[6]
+        return np.where(np.isnan(d_eff), 0.0, d_eff)
+    if structure_type == 'Secant piled wall':
+        return np.broadcast_to(get_equivalent_thickness_SPW(p['D'], p['a']), z.shape)
+    if structure_type == 'Diaphragm panel shaft':
+        n_pieces, _, _, d_eff = get_parameters_shaft_diaphragm_panels_ring_batch(p['di']/2, p['D'], p['B'], z, p['H_drilling_platform'], p['v'])
+        return np.maximum(d_eff*np.cos(np.pi/n_pieces), 0.0)    # normal to the panels, not along the inclined joint plane
+    return np.broadcast_to(p['D'], z.shape)
+
+
+def get_valid_structures(structures, start_index=0):
+    """ Gets the structures with valid parameters and the errors of the others, see src.batch.evaluate_structures
+    start_index: index of the first structure in the input, e.g. of a chunk
+    Returns list of valid structures, list of errors (input index, name, message)
+    """
+    valid, errors = [], []
+    for i, structure in enumerate(structures, start_index):
+        if not isinstance(structure, dict):
+            errors.append((i, '', 'Structure must be an object'))
+            continue
+        try:
+            get_parameters(structure)
+            float(structure.get('E', E_DEFAULT))
+        except (ValueError, TypeError) as e:
+            errors.append((i, structure.get('name', ''), str(e)))
+        else:
+            valid.append(structure)
+    return valid, errors
+
+
+def get_stiffness_table(structures, dz=1.0, start_index=0):
+    """ Gets stiffness table of structures on depth grids, vectorized for each structure type
+    structures: list of structures with valid parameters, see src.batch and get_valid_structures
+    dz: depth spacing [m], the base z = L is always included
+    start_index: index of the first structure, e.g. of a chunk in a portfolio
+    Returns columns as dict of arrays (see COLUMNS), rows ordered by structure and depth
+    """
+    parameters = [get_parameters(structure) for structure in structures]
+    L = np.array([p['L'] for p in parameters], dtype=float)
+    n_points = np.ceil(L/dz - 1.0e-9).astype(np.int64) + 1
+    rows = np.repeat(np.arange(len(structures)), n_points)
+    k = np.arange(rows.size) - np.repeat(np.cumsum(n_points) - n_points, n_points)
+    z = np.minimum(k*dz, L[rows])
+    E = np.array([float(structure.get('E', E_DEFAULT)) for structure in structures])[rows]
+
+    h = np.empty(rows.size)
+    structure_types = np.array([structure['structure_type'] for structure in structures])
+    for structure_type in set(structure_types.tolist()):
+        indices = np.flatnonzero(structure_types == structure_type)
+        mask = structure_types[rows] == structure_type
+        positions = np.searchsorted(indices, rows[mask])     # rows of this type -> position in indices
+        p = {key: np.array([parameters[i][key] for i in indices], dtype=float)[positions] for key in parameters[indices[0]]}
+        h[mask] = get_equivalent_plate_thickness(structure_type, p, z[mask])
+
+    return {'structure': rows + start_index, 'z': z, 'h': h, 'EA': E*h, 'EI': E*get_area_moment_of_inertia_rect(1.0, h)}
+
+
+def iter_stiffness_tables(structures, dz=1.0, chunk_size=500, errors=None):
+    """ Gets stiffness tables of chunks of structures one after the other, invalid structures are skipped
+    structures: iterable of structures, e.g. src.batch.read_structures
+    errors: optional list, extended with the errors of the skipped structures, see get_valid_structures
+    Yields chunk of valid structures and its table, see get_stiffness_table
+    """
+    structures = iter(structures)
+    start_index = input_index = 0
+    while True:
+        chunk = list(islice(structures, chunk_size))
+        if not chunk:
+            break
+        valid, chunk_errors = get_valid_structures(chunk, input_index)
+        input_index += len(chunk)
+        if errors is not None:
+            errors.extend(chunk_errors)
+        if valid:
+            yield valid, get_stiffness_table(valid, dz, start_index)
+            start_index += len(valid)
+
+
+class StiffnessCSVWriter:
+    """ Writes stiffness tables block by block to a CSV file, file_name can also be an open text file"""
+
+    def __init__(self, file_name):
+        self.owns_file = isinstance(file_name, str)
+        self.file = open(file_name, 'w', newline='') if self.owns_file else file_name
+        csv.writer(self.file, lineterminator='\n').writerow(['name', 'structure_type'] + COLUMNS)
+
+    def write(self, structures, table):
+        buffer = StringIO()     # quoted name and structure type of each structure
+        csv.writer(buffer, lineterminator='\n').writerows([structure.get('name', ''), structure['structure_type'], ''] for structure in structures)
+        prefixes = buffer.getvalue().splitlines()
+        i = table['structure'] - table['structure'][0]
+        rows = zip([prefixes[j] for j in i.tolist()], table['structure'].tolist(), *[table[column].tolist() for column in COLUMNS[1:]])
+        self.file.write(''.join(['%s%d,%.6g,%.6g,%.6g,%.6g\n' % row for row in rows]))
+
+    def close(self):
+        if self.owns_file:
+            self.file.close()
+
+
+class StiffnessNpzWriter:
+    """ Writes stiffness tables block by block to a columnar .npz file
+    Each column is appended to a temporary file and copied into the zip archive with its .npy header on close, so that
+    only one block is held in memory. Names and structure types of the structures are kept until close.
+    """
+
+    def __init__(self, file_name, compress=False):
+        self.file_name = file_name
+        self.compression = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+        self.directory = tempfile.TemporaryDirectory()
+        self.files = {column: open(os.path.join(self.directory.name, column), 'wb') for column in COLUMNS}
+        self.n_rows = 0
+        self.names = []
+        self.structure_types = []
+
+    def write(self, structures, table):
+        self.names.extend(structure.get('name', '') for structure in structures)
+        self.structure_types.extend(structure['structure_type'] for structure in structures)
+        for column in COLUMNS:
+            self.files[column].write(np.ascontiguousarray(table[column], dtype=DTYPES[column]).tobytes())
+        self.n_rows += len(table['z'])
+
+    def close(self):
+        with zipfile.ZipFile(self.file_name, 'w', compression=self.compression, allowZip64=True) as archive:
+            for column in COLUMNS:
+                self.files[column].close()
+                header = {'descr': np.lib.format.dtype_to_descr(np.dtype(DTYPES[column])), 'fortran_order': False, 'shape': (self.n_rows,)}
+                with archive.open(column + '.npy', 'w', force_zip64=True) as member, open(self.files[column].name, 'rb') as f:
+                    np.lib.format.write_array_header_2_0(member, header)
+                    while True:
+                        block = f.read(2**20)
+                        if not block:
+                            break
+                        member.write(block)
+            for key, values in (('names', self.names), ('structure_types', self.structure_types)):
+                with archive.open(key + '.npy', 'w', force_zip64=True) as member:
+                    np.lib.format.write_array(member, np.array(values, dtype=str))
+        self.directory.cleanup()
+
+
+def load_stiffness_table(file_name):
+    """ Loads stiffness table written by export_stiffness_tables
+    Returns columns as dict of arrays (see COLUMNS) and names, structure_types of the structures
+    """
+    if file_name.lower().endswith('.npz'):
+        with np.load(file_name) as data:
+            return {column: data[column] for column in COLUMNS}, data['names'].tolist(), data['structure_types'].tolist()
+    with open(file_name, newline='') as f:
+        rows = list(csv.DictReader(f))
+    table = {column: np.array([row[column] for row in rows], dtype=DTYPES[column]) for column in COLUMNS}
+    names, structure_types = {}, {}
+    for row in rows:
+        names[int(row['structure'])] = row['name']
+        structure_types[int(row['structure'])] = row['structure_type']
+    return table, [names[i] for i in sorted(names)], [structure_types[i] for i in sorted(structure_types)]
+
+
+def get_stiffness_csv(structures, dz=1.0):
+    """ Gets stiffness tables of a few structures as CSV text, e.g. for a download in the app"""
+    buffer = StringIO()
+    writer = StiffnessCSVWriter(buffer)
+    writer.write(structures, get_stiffness_table(structures, dz))
+    return buffer.getvalue()
+
+
+def export_stiffness_tables(input_file, output_file, dz=1.0, chunk_size=500, compress=False):
+    """ Computes stiffness tables of all structures of input_file and streams them to output_file (.csv or .npz)
+    compress: deflate the columns of .npz files
+    Returns number of structures and number of rows written, errors of the skipped structures (see get_valid_structures)
+    """
+    writer = StiffnessNpzWriter(output_file, compress) if output_file.lower().endswith('.npz') else StiffnessCSVWriter(output_file)
+    n_structures = n_rows = 0
+    errors = []
+    try:
+        for chunk, table in iter_stiffness_tables(read_structures(input_file), dz, chunk_size, errors):
+            writer.write(chunk, table)
+            n_structures += len(chunk)
+            n_rows += len(table['z'])
+    finally:
+        writer.close()
+    return n_structures, n_rows, errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Depth-discretized EA, EI and equivalent plate thickness of shafts and walls')
+    parser.add_argument('input_file', help='CSV or JSONL table of structures, or JSON project file')
+    parser.add_argument('output_file', help='.csv or .npz file for the stiffness tables')
+    parser.add_argument('--dz', type=float, default=1.0, help='depth spacing [m] (default: 1.0)')
+    parser.add_argument('--chunk-size', type=int, default=500, help='number of structures per block (default: 500)')
+    parser.add_argument('--compress', action='store_true', help='deflate the columns of .npz files')
+    args = parser.parse_args(argv)
+    n_structures, n_rows, errors = export_stiffness_tables(args.input_file, args.output_file, args.dz, args.chunk_size, args.compress)
+    for index, name, message in errors:
+        print('Skipped structure {0} {1}: {2}'.format(index, name, message), file=sys.stderr)
+    print('{0} structures, {1} rows written to {2}'.format(n_structures, n_rows, args.output_file))
+
+
+if __name__ == '__main__':
+    main()
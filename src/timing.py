@@ -0,0 +1,176 @@
+""" Per-stage timing of the forms
+
+Stages are marked with the stage context manager or the timed decorator:
+
+    with stage('geometry'):
+        a, t_top, d_top, x0, x, t_eff, d_eff = get_parameters_shaft_secant_piles(...)
+
+Timing is off by default, then stage returns a shared no-op context manager and costs a function call and an
+attribute lookup. Records are kept per thread, i.e. per rerun of the app script, and cleared by start_rerun.
+tracemalloc is process-wide: it is started by the first thread tracing allocations and stopped when no thread traces
+allocations any more, a thread stops tracing with enable(..., trace_allocations=False) or when it ends.
+"""
+import os
+import json
+import time
+import weakref
+import threading
+import functools
+import contextlib
+import tracemalloc
+
+_NULL_STAGE = contextlib.nullcontext()
+_state = threading.local()
+_tracing_lock = threading.Lock()
+_tracing = {'n_sessions': 0, 'started': False}
+
+
+def _start_tracing():
+    with _tracing_lock:
+        if _tracing['n_sessions'] == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing['started'] = True
+        _tracing['n_sessions'] += 1
+
+
+def _stop_tracing():
+    with _tracing_lock:
+        _tracing['n_sessions'] -= 1
+        if _tracing['n_sessions'] == 0 and _tracing['started']:
+            tracemalloc.stop()      # only if started here, not if traced already before
+            _tracing['started'] = False
+
+
+class _TracingSession:
+    """ Keeps tracemalloc running until closed or garbage collected with the thread that holds it"""
+    __slots__ = ('close', '__weakref__')
+
+    def __init__(self):
+        _start_tracing()
+        self.close = weakref.finalize(self, _stop_tracing)
+
+
+def enable(enabled=True, trace_allocations=False):
+    """ Enables or disables timing for the current thread
+    trace_allocations: also record allocated and peak memory of the stages with tracemalloc (slows down all allocations)
+    """
+    _state.enabled = enabled
+    _state.trace_allocations = enabled and trace_allocations
+    session = getattr(_state, 'tracing_session', None)
+    if _state.trace_allocations and session is None:
+        _state.tracing_session = _TracingSession()
+    elif not _state.trace_allocations and session is not None:
+        session.close()
+        _state.tracing_session = None
+
+
+def is_enabled():
+    return getattr(_state, 'enabled', False)
+
+
+def start_rerun():
+    """ Clears records of the previous rerun"""
+    _state.records = []
+    _state.stack = []
+
+
+def get_records():
+    """ Gets records of the stages finished since start_rerun, in order of their end
+    Returns list of dicts with name, depth, start [s], duration [s], allocated and peak memory [bytes] (None without tracing)
+    """
+    return list(getattr(_state, 'records', []))
+
+
+class _Stage:
+    """ Context manager recording wall time and allocations of a stage"""
+    __slots__ = ('name', 'start', 'memory_start', 'peak')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        if not hasattr(_state, 'records'):
+            start_rerun()
+        if _state.trace_allocations:
+            current, peak = tracemalloc.get_traced_memory()
+            if _state.stack:
+                parent = _state.stack[-1]
+                parent.peak = max(parent.peak, peak)
+            tracemalloc.reset_peak()
+            self.memory_start = self.peak = current
+        _state.stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        duration = time.perf_counter() - self.start
+        _state.stack.pop()
+        allocated = peak = None
+        if _state.trace_allocations:
+            current, peak = tracemalloc.get_traced_memory()
+            self.peak = max(self.peak, peak)
+            if _state.stack:
+                parent = _state.stack[-1]
+                parent.peak = max(parent.peak, self.peak)
+            allocated = current - self.memory_start
+            peak = self.peak - self.memory_start
+        _state.records.append({'name': self.name, 'depth': len(_state.stack), 'start': self.start, 'duration': duration,
+                               'allocated': allocated, 'peak': peak})
+        return False
+
+
+def stage(name):
+    """ Gets context manager timing the enclosed block as stage name, a no-op if timing is disabled"""
+    if not getattr(_state, 'enabled', False):
+        return _NULL_STAGE
+    return _Stage(name)
+
+
+def timed(name=None):
+    """ Decorator timing each call of a function as a stage, by default named after the function"""
+    def decorator(function):
+        stage_name = name or function.__name__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with stage(stage_name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def get_chrome_trace(records=None):
+    """ Gets records as Chrome trace, to be opened in chrome://tracing or Perfetto"""
+    if records is None:
+        records = get_records()
+    t0 = min((record['start'] for record in records), default=0.0)
+    pid, tid = os.getpid(), threading.get_ident()
+    events = []
+    for record in records:
+        event = {'name': record['name'], 'ph': 'X', 'ts': (record['start'] - t0)*1e6, 'dur': record['duration']*1e6, 'pid': pid, 'tid': tid}
+        if record['allocated'] is not None:
+            event['args'] = {'allocated_bytes': record['allocated'], 'peak_bytes': record['peak']}
+        events.append(event)
+    return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+
+def write_chrome_trace(file_name, records=None):
+    """ Writes records as Chrome trace JSON file"""
+    with open(file_name, 'w') as f:
+        json.dump(get_chrome_trace(records), f)
+
+
+def display_timing_panel(st):
+    """ Displays wall time and allocations of the stages of the last rerun in the sidebar
+    Call at the end of the app script
+    """
+    records = sorted(get_records(), key=lambda record: record['start'])
+    if not records:
+        st.sidebar.write('No stages recorded')
+        return
+    lines = ['| Stage | Time [ms] | Allocated [kB] | Peak [kB] |', '|---|---:|---:|---:|']
+    for record in records:
+        memory = ('{0:.0f} | {1:.0f}'.format(record['allocated']/1024, record['peak']/1024) if record['allocated'] is not None else '- | -')
+        lines.append('| {0}{1} | {2:.1f} | {3} |'.format('&nbsp;'*4*record['depth'], record['name'], record['duration']*1e3, memory))
+    st.sidebar.markdown('\n'.join(lines), unsafe_allow_html=True)
+    st.sidebar.download_button('Download Chrome trace', json.dumps(get_chrome_trace(records)), file_name='piles_and_panels_trace.json', mime='application/json')
@@ -0,0 +1,122 @@
+import numpy as np
+from src.wall_secant_piles import get_parameters_wall_secant_piles_batch
+
+# Secant piled walls along arbitrary alignments
+# Piles are placed by arc length along a polyline or a Catmull-Rom spline through the alignment vertices. Neighbors are
+# found with a k-d tree, so that any two piles which overlap at top form a joint, also where a tight curve makes a pile
+# overlap piles other than i-1 and i+1. The nearest neighbors of each pile form joints as well when they do not overlap,
+# e.g. for spacing a >= D, so that gaps are reported (t_top < 0, d_eff NaN) instead of missing joints. Each joint is
+# checked with the straight wall formulas for its c/c distance a.
+
+
+def get_catmull_rom_spline(vertices, closed=False, n_samples_per_segment=32):
+    """ Gets points on a uniform Catmull-Rom spline through vertices
+    vertices: alignment vertices, array of shape (n, 2) [m]
+    closed: spline returns to the first vertex
+    n_samples_per_segment: number of points between two vertices
+    Returns points of shape (m, 2) [m]
+    """
+    P = np.asarray(vertices, dtype=float)
+    if closed:
+        P = np.concatenate((P[-1:], P, P[:2]))
+    else:
+        P = np.concatenate((2*P[:1] - P[1:2], P, 2*P[-1:] - P[-2:-1]))  # reflected end points
+    P0, P1, P2, P3 = P[:-3], P[1:-2], P[2:-1], P[3:]
+
+    t = np.linspace(0.0, 1.0, n_samples_per_segment, endpoint=False)[:, np.newaxis, np.newaxis]
+    points = 0.5*(2*P1 + (P2 - P0)*t + (2*P0 - 5*P1 + 4*P2 - P3)*t**2 + (3*P1 - P0 - 3*P2 + P3)*t**3)
+    points = points.transpose(1, 0, 2).reshape(-1, 2)
+    return np.concatenate((points, P2[-1:]))
+
+
+def place_piles_along_alignment(vertices, a, closed=False, spline=False, n_samples_per_segment=32):
+    """ Places pile centers at constant spacing measured along an alignment
+    vertices: alignment vertices, array of shape (n, 2) [m]
+    a: C/C pile spacing along alignment [m], adjusted to close the alignment for closed=True
+    closed: alignment returns to the first vertex, e.g. for shafts of any shape
+    spline: Catmull-Rom spline through the vertices instead of a polyline
+    Returns x, y of pile centers [m]
+    """
+    if spline:
+        points = get_catmull_rom_spline(vertices, closed, n_samples_per_segment)
+    else:
+        points = np.asarray(vertices, dtype=float)
+        if closed:
+            points = np.concatenate((points, points[:1]))
+    s_points = np.concatenate(([0.0], np.cumsum(np.hypot(*np.diff(points, axis=0).T))))   # arc length
+    length = s_points[-1]
+
+    if closed:
+        n_pieces = max(int(round(length/a)), 3)
+        s = np.arange(n_pieces)*(length/n_pieces)
+    else:
+        s = np.arange(0.0, length + 1.0e-9*length, a)
+    return np.interp(s, s_points, points[:, 0]), np.interp(s, s_points, points[:, 1])
+
+
+def get_neighbor_pairs(x, y, max_distance, k=2, spacing_factor=1.5):
+    """ Gets all pairs of piles with c/c distance below max_distance and the nearest neighbors of each pile from a k-d tree
+    x, y: coordinates of pile centers [m]
+    max_distance: search radius, pile diameter D for the piles that overlap [m]
+    k: number of nearest neighbors of each pile which are paired also beyond max_distance
+    spacing_factor: nearest neighbors farther than spacing_factor times the distance to the nearest pile are not paired,
+        e.g. the second next pile at the ends of a straight wall
+    Returns pairs of pile indices (i, j) with i < j, array of shape (n_pairs, 2)
+    """
+    from scipy.spatial import cKDTree
+
+    points = np.column_stack((x, y))
+    tree = cKDTree(points)
+    pairs = tree.query_pairs(max_distance*(1.0 - 1.0e-12), output_type='ndarray')
+
+    k = min(k, len(points) - 1)
+    if k > 0:
+        distances, neighbors = tree.query(points, k=k + 1)
+        distances, neighbors = distances[:, 1:], neighbors[:, 1:]   # without the pile itself
+        i = np.repeat(np.arange(len(points)), k).reshape(-1, k)
+        nearest = distances <= spacing_factor*distances[:, :1]
+        nearest_pairs = np.sort(np.column_stack((i[nearest], neighbors[nearest])), axis=1)
+        pairs = np.unique(np.concatenate((pairs.reshape(-1, 2), nearest_pairs)).astype(np.intp), axis=0)
+    return pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+
+
+def get_joint_parameters(x, y, D, L, H_drilling_platform, v=0.75, pairs=None):
+    """ Gets overcut and effective thicknesses at all joints of a secant piled wall along any alignment
+    x, y: coordinates of pile centers at top of piles [m]
+    D: pile diameter [m]
+    L: pile length [m]
+    H_drilling_platform: height of drilling platform above top of piles [m]
+    v: percentage of verticality [%]
+    pairs: joints as pairs of pile indices, defaults to all piles which overlap at top and nearest neighbors (see get_neighbor_pairs)
+    Returns pairs, c/c distances a, t_top, d_top, t_eff, d_eff for each joint, t_top < 0 where piles do not overlap at top and
+        d_eff is NaN where piles do not touch at toe
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if pairs is None:
+        pairs = get_neighbor_pairs(x, y, D)
+    a = np.hypot(x[pairs[:, 1]] - x[pairs[:, 0]], y[pairs[:, 1]] - y[pairs[:, 0]])
+    t_top, d_top, x0, x_toe, t_eff, d_eff = get_parameters_wall_secant_piles_batch(D, a, L, H_drilling_platform, v)
+    return pairs, a, t_top, d_top, t_eff, d_eff
+
+
+def plot_wall_alignment(x, y, D, pairs, d_eff, wall_name='Wall'):
+    """ Plots piles along alignment at top, joints without contact at toe of piles are marked red
+    x, y: coordinates of pile centers [m]
+    pairs, d_eff: joints and their effective thicknesses at toe, see get_joint_parameters
+    """
+    import matplotlib.pyplot as plt
+    from matplotlib.collections import LineCollection
+    from src.shaft_secant_piles import add_piles_to_axis
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    fig, ax = plt.subplots()
+    add_piles_to_axis(ax, x, y, D)
+    window = ~(d_eff > 0)
+    segments = np.stack((np.column_stack((x[pairs[:, 0]], y[pairs[:, 0]])), np.column_stack((x[pairs[:, 1]], y[pairs[:, 1]]))), axis=1)
+    ax.add_collection(LineCollection(segments[window], colors='red', linewidths=2.0, zorder=2))
+    ax.set_title(wall_name + ' ({0} piles, {1} of {2} joints without contact at toe)'.format(x.size, np.count_nonzero(window), len(pairs)))
+    ax.autoscale_view()
+    ax.set_aspect('equal')
+    return fig
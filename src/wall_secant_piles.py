@@ -1,6 +1,23 @@
+import math
 import numpy as np
-import matplotlib.pyplot as plt
-from src.shaft_secant_piles import plot_cylinder_2points, set_axis_equal_3d
+from src.shaft_secant_piles import plot_piles_3d, set_axis_equal_3d, add_piles_to_axis, get_deviated_pile_centers, get_overcuts_secant_piles
+from src.results import SecantPiledWallResult
+
+def get_parameters_wall_secant_piles_batch(D, a, L, H_drilling_platform, v=0.75):
+    """ Gets parameters for secant piled wall, vectorized over many parameter sets
+    All inputs are scalars or numpy arrays which broadcast against each other, see get_parameters_wall_secant_piles.
+    Returns SecantPiledWallResult of arrays (t_top, d_top, x0, x, t_eff, d_eff), d_eff is NaN where piles do not touch (t_eff <= 0)
+    """
+    D, a, L, H_drilling_platform, v = np.broadcast_arrays(*[np.asarray(p, dtype=float) for p in (D, a, L, H_drilling_platform, v)])
+
+    t_top, x0, x, t_eff = get_overcuts_secant_piles(D, a, L, H_drilling_platform, v)
+
+    with np.errstate(invalid='ignore'):
+        d_top = 2*np.sqrt((D/2)**2 - (a/2)**2) # overlapped thickness
+        d_eff = np.where(t_eff > 0, 2*np.sqrt((D/2)*t_eff - (t_eff/2)**2), np.nan) # overlapped thickness, m
+
+    return SecantPiledWallResult(t_top, d_top, x0, x, t_eff, d_eff)
+
 
 def get_parameters_wall_secant_piles(D, a, L, H_drilling_platform, v=0.75):
     """ Gets parameters for secant piled wall
@@ -9,29 +26,21 @@ def get_parameters_wall_secant_piles(D, a, L, H_drilling_platform, v=0.75):
     L: pile length [m]
     v: percentage of verticality [%]
     H_drilling_platform: height of drilling platform above top of piles [m]
+    Returns SecantPiledWallResult (t_top, d_top, x0, x, t_eff, d_eff)
     """
-    x0 = H_drilling_platform*v/100  # deviation at top of pile when drilling platform is above, m
-    t_top = D - a - 2*x0 # overcut/ interlock
-    # t_top = t_top - 2*x0
-    d_top = 2*np.sqrt((D/2)**2 - (a/2)**2) # overlapped thickness
-
-    x = x0 + L*v/100 # deviation at bottom of wall, m
-    t_eff = t_top - 2*x # effective/overlapped thickness at toe of wall, m
-    d_eff = np.nan
-    if t_eff > 0:
-        d_eff = 2*np.sqrt((D/2)*t_eff - (t_eff/2)**2) # overlapped thickness, m    
-    else:
-        d_eff = np.nan
-
-    return t_top, d_top, x0, x, t_eff, d_eff
+    D, a, L, H_drilling_platform, v = float(D), float(a), float(L), float(H_drilling_platform), float(v)
+    t_top, x0, x, t_eff = get_overcuts_secant_piles(D, a, L, H_drilling_platform, v)
+    d_top = 2*math.sqrt((D/2)**2 - (a/2)**2) if abs(a) <= D else math.nan # overlapped thickness
+    d_eff = 2*math.sqrt((D/2)*t_eff - (t_eff/2)**2) if t_eff > 0 else math.nan # overlapped thickness, m
+    return SecantPiledWallResult(t_top, d_top, x0, x, t_eff, d_eff)
 
 
 def plot_wall_secant_piles_2items(a, D, dev_0=0.0, dev=0.0, wall_name='Wall'):
+    import matplotlib.pyplot as plt
+
     x = np.array([D/2, D/2 + a])
     y = np.zeros_like(x)
         
-    pile_types = ['primary', 'secondary']
-    pile_colors = ['white', 'white']
     fig, ax = plt.subplots(2, 1)
     
     # worst-case deviations
@@ -40,116 +49,60 @@ def plot_wall_secant_piles_2items(a, D, dev_0=0.0, dev=0.0, wall_name='Wall'):
     x[0] = x[0] - dev    # x bottom
     x[1] = x[1] + dev    # x bottom
 
-    # top of shaft
-    for i in range(0,len(x),2):
-        circle_p = plt.Circle((x0[i],y0[i]), D/2, facecolor=pile_colors[0], edgecolor='black', zorder=0, alpha=0.3, label=pile_types[0])
-        ax[0].add_patch(circle_p)       
-    for i in range(1, len(x), 2):
-        circle_s = plt.Circle((x0[i],y0[i]), D/2, facecolor=pile_colors[1], edgecolor='black', zorder=0, alpha=0.3, linewidth=2.0, label=pile_types[1])
-        ax[0].add_patch(circle_s)
-
-    # bottom of shaft
-    for i in range(0,len(x),2):
-        circle_p = plt.Circle((x[i],y[i]), D/2, facecolor=pile_colors[0], edgecolor='black', zorder=0, alpha=0.3, label=pile_types[0])
-        ax[1].add_patch(circle_p)       
-    for i in range(1, len(x), 2):
-        circle_s = plt.Circle((x[i],y[i]), D/2, facecolor=pile_colors[1], edgecolor='black', zorder=0, alpha=0.3, linewidth=2.0, label=pile_types[1])
-        ax[1].add_patch(circle_s)
+    add_piles_to_axis(ax[0], x0, y0, D) # top of wall
+    add_piles_to_axis(ax[1], x, y, D)   # bottom of wall
 
     ax[0].set_title(wall_name + ' at top (deviation {0:.1f} cm)'.format(dev_0*100))
     ax[1].set_title(wall_name + ' at base (deviation {0:.1f} cm)'.format(dev*100))
     for axi in ax:
         axi.autoscale_view()
         axi.set_aspect('equal')
-        #ax.legend()
-        #handles, labels = plt.gca().get_legend_handles_labels()
-        #by_label = OrderedDict(zip(labels, handles))
-        #plt.legend(by_label.values(), by_label.keys())
-    #plt.show()
     return fig
 
 
-def plot_wall_secant_piles(n_pieces, a, D, dev_0=0.0, dev=0.0, wall_name='Wall'):
+def plot_wall_secant_piles(n_pieces, a, D, dev_0=0.0, dev=0.0, wall_name='Wall', seed=None):
+    """ Plots wall at top and base with random drilling deviation
+    seed: seed for the random angles of deviation, None for different angles at each call"""
+    import matplotlib.pyplot as plt
+
     x = np.linspace(0.0, (n_pieces-1)*a, n_pieces)
     y = np.zeros_like(x)
         
-    pile_types = ['primary', 'secondary']
-    #pile_colors = ['blue', 'red']
-    pile_colors = ['white', 'white']
     fig, ax = plt.subplots(2, 1)
     
-    # deviations
-    #angles_deviation = 2*np.pi*np.random.rand(angles.size) # random angle of deviation for each of the piles
-    angles_deviation = 2*np.pi*np.random.uniform(0, 1, x.size) # random angle of deviation for each of the piles
-    x0 = x + dev_0*np.cos(angles_deviation) # x top
-    y0 = y + dev_0*np.sin(angles_deviation) # y top
-    x = x + dev*np.cos(angles_deviation)    # x bottom
-    y = y + dev*np.sin(angles_deviation)    # y bottom
-
-    # top of shaft
-    for i in range(0,len(x),2):
-        circle_p = plt.Circle((x0[i],y0[i]), D/2, facecolor=pile_colors[0], edgecolor='black', zorder=0, alpha=0.3, label=pile_types[0])
-        ax[0].add_patch(circle_p)       
-    for i in range(1, len(x), 2):
-        circle_s = plt.Circle((x0[i],y0[i]), D/2, facecolor=pile_colors[1], edgecolor='black', zorder=0, alpha=0.3, linewidth=2.0, label=pile_types[1])
-        ax[0].add_patch(circle_s)
-    
-    # bottom of shaft
-    for i in range(0,len(x),2):
-        circle_p = plt.Circle((x[i],y[i]), D/2, facecolor=pile_colors[0], edgecolor='black', zorder=0, alpha=0.3, label=pile_types[0])
-        ax[1].add_patch(circle_p)       
-    for i in range(1, len(x), 2):
-        circle_s = plt.Circle((x[i],y[i]), D/2, facecolor=pile_colors[1], edgecolor='black', zorder=0, alpha=0.3, linewidth=2.0, label=pile_types[1])
-        ax[1].add_patch(circle_s)
+    x0, y0, x, y = get_deviated_pile_centers(x, y, dev_0, dev, seed) # deviations at top and bottom
+
+    add_piles_to_axis(ax[0], x0, y0, D) # top of wall
+    add_piles_to_axis(ax[1], x, y, D)   # bottom of wall
 
     ax[0].set_title(wall_name + ' at top')
     ax[1].set_title(wall_name + ' at base (deviation {0:.1f} cm)'.format(dev*100))
     for axi in ax:
         axi.autoscale_view()
         axi.set_aspect('equal')
-        #ax.legend()
-        #handles, labels = plt.gca().get_legend_handles_labels()
-        #by_label = OrderedDict(zip(labels, handles))
-        #plt.legend(by_label.values(), by_label.keys())
-    #plt.show()
     return fig
 
 
-def plot_wall_secant_piles_3d(n_pieces, a, D, L, dev0=0.0, dev=0.0, wall_name='Wall'):
+def plot_wall_secant_piles_3d(n_pieces, a, D, L, dev0=0.0, dev=0.0, wall_name='Wall', seed=None):
     """ Plots shaft in 3D with random drilling deviation
     dev0: maxinum deviation at top of pile [m]
-    dev: maxinum deviation at base of pile [m]"""
+    dev: maxinum deviation at base of pile [m]
+    seed: seed for the random angles of deviation, the same seed gives the same angles as in plot_wall_secant_piles"""
+    import matplotlib.pyplot as plt
+
     x = np.linspace(0.0, (n_pieces-1)*a, n_pieces)
     y = np.zeros_like(x)
     
-    # deviations
-    #angles_deviation = 2*np.pi*np.random.rand(angles.size) # random angle of deviation for each of the piles
-    angles_deviation = 2*np.pi*np.random.uniform(0, 1, x.size) # random angle of deviation for each of the piles
-    x_dev0 = x + dev0*np.cos(angles_deviation) # x top
-    y_dev0 = y + dev0*np.sin(angles_deviation) # y top
-    x_dev = x + dev*np.cos(angles_deviation)    # x bottom
-    y_dev = y + dev*np.sin(angles_deviation)    # y bottom
+    x_dev0, y_dev0, x_dev, y_dev = get_deviated_pile_centers(x, y, dev0, dev, seed) # deviations at top and bottom
     
     fig = plt.figure()
-    #ax = fig.gca(projection='3d')
     ax = fig.add_subplot(projection='3d')
     if n_pieces < 3:
         ax.view_init(azim=90.0, elev=0.0)
-    
-    for i in range(0,len(x),2):
-        point0 = np.array([x_dev[i], y_dev[i], 0])          # bottom
-        point1 = np.array([x_dev0[i], y_dev0[i], L])        # top
-        plot_cylinder_2points(ax, point0, point1, D/2)
-        
-    for i in range(1, len(x), 2):
-        point0 = np.array([x_dev[i], y_dev[i], 0])  # bottom
-        point1 = np.array([x_dev0[i], y_dev0[i], L])          # top
-        plot_cylinder_2points(ax, point0, point1, D/2, color='orange')
+    plot_piles_3d(ax, x_dev, y_dev, x_dev0, y_dev0, D, L)
         
     ax.set_title(wall_name + ' 3D')
-    #ax.set_aspect('equal')
     set_axis_equal_3d(ax)
-    #plt.show()
     return fig
 
 
@@ -157,6 +110,8 @@ def plot_wall_secant_piles_3d_2items(n_pieces, a, D, L, dev0=0.0, dev=0.0, wall_
     """ Plots shaft in 3D with random drilling deviation
     dev0: maxinum deviation at top of pile [m]
     dev: maxinum deviation at base of pile [m]"""
+    import matplotlib.pyplot as plt
+
     x = np.array([D/2, D/2 + a])
     y = np.zeros_like(x)
 
@@ -167,23 +122,11 @@ def plot_wall_secant_piles_3d_2items(n_pieces, a, D, L, dev0=0.0, dev=0.0, wall_
     x[1] = x[1] + dev    # x bottom
 
     fig = plt.figure()
-    #ax = fig.gca(projection='3d')
     ax = fig.add_subplot(projection='3d')
     if n_pieces < 3:
         ax.view_init(azim=90.0, elev=0.0)
-    
-    for i in range(0,len(x),2):
-        point0 = np.array([x[i], y[i], 0])          # bottom
-        point1 = np.array([x0[i], y0[i], L])        # top
-        plot_cylinder_2points(ax, point0, point1, D/2)
-        
-    for i in range(1, len(x), 2):
-        point0 = np.array([x[i], y[i], 0])  # bottom
-        point1 = np.array([x0[i], y0[i], L])          # top
-        plot_cylinder_2points(ax, point0, point1, D/2, color='orange')
+    plot_piles_3d(ax, x, y, x0, y0, D, L)
         
     ax.set_title(wall_name + ' 3D')
-    #ax.set_aspect('equal')
     set_axis_equal_3d(ax)
-    #plt.show()
-    return fig
\ No newline at end of file
+    return fig
@@ -1,33 +1,49 @@
 import streamlit as st
 import numpy as np
-from src.main_secant_piled_shaft import main_secant_piled_shaft
-from src.main_secant_piled_wall import main_secant_piled_wall
-from src.main_diaphragm_panel_shaft import main_diaphragm_panel_shaft
-from src.main_diaphragm_panel_wall import main_diaphragm_panel_wall
+from src.main_secant_piled_shaft import main_secant_piled_shaft, build_graph as build_graph_sps
+from src.main_secant_piled_wall import main_secant_piled_wall, build_graph as build_graph_spw
+from src.main_diaphragm_panel_shaft import main_diaphragm_panel_shaft, build_graph as build_graph_dws
+from src.main_diaphragm_panel_wall import main_diaphragm_panel_wall, build_graph as build_graph_dw
+from src.main_project_dashboard import main_project_dashboard, build_graph as build_graph_project
+from src.compute_graph import get_graph, display_graph_panel
 from src.file_utilitites import (st_json_download_button, assign_session_state_parameters_wall_secant_piles,
                                  assign_session_state_parameters_shaft_secant_piles,assign_session_state_parameters_shaft_diaphragm_panels,
                                  assign_session_state_parameters_wall_diaphragm_panels)#, export_as_pdf)
-from src.file_utilitites import load_parameters_from_json_file
+from src.file_utilitites import load_structures_from_json_file, get_structure_from_session_state, get_project_download_link
+from src.session_format import get_structure_from_parameters, get_parameters_from_structure, assign_parameters
+from src.report import write_report
+from io import BytesIO
+from src.figure_cache import figure_cache
+from src import timing
 
 
 st.set_page_config(page_title='Secant piled shaft/ wall', page_icon=":eyeglasses:")
 
 
+form_user = None
 parameters_user = None
+structures_user = None
 
 # Load section state
 st.sidebar.header('Load saved session state (optional)')
 uploaded_file_session_state = st.sidebar.file_uploader('Select session state file to load', type='json')
 if uploaded_file_session_state is not None:
     try:
-        parameters_user = load_parameters_from_json_file(uploaded_file_session_state)
+        structures_user = load_structures_from_json_file(uploaded_file_session_state)
+        if len(structures_user) > 1:
+            structure_labels = ['{0}. {1}: {2}'.format(i + 1, form, get_structure_from_parameters(form, parameters)['name']) for i, (form, parameters) in enumerate(structures_user)]
+            index_user = structure_labels.index(st.sidebar.selectbox('Select structure from project file', structure_labels))
+        else:
+            index_user = 0
+        form_user, parameters_user = structures_user[index_user]
+        parameters_user['selected_form'] = form_user
         st.sidebar.success('File successfully loaded')
     except Exception as e:
         st.sidebar.error(e)
 
 # Sidebar
 st.sidebar.markdown('# Form selection')
-select_options = ['Secant piled shaft', 'Secant piled wall', 'Diaphragm panel shaft', 'Diaphragm panel wall']
+select_options = ['Secant piled shaft', 'Secant piled wall', 'Diaphragm panel shaft', 'Diaphragm panel wall', 'Project dashboard']
 if parameters_user is not None:
     select_event = st.sidebar.selectbox('Select one of the form', select_options, index=select_options.index(parameters_user['selected_form']), key='selected_form')
     if parameters_user['selected_form'] == 'Secant piled shaft':
@@ -47,6 +63,20 @@ if parameters_user is not None:
 else:
     select_event = st.sidebar.selectbox('Select one of the form', select_options, key='selected_form')
 
+build_graphs = {'Secant piled shaft': build_graph_sps, 'Secant piled wall': build_graph_spw,
+                'Diaphragm panel shaft': build_graph_dws, 'Diaphragm panel wall': build_graph_dw, 'Project dashboard': build_graph_project}
+
+# Stage timings of this rerun
+show_timings = st.sidebar.checkbox('Show stage timings', value=False, key='show_timings')
+trace_allocations = st.sidebar.checkbox('Trace allocations (slower)', value=False, key='trace_allocations') if show_timings else False
+timing.enable(show_timings, trace_allocations)
+timing.start_rerun()
+
+# Parameters of the selected form from the loaded file: the selected structure, or the first structure of that type
+if parameters_user is not None and form_user != select_event:
+    structures_of_form = [parameters for form, parameters in (structures_user or []) if form == select_event]
+    parameters_user = assign_parameters(select_event, **structures_of_form[0]) if structures_of_form else None
+
 if select_event == 'Secant piled shaft':
     main_secant_piled_shaft(st, parameters_user)
 
@@ -54,10 +84,13 @@ elif select_event == 'Secant piled wall':
     main_secant_piled_wall(st, parameters_user)
 
 elif select_event == 'Diaphragm panel shaft':
-    main_diaphragm_panel_shaft(st)
+    main_diaphragm_panel_shaft(st, parameters_user)
 
 elif select_event == 'Diaphragm panel wall':
-    main_diaphragm_panel_wall(st)
+    main_diaphragm_panel_wall(st, parameters_user)
+
+elif select_event == 'Project dashboard':
+    main_project_dashboard(st, None if structures_user is None else [get_structure_from_parameters(form, parameters) for form, parameters in structures_user])
 
 else:
     pass
@@ -69,16 +102,37 @@ st.sidebar.header('Report and save session state')
 
 button_print_report = st.sidebar.button('Export PDF', key='export_pdf_sps')
 if button_print_report:
-    st.sidebar.write('Not yet implemented! Please use the browser printing function for now.')
-    #export_as_pdf(fig1)
+    report = BytesIO()
+    if select_event == 'Project dashboard':
+        write_report(st.session_state.get('project_structures', []), report)
+    else:
+        write_report([get_structure_from_session_state(st.session_state)], report)
+    st.sidebar.download_button('Download PDF report', report.getvalue(), file_name='piles_and_panels_report.pdf', mime='application/pdf')
 
 # Download session state JSON file
 session_state = dict(st.session_state)  # LazySessionState to dict
 
 download_filename = 'piles_and_pannels' + '.JSON'
-href = st_json_download_button(session_state, download_filename)
+if select_event == 'Project dashboard':
+    href = get_project_download_link([get_parameters_from_structure(structure) for structure in st.session_state.get('project_structures', [])],
+                                     download_filename, 'Download project JSON file')
+else:
+    href = st_json_download_button(session_state, download_filename)
 st.sidebar.markdown(href, unsafe_allow_html=True)
 
+# Figure cache statistics
+st.sidebar.header('Figure cache')
+cache_info = figure_cache.cache_info()
+st.sidebar.write('{0} hits, {1} misses, {2} evictions, {3}/{4} figures ({5:.1f} MB)'.format(cache_info['hits'], cache_info['misses'], cache_info['evictions'],
+                 cache_info['size'], cache_info['max_size'], cache_info['n_bytes']/1024**2))
+
+# Stage timings
+if show_timings:
+    st.sidebar.header('Stage timings')
+    timing.display_timing_panel(st)
+    st.sidebar.header('Compute graph')
+    display_graph_panel(st, get_graph(st.session_state, select_event, build_graphs[select_event]))
+
 # Notes
 st.sidebar.header('Version')
 st.sidebar.write('nya.2021.10')
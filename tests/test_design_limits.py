@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+from src.design_limits import (get_critical_depth_shaft_secant_piles, get_max_verticality_shaft_secant_piles, get_critical_depth_secant_piles,
+                               get_max_verticality_secant_piles, get_critical_depth_diaphragm_panels, get_max_verticality_diaphragm_panels,
+                               get_critical_depth_shaft_diaphragm_panels, get_max_verticality_shaft_diaphragm_panels)
+from src.shaft_secant_piles import get_parameters_shaft_secant_piles_batch, check_for_hoop_force
+from src.wall_secant_piles import get_parameters_wall_secant_piles_batch
+from src.shaft_diaphragm_panels import get_parameters_shaft_diaphragm_panels_batch, get_parameters_shaft_diaphragm_panels_ring_batch
+
+H = np.array([0.0, 1.0, 2.5])[:, np.newaxis]
+V = np.array([0.25, 0.5, 0.75])
+HOOP = {'gamma_G': 1.35, 'f_ck': 12.0, 'alpha_cc': 0.7, 'gamma_c': 1.5}
+
+
+def check_requirement(thickness, F_hoop, required=0.0):
+    """ Checks that the forward kernels give exactly the required thickness: t_eff (d_eff) = t_min (d_min) without F_hoop,
+    d_eff for which the hoop stress is the design hoop stress with F_hoop
+    """
+    if F_hoop is None:
+        np.testing.assert_allclose(thickness, required, atol=1.0e-12)
+    else:
+        sigma_cd, f_cd = check_for_hoop_force(F_hoop, thickness, **HOOP)
+        np.testing.assert_allclose(sigma_cd, f_cd, rtol=1.0e-9)
+
+
+@pytest.mark.parametrize('F_hoop', [None, 300.0])
+def test_shaft_secant_piles(F_hoop):
+    ri, n_pieces, D = 5.0, 40, 1.2
+    kwargs = dict(HOOP, F_hoop=F_hoop) if F_hoop is not None else {'t_min': 0.05}
+    z = get_critical_depth_shaft_secant_piles(ri, n_pieces, D, H, V, **kwargs)
+    assert np.all(z > 0)
+    result = get_parameters_shaft_secant_piles_batch(ri, n_pieces, D, z, H, V)
+    check_requirement(result.t_eff if F_hoop is None else result.d_eff, F_hoop, 0.05)
+    v = get_max_verticality_shaft_secant_piles(ri, n_pieces, D, 20.0, H, **kwargs)
+    result = get_parameters_shaft_secant_piles_batch(ri, n_pieces, D, 20.0, H, v)
+    check_requirement(result.t_eff if F_hoop is None else result.d_eff, F_hoop, 0.05)
+
+
+@pytest.mark.parametrize('F_hoop', [None, 300.0])
+def test_wall_secant_piles(F_hoop):
+    D, a = 1.2, 0.9
+    kwargs = dict(HOOP, F_hoop=F_hoop) if F_hoop is not None else {}
+    z = get_critical_depth_secant_piles(D, a, H, V, **kwargs)
+    assert np.all(z > 0)
+    result = get_parameters_wall_secant_piles_batch(D, a, z, H, V)
+    check_requirement(result.t_eff if F_hoop is None else result.d_eff, F_hoop)
+    v = get_max_verticality_secant_piles(D, a, 15.0, H, **kwargs)
+    result = get_parameters_wall_secant_piles_batch(D, a, 15.0, H, v)
+    check_requirement(result.t_eff if F_hoop is None else result.d_eff, F_hoop)
+
+
+@pytest.mark.parametrize('F_hoop', [None, 1500.0])
+def test_diaphragm_panels(F_hoop):
+    D = 1.2
+    kwargs = dict(HOOP, F_hoop=F_hoop) if F_hoop is not None else {'d_min': 0.3}
+    z = get_critical_depth_diaphragm_panels(D, H, V, **kwargs)
+    assert np.all(z > 0)
+    check_requirement(get_parameters_shaft_diaphragm_panels_batch(D, z, H, V).d_eff, F_hoop, 0.3)
+    v = get_max_verticality_diaphragm_panels(D, 30.0, H, **kwargs)
+    check_requirement(get_parameters_shaft_diaphragm_panels_batch(D, 30.0, H, v).d_eff, F_hoop, 0.3)
+
+
+@pytest.mark.parametrize('F_hoop', [None, 1500.0])
+@pytest.mark.parametrize('ri, D, B', [(5.0, 1.2, 2.8), (1.5, 1.0, 2.5)])
+def test_shaft_diaphragm_panels(F_hoop, ri, D, B):
+    kwargs = dict(HOOP, F_hoop=F_hoop) if F_hoop is not None else {'d_min': 0.3}
+    z = get_critical_depth_shaft_diaphragm_panels(ri, D, B, H, V, **kwargs)
+    assert np.all(z > 0)
+    check_requirement(get_parameters_shaft_diaphragm_panels_ring_batch(ri, D, B, z, H, V).d_eff, F_hoop, 0.3)
+    v = get_max_verticality_shaft_diaphragm_panels(ri, D, B, 30.0, H, **kwargs)
+    check_requirement(get_parameters_shaft_diaphragm_panels_ring_batch(ri, D, B, 30.0, H, v).d_eff, F_hoop, 0.3)
+
+
+def test_requirement_not_met_at_top():
+    # piles of a shaft of 30 piles do not interlock even when vertical, panels thinner than the thickness needed for F_hoop
+    assert np.isnan(get_critical_depth_shaft_secant_piles(6.0, 30, 1.2, 0.0, 0.5))
+    assert np.isnan(get_max_verticality_shaft_secant_piles(6.0, 30, 1.2, 20.0, 0.0))
+    assert np.isnan(get_critical_depth_diaphragm_panels(0.3, 0.0, 0.5, F_hoop=1500.0, **HOOP))
+    assert np.isnan(get_max_verticality_shaft_diaphragm_panels(5.0, 0.3, 2.8, 30.0, 0.0, F_hoop=1500.0, **HOOP))
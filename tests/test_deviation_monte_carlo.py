@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+from src.deviation_monte_carlo import draw_deviation_rates, simulate_shaft_secant_piles_deviation, simulate_wall_secant_piles_deviation
+
+
+def simulate_reference(ri, n_pieces, D, z, H_drilling_platform, v, n_realizations, seed, chunk_size):
+    """ Gets minimum d_eff of each realization from the pile centers in float64, drawing the same deviation rates in the same chunks"""
+    rng = np.random.default_rng(seed)
+    angles = 2*np.pi*np.arange(n_pieces)/n_pieces
+    xc, yc = (ri + D/2)*np.cos(angles), (ri + D/2)*np.sin(angles)
+    d_eff_min = []
+    for start in range(0, n_realizations, chunk_size):
+        ux, uy = draw_deviation_rates(rng, min(chunk_size, n_realizations - start), n_pieces, v)
+        ux, uy = ux.astype(float), uy.astype(float)
+        d_eff = np.full(ux.shape[0], np.inf)
+        for h in H_drilling_platform + np.asarray(z):
+            x, y = xc + h*ux, yc + h*uy
+            s = np.hypot(np.roll(x, -1, axis=1) - x, np.roll(y, -1, axis=1) - y)
+            d_eff = np.minimum(d_eff, np.sqrt(np.maximum(D**2 - s**2, 0.0)).min(axis=1))
+        d_eff_min.append(d_eff)
+    return np.concatenate(d_eff_min)
+
+
+def test_float32_chunks_match_float64_reference():
+    ri, n_pieces, D, L, H, v, n_realizations = 5.0, 40, 1.2, 25.0, 1.0, 0.75, 500
+    z = np.linspace(0.0, L, 6)
+    p_window, d_eff_min = simulate_shaft_secant_piles_deviation(ri, n_pieces, D, L, H, v, n_realizations, z=z, seed=1, max_chunk_size=40*64)
+    reference = simulate_reference(ri, n_pieces, D, z, H, v, n_realizations, 1, 64)
+    np.testing.assert_allclose(d_eff_min, reference, atol=1.0e-3)     # float32 is accurate to well below a millimeter
+    assert abs(p_window - np.mean(reference == 0.0)) <= 2/n_realizations     # a window may open or not within float32 precision
+    assert 0.0 < p_window < 1.0
+
+
+def test_fixed_seed_is_reproducible():
+    results = [simulate_wall_secant_piles_deviation(10, 0.9, 1.2, 20.0, 0.5, 0.75, 2000, seed=seed, max_chunk_size=10*300)
+               for seed in (7, 7, np.random.default_rng(7), 8)]
+    for p_window, d_eff_min in results[1:3]:
+        assert p_window == results[0][0]
+        np.testing.assert_array_equal(d_eff_min, results[0][1])
+    assert not np.array_equal(results[3][1], results[0][1])
+
+
+def test_vertical_piles():
+    p_window, d_eff_min = simulate_wall_secant_piles_deviation(5, 0.9, 1.2, 20.0, 0.0, 0.0, 100, seed=0)
+    assert p_window == 0.0
+    np.testing.assert_allclose(d_eff_min, np.sqrt(1.2**2 - 0.9**2), rtol=1.0e-6)
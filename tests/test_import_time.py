@@ -0,0 +1,15 @@
+import os
+import pytest
+from benchmarks.check_import_time import MODULES, MODULE_BUDGETS, check_import_time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.parametrize('module', MODULES)
+def test_import_time(module, monkeypatch):
+    monkeypatch.chdir(ROOT)     # modules are imported from the repository root in a fresh interpreter
+    (name, t, loaded, passed), = check_import_time([module], budget=0.1, repeat=3)
+    assert not loaded, '{0} loads {1} at import time'.format(module, ', '.join(loaded))
+    budget = MODULE_BUDGETS.get(module, 0.1)
+    assert t <= budget, '{0} takes {1:.1f} ms to import on top of numpy, budget {2:.0f} ms'.format(module, t*1000, budget*1000)
+    assert passed
@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+from src.inclinometer import interpolate_logs, get_joint_gaps, get_joint_summary, convert_csv_to_npy, load_inclinometer_logs
+
+D = 1.0
+A = 0.8     # c/c spacing of the piles on a straight line [m]
+
+
+def get_survey():
+    """ Gets logs of 4 piles read every meter down to 10 m, pile 2 deviates by 2 cm/m away from pile 1 and pile 3 is read
+    down to 5 m only
+    """
+    pile, z, dx, dy = [], [], [], []
+    for k in range(4):
+        depths = np.arange(0.0, 6.0 if k == 3 else 11.0)
+        pile.append(np.full(depths.size, k))
+        z.append(depths)
+        dx.append(0.02*depths if k == 2 else np.zeros_like(depths))
+        dy.append(0.01*depths if k == 0 else np.zeros_like(depths))
+    return [np.concatenate(values).astype(float) for values in (pile, z, dx, dy)]
+
+
+def test_interpolate_logs():
+    pile, z, dx, dy = get_survey()
+    z_grid = np.arange(0.0, 10.01, 0.5)
+    dx_grid, dy_grid = interpolate_logs(pile, z, dx, dy, z_grid)
+    assert dx_grid.shape == (4, z_grid.size)
+    assert np.allclose(dx_grid[2], 0.02*z_grid)
+    assert np.allclose(dy_grid[0], 0.01*z_grid)
+    assert np.allclose(dx_grid[3, z_grid <= 5.0], 0.0)
+    assert np.all(np.isnan(dx_grid[3, z_grid > 5.0]))     # below the surveyed depth
+
+
+def test_interpolate_logs_in_blocks():
+    pile, z, dx, dy = get_survey()
+    z_grid = np.linspace(0.0, 10.0, 41)
+    expected = interpolate_logs(pile, z, dx, dy, z_grid, block_size=None)
+    rng = np.random.default_rng(0)
+    order = np.concatenate([rng.permutation(np.flatnonzero(pile == k)) for k in range(4)])  # any order of depth within piles
+    for block_size in (1, 3, 7, 100):
+        result = interpolate_logs(pile[order], z[order], dx[order], dy[order], z_grid, block_size=block_size)
+        assert np.array_equal(result[0], expected[0], equal_nan=True)
+        assert np.array_equal(result[1], expected[1], equal_nan=True)
+
+    order = np.argsort(z, kind='stable')    # readings of the piles interleaved
+    with pytest.raises(ValueError):
+        interpolate_logs(pile[order], z[order], dx[order], dy[order], z_grid, block_size=5)
+    result = interpolate_logs(pile[order], z[order], dx[order], dy[order], z_grid, block_size=None)
+    assert np.array_equal(result[0], expected[0], equal_nan=True)
+
+
+def test_memory_mapped_logs(tmp_path):
+    pile, z, dx, dy = get_survey()
+    csv_file = tmp_path / 'logs.csv'
+    np.savetxt(csv_file, np.column_stack((pile, z, dx, dy)), delimiter=',', header='pile,z,dx,dy', comments='')
+    assert convert_csv_to_npy(str(csv_file), str(tmp_path / 'logs.npy'), chunk_rows=7) == pile.size
+    logs = load_inclinometer_logs(str(tmp_path / 'logs.npy'))
+    z_grid = np.arange(0.0, 10.01, 1.0)
+    result = interpolate_logs(*logs, z_grid, block_size=4)
+    expected = interpolate_logs(pile, z, dx, dy, z_grid)
+    assert np.array_equal(result[0], expected[0], equal_nan=True)
+
+
+def test_effective_thickness_and_windows():
+    pile, z, dx, dy = get_survey()
+    z_grid = np.arange(0.0, 10.01, 0.5)
+    dx_grid, dy_grid = interpolate_logs(pile, z, dx, dy, z_grid)
+    xc, yc = A*np.arange(4), np.zeros(4)
+    s, d_eff, window = get_joint_gaps(xc, yc, dx_grid, dy_grid, D)
+    assert s.shape == d_eff.shape == window.shape == (3, z_grid.size)
+
+    assert np.allclose(s[0], np.hypot(A, 0.01*z_grid))                              # pile 0 deviates sideways
+    assert np.allclose(s[1], A + 0.02*z_grid)                                       # pile 2 moves away from pile 1
+    assert np.allclose(d_eff[1], np.sqrt(np.maximum(D**2 - (A + 0.02*z_grid)**2, 0.0)))
+    assert np.array_equal(window[1], A + 0.02*z_grid >= D - 1.0e-12)                # window from 10 m
+    assert not window[0].any()
+    assert np.all(np.isnan(d_eff[2, z_grid > 5.0]))                                 # no survey data of pile 3
+
+    d_eff_min, z_min, z_window = get_joint_summary(z_grid, d_eff, window)
+    assert d_eff_min[1] == pytest.approx(0.0, abs=1.0e-6)
+    assert z_min[1] == pytest.approx(10.0)
+    assert z_window[1] == pytest.approx(10.0)
+    assert np.isnan(z_window[0]) and np.isnan(z_window[2])
+    assert d_eff_min[0] == pytest.approx(np.sqrt(D**2 - A**2 - 0.1**2))
+
+
+def test_closed_ring_of_piles():
+    pile, z, dx, dy = get_survey()
+    dx_grid, dy_grid = interpolate_logs(pile, z, dx, dy, [0.0])
+    angles = 2*np.pi*np.arange(4)/4
+    s = get_joint_gaps(np.cos(angles), np.sin(angles), dx_grid, dy_grid, D, closed=True)[0]
+    assert s.shape == (4, 1)
+    assert np.allclose(s, np.sqrt(2.0))
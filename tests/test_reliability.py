@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+from src.reliability import (DEFAULT_RANDOM_VARIABLES, transform_to_physical, get_reliability_shaft_secant_piles, get_reliability_shaft_diaphragm_panels,
+                             get_interlock_limit_state_secant_piles, get_hoop_limit_state_secant_piles, get_contact_limit_state_shaft_diaphragm_panels,
+                             get_hoop_limit_state_shaft_diaphragm_panels)
+
+
+def get_monte_carlo_probability_of_failure(limit_state, parameters, names, n_samples=400000, seed=0):
+    """ Gets probability of failure P(g < 0) by Monte Carlo simulation of the random variables names"""
+    random_variables = {name: DEFAULT_RANDOM_VARIABLES[name] for name in names}
+    u = np.random.default_rng(seed).standard_normal((len(names), n_samples))
+    x = transform_to_physical(dict(zip(names, u)), parameters, random_variables)[0]
+    g = limit_state(**dict(parameters, **x))[0]
+    return np.count_nonzero(g < 0)/n_samples
+
+
+def test_secant_piles_against_monte_carlo():
+    ri, n_pieces, D, L, H, v, F_hoop, f_ck = 5.0, 40, 1.2, 22.3, 1.0, 0.5, 700.0, 18.0
+    interlock, hoop = get_reliability_shaft_secant_piles(ri, n_pieces, D, L, H, v, F_hoop, f_ck)
+    assert interlock['converged'] and hoop['converged']
+    parameters = {'D': D, 'a': np.pi*(2*ri + D)/n_pieces, 'L': L, 'H_drilling_platform': H, 'v': v, 'F_hoop': F_hoop, 'f_ck': f_ck}
+    p_f = get_monte_carlo_probability_of_failure(get_interlock_limit_state_secant_piles, parameters, ['v', 'H_drilling_platform'])
+    assert interlock['p_f'] == pytest.approx(p_f, abs=0.003)
+    p_f = get_monte_carlo_probability_of_failure(get_hoop_limit_state_secant_piles, parameters, ['v', 'H_drilling_platform', 'F_hoop', 'f_ck'])
+    assert hoop['p_f'] == pytest.approx(p_f, abs=0.003)
+    assert 0.1 < interlock['p_f'] < hoop['p_f'] < 0.2
+
+
+def test_shaft_diaphragm_panels_against_monte_carlo():
+    ri, D, B, L, H, v, F_hoop, f_ck = 5.0, 0.8, 2.8, 40.0, 1.0, 0.5, 1500.0, 18.0
+    contact, hoop = get_reliability_shaft_diaphragm_panels(ri, D, B, L, H, v, F_hoop, f_ck)
+    assert contact['converged'] and hoop['converged']
+    parameters = {'ri': ri, 'D': D, 'B': B, 'L': L, 'H_drilling_platform': H, 'v': v, 'F_hoop': F_hoop, 'f_ck': f_ck}
+    p_f = get_monte_carlo_probability_of_failure(get_contact_limit_state_shaft_diaphragm_panels, parameters, ['v', 'H_drilling_platform'])
+    assert contact['p_f'] == pytest.approx(p_f, rel=0.05)
+    p_f = get_monte_carlo_probability_of_failure(get_hoop_limit_state_shaft_diaphragm_panels, parameters, ['v', 'H_drilling_platform', 'F_hoop', 'f_ck'])
+    assert hoop['p_f'] == pytest.approx(p_f, rel=0.1)     # FORM linearizes g = R*d_eff - S, which is curved in u of lognormal f_ck and F_hoop
+    assert 0.001 < contact['p_f'] < hoop['p_f'] < 0.1
+
+
+def test_piles_without_interlock_at_any_verticality():
+    # a = pi*(2*ri + D)/n_pieces > D: the piles do not touch even when drilled vertically
+    interlock, hoop = get_reliability_shaft_secant_piles(6.0, 30, 1.2, 30.5, 0.0, 0.5, 700.0, 18.0)
+    for result in (interlock, hoop):
+        assert result['beta'] == -np.inf
+        assert result['p_f'] == 1.0
+        assert not result['converged']
+
+
+def test_vectorized_over_structures():
+    L = np.array([10.0, 22.3, 30.0])
+    interlock, hoop = get_reliability_shaft_secant_piles(5.0, np.array([40, 40, 30])[:, np.newaxis], 1.2, L, 1.0, 0.5, 700.0, 18.0)
+    assert interlock['beta'].shape == (3, 3)
+    for i, n_pieces in enumerate([40, 40, 30]):
+        for j in range(3):
+            single = get_reliability_shaft_secant_piles(5.0, n_pieces, 1.2, L[j], 1.0, 0.5, 700.0, 18.0)[1]
+            assert hoop['beta'][i, j] == pytest.approx(float(single['beta']), rel=1.0e-6)
@@ -0,0 +1,64 @@
+import json
+import asyncio
+import threading
+import http.client
+import pytest
+from src.service import Service
+
+
+def start_service(service):
+    """ Serves service on a free localhost port in a background thread, returns the port"""
+    bound = []
+    event = threading.Event()
+    loop = asyncio.new_event_loop()
+
+    def ready(address):
+        bound.append(address)
+        event.set()
+
+    thread = threading.Thread(target=loop.run_until_complete, args=(service.serve('127.0.0.1', 0, ready=ready),), daemon=True)
+    thread.start()
+    assert event.wait(10)
+    return bound[0][1]
+
+
+def post(port, path, request):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    connection.request('POST', path, json.dumps(request), {'Content-Type': 'application/json'})
+    response = connection.getresponse()
+    result = response.status, json.loads(response.read())
+    connection.close()
+    return result
+
+
+def test_invalid_hoop_request_does_not_break_the_service():
+    service = Service(workers=1)
+    try:
+        port = start_service(service)
+        status, response = post(port, '/hoop', {'d_eff': [0.5]})
+        assert status == 400
+        assert 'F_hoop' in response['error']
+
+        status, response = post(port, '/hoop', {'F_hoop': [1000.0, 5000.0], 'd_eff': [0.5, 0.5]})
+        assert status == 200
+        assert len(response['sigma_cd']) == 2
+    finally:
+        service.close()
+
+
+def test_non_finite_results_are_written_as_null():
+    service = Service(workers=0)
+    try:
+        port = start_service(service)
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        connection.request('POST', '/hoop', json.dumps({'F_hoop': [1000.0, 1000.0, 1000.0], 'd_eff': [0.5, 0.0, -0.1]}))
+        response = connection.getresponse()
+        text = response.read().decode()
+        connection.close()
+        assert response.status == 200
+        assert 'Infinity' not in text and 'NaN' not in text
+        result = json.loads(text, parse_constant=lambda constant: pytest.fail('{} in response'.format(constant)))
+        assert result['sigma_cd'][0] > 0.0
+        assert result['sigma_cd'][1] is None
+    finally:
+        service.close()
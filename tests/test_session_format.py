@@ -0,0 +1,35 @@
+import io
+import pytest
+from src.session_format import SCHEMA, assign_parameters, dumps_project, load_project, iter_project
+
+STRUCTURES = [('Secant piled shaft', assign_parameters('Secant piled shaft', shaft_name='Shaft 1', di=12.0)),
+              ('Diaphragm panel wall', assign_parameters('Diaphragm panel wall', wall_name_dw='Wall 1', D_dw=1.5))]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 2**16])
+def test_round_trip(chunk_size):
+    text = dumps_project(STRUCTURES)
+    assert list(iter_project(io.StringIO(text), chunk_size=chunk_size)) == STRUCTURES
+
+
+def test_trailing_whitespace():
+    text = dumps_project(STRUCTURES) + ' \n\t\r\n'
+    assert load_project(io.StringIO(text)) == STRUCTURES
+
+
+@pytest.mark.parametrize('trailing', ['x', '{}', ',', ' ]', '\n{"format": "piles_and_panels"}'])
+def test_trailing_data(trailing):
+    text = dumps_project(STRUCTURES) + trailing
+    with pytest.raises(ValueError, match='after the end'):
+        load_project(io.StringIO(text))
+
+
+def test_binary_file():
+    fp = io.BytesIO(dumps_project(STRUCTURES).encode('utf-8'))
+    assert load_project(fp) == STRUCTURES
+
+
+def test_defaults_and_unknown_parameters():
+    (form, parameters), = load_project(io.StringIO('{"format": "piles_and_panels", "version": 1, "structures": '
+                                                   '[{"form": "Diaphragm panel wall", "parameters": {"D_dw": 2, "unknown": 1}}]}'))
+    assert parameters == {key: 2.0 if key == 'D_dw' else default for key, value_type, default in SCHEMA[form]}
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+from src.shaft_diaphragm_panels import (get_number_of_panels, get_contact_widths_ring_diaphragm_panels, get_joint_parameters_shaft_diaphragm_panels,
+                                        get_parameters_shaft_diaphragm_panels_ring_batch, get_parameters_shaft_diaphragm_panels_ring)
+
+rng = np.random.default_rng(0)
+RI = rng.uniform(1.0, 30.0, 200)
+D = rng.uniform(0.6, 1.5, 200)
+B = rng.uniform(2.0, 7.0, 200)
+
+
+def test_number_of_panels_closes_ring():
+    n_pieces = get_number_of_panels(RI, D, B)
+    assert np.all(2*(RI + D)*np.tan(np.pi/n_pieces) <= B*(1 + 1.0e-9))
+    fewer = n_pieces - 1
+    assert np.all((fewer < 3) | (2*(RI + D)*np.tan(np.pi/np.maximum(fewer, 1)) > B))
+
+
+def test_number_of_panels_of_exact_fit():
+    n_pieces = 24
+    B_exact = 2*(5.0 + 1.2)*np.tan(np.pi/n_pieces)
+    assert get_number_of_panels(5.0, 1.2, B_exact) == n_pieces
+    assert get_number_of_panels(5.0, 1.2, 0.999*B_exact) == n_pieces + 1
+
+
+@pytest.mark.parametrize('ri, D, B', [(5.0, 1.2, 2.8), (6.0, 0.8, 3.4), (1.5, 1.0, 2.5), (12.0, 1.5, 6.0)])
+def test_closed_form_matches_joints_with_alternating_directions(ri, D, B):
+    L, H, v = 30.0, 1.0, 0.5
+    z = np.linspace(0.0, L, 31)
+    n_pieces, delta, d_eff_joints = get_joint_parameters_shaft_diaphragm_panels(ri, D, B, z, H, v)
+    result = get_parameters_shaft_diaphragm_panels_ring_batch(ri, D, B, z, H, v)
+    assert np.all(result.n_pieces == n_pieces)
+    np.testing.assert_allclose(d_eff_joints.min(axis=0), result.d_eff, rtol=1.0e-12, atol=1.0e-12)
+    # joints between panels deviating in opposite directions govern, for an odd number of panels the last joint does not
+    opposite = np.arange(n_pieces) < (n_pieces if n_pieces % 2 == 0 else n_pieces - 1)
+    np.testing.assert_allclose(d_eff_joints[opposite], np.broadcast_to(result.d_eff, d_eff_joints[opposite].shape), rtol=1.0e-12, atol=1.0e-12)
+    assert get_parameters_shaft_diaphragm_panels_ring(ri, D, B, L, H, v).d_eff == pytest.approx(float(result.d_eff[-1]), rel=1.0e-12)
+
+
+def test_contact_widths_without_deviation():
+    n_pieces = int(get_number_of_panels(5.0, 1.2, 2.8))
+    d_eff = get_contact_widths_ring_diaphragm_panels(5.0, 1.2, 2.8, n_pieces, np.zeros(n_pieces))
+    np.testing.assert_allclose(d_eff, 1.2/np.cos(np.pi/n_pieces))
+
+
+def test_many_panels_tend_to_two_panels():
+    D, B, L, H, v = 1.2, 2.8, 30.0, 0.0, 0.5
+    x = L*v/100
+    ri = np.array([10.0, 100.0, 1000.0, 10000.0])
+    result = get_parameters_shaft_diaphragm_panels_ring_batch(ri, D, B, L, H, v)
+    np.testing.assert_allclose(result.d_eff, (D - 2*x)/np.cos(np.pi/result.n_pieces), rtol=1.0e-12)
+    error = np.abs(result.d_eff - (D - 2*x))
+    assert np.all(np.diff(error) < 0)
+    assert error[-1] < 1.0e-6
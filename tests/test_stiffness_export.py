@@ -0,0 +1,36 @@
+import pytest
+import numpy as np
+from src.stiffness_export import export_stiffness_tables, load_stiffness_table, get_stiffness_table
+
+STRUCTURES = """name,structure_type,di,D,n_pieces,L,v,E
+S1,Secant piled shaft,12.0,1.2,44,10.0,0.75,
+S2,Retaining tower,12.0,1.2,44,10.0,0.75,
+S3,Secant piled shaft,12.0,1.2,abc,10.0,0.75,
+S4,Diaphragm panel shaft,12.0,0.8,,5.0,0.4,
+S5,Diaphragm panel wall,,1.0,,5.0,0.5,soft
+"""
+
+
+def test_invalid_structures_are_skipped_and_reported(tmp_path):
+    input_file = tmp_path / 'structures.csv'
+    input_file.write_text(STRUCTURES)
+    for output_file in (tmp_path / 'stiffness.csv', tmp_path / 'stiffness.npz'):
+        n_structures, n_rows, errors = export_stiffness_tables(str(input_file), str(output_file), dz=1.0, chunk_size=2)
+        assert n_structures == 2
+        assert n_rows == 11 + 6
+        assert [(index, name) for index, name, _ in errors] == [(1, 'S2'), (2, 'S3'), (4, 'S5')]
+        assert 'Retaining tower' in errors[0][2]
+
+        table, names, structure_types = load_stiffness_table(str(output_file))
+        assert names == ['S1', 'S4']
+        assert structure_types == ['Secant piled shaft', 'Diaphragm panel shaft']
+        assert np.array_equal(np.unique(table['structure']), [0, 1])
+        assert np.all(np.isfinite(table['EA']))
+
+
+def test_panel_shaft_plate_thickness_does_not_exceed_panel_thickness():
+    structures = [{'structure_type': 'Diaphragm panel shaft', 'di': 12.0, 'D': 0.8, 'B': 2.8, 'L': 20.0, 'v': 0.4, 'H_drilling_platform': 0.0}]
+    table = get_stiffness_table(structures, dz=1.0)
+    assert table['h'][0] == pytest.approx(0.8)
+    assert np.all(table['h'] <= 0.8)
+    assert table['h'][-1] == pytest.approx(0.8 - 2*20.0*0.4/100)